@@ -0,0 +1,323 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014 Google Inc. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Benchmarks gyp on a synthetic tree.
+
+Runs gyp with each generator on a tree written by synthetic_tree.py, and
+reports the time taken to import gyp and the generator, by each phase of
+gyp.input.Load and by the generator, and the peak memory use.  Each run is a
+fresh process, so that the peak memory of one generator doesn't hide that of
+the next.  The results can be saved as a
+baseline, and later results compared to it:
+
+  run_benchmarks.py --preset medium --save-baseline baseline.json
+  ... change gyp ...
+  run_benchmarks.py --baseline baseline.json
+
+The comparison fails if a measurement got worse than the baseline by more than
+--threshold.  Baselines are only comparable on the same machine.
+"""
+
+import json
+import optparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+  import resource
+except ImportError:
+  # Not available on Windows, where peak memory isn't reported.
+  resource = None
+
+import synthetic_tree
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+PYLIB_DIR = os.path.join(os.path.dirname(BENCHMARKS_DIR), 'pylib')
+
+DEFAULT_GENERATORS = ['ninja', 'make', 'msvs', 'xcode', 'cmake', 'analyzer']
+
+# The functions gyp.input.Load calls, and the phase their time is counted in.
+# Calls nested in another one (such as the early variable expansions done
+# while loading the files) are counted in the phase of the outermost call.
+LOAD_PHASES = [
+  ('LoadTargetBuildFile', 'load_files'),
+  ('LoadTargetBuildFilesParallel', 'load_files'),
+  ('BuildTargetsDict', 'qualify_dependencies'),
+  ('QualifyDependencies', 'qualify_dependencies'),
+  ('RemoveSelfDependencies', 'qualify_dependencies'),
+  ('ExpandWildcardDependencies', 'qualify_dependencies'),
+  ('RemoveLinkDependenciesFromNoneTargets', 'qualify_dependencies'),
+  ('RemoveDuplicateDependencies', 'qualify_dependencies'),
+  ('VerifyNoGYPFileCircularDependencies', 'circular_check'),
+  ('BuildDependencyList', 'dependency_list'),
+  ('PruneUnwantedTargets', 'dependency_list'),
+  ('VerifyNoCollidingTargets', 'validate'),
+  ('DoDependentSettings', 'dependent_settings'),
+  ('AdjustStaticLibraryDependencies', 'static_libraries'),
+  ('ProcessVariablesAndConditionsInDict', 'late_variables'),
+  ('SetUpConfigurations', 'configurations'),
+  ('ProcessListFiltersInDict', 'list_filters'),
+  ('ValidateTargetType', 'validate'),
+  ('ValidateRulesInTarget', 'validate'),
+  ('ValidateRunAsInTarget', 'validate'),
+  ('ValidateActionsInTarget', 'validate'),
+  ('TurnIntIntoStrInDict', 'finalize'),
+]
+
+# Time differences smaller than this many seconds, and memory differences
+# smaller than this many kilobytes, are noise rather than regressions.
+MIN_TIME_DELTA = 0.05
+MIN_RSS_DELTA = 1024
+
+
+def _PeakRssKb():
+  """Returns the peak resident memory of this process in kilobytes."""
+  if not resource:
+    return None
+  peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  if sys.platform == 'darwin':
+    # Reported in bytes rather than kilobytes.
+    peak //= 1024
+  # Parallel loading happens in child processes.
+  children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+  if sys.platform == 'darwin':
+    children //= 1024
+  return max(peak, children)
+
+
+class _PhaseTimer(object):
+  """Accumulates the time spent in the functions wrapped by Wrap."""
+
+  def __init__(self):
+    self.times = {}
+    self._depth = 0
+
+  def Wrap(self, module, function_name, phase):
+    function = getattr(module, function_name, None)
+    if function is None:
+      # Not in this version of gyp.
+      return
+    timer = self
+
+    def Timed(*args, **kwargs):
+      if timer._depth:
+        return function(*args, **kwargs)
+      name = phase
+      if function_name == 'ProcessVariablesAndConditionsInDict' and \
+          args[1] == module.PHASE_LATELATE:
+        name = 'latelate_variables'
+      timer._depth += 1
+      start = time.time()
+      try:
+        return function(*args, **kwargs)
+      finally:
+        timer.times[name] = timer.times.get(name, 0) + time.time() - start
+        timer._depth -= 1
+    setattr(module, function_name, Timed)
+
+
+def RunChild(format, build_file, output_dir, result_path, parallel):
+  """Runs gyp in this process and writes its measurements to result_path."""
+  sys.path.insert(0, PYLIB_DIR)
+  start = time.time()
+  import gyp
+  import gyp.input
+  generator = __import__('gyp.generator.' + format.split('-')[0],
+                         globals(), locals(), ['GenerateOutput'])
+  times = {'import': time.time() - start}
+
+  phases = _PhaseTimer()
+  for function_name, phase in LOAD_PHASES:
+    phases.Wrap(gyp.input, function_name, phase)
+
+  def Timing(name, function):
+    def Timed(*args, **kwargs):
+      start = time.time()
+      try:
+        return function(*args, **kwargs)
+      finally:
+        times[name] = time.time() - start
+    return Timed
+  gyp.Load = Timing('load', gyp.Load)
+  generator.GenerateOutput = Timing('generate', generator.GenerateOutput)
+
+  args = ['--format', format, '--depth', os.path.dirname(build_file),
+          '--generator-output', output_dir, build_file]
+  if not parallel:
+    args.append('--no-parallel')
+  if format == 'analyzer':
+    config_path = os.path.join(output_dir, 'analyzer_config.json')
+    with open(config_path, 'w') as f:
+      json.dump({'files': ['dir_0/target_0/source_0.cc'],
+                 'test_targets': ['all'],
+                 'additional_compile_targets': ['all']}, f)
+    args += ['-G', 'config_path=' + config_path,
+             '-G', 'analyzer_output_path=' +
+                   os.path.join(output_dir, 'analyzer_output.json')]
+  start = time.time()
+  status = gyp.main(args)
+  times['total'] = time.time() - start
+  if status:
+    return status
+
+  phases.times['other'] = max(
+      0, times['load'] - sum(phases.times.values()))
+  with open(result_path, 'w') as f:
+    json.dump({'times': times, 'load_phases': phases.times,
+               'peak_rss_kb': _PeakRssKb()}, f)
+  return 0
+
+
+def RunGenerator(format, build_file, repeat, parallel):
+  """Runs gyp with one generator repeat times, each time in a new process and
+  with a new output directory.  Returns the best times and the worst peak
+  memory of the runs."""
+  result = None
+  for _ in range(repeat):
+    output_dir = tempfile.mkdtemp(prefix='gyp-benchmark-out.')
+    try:
+      result_path = os.path.join(output_dir, 'result.json')
+      command = [sys.executable, os.path.abspath(__file__),
+                 '--child', format, build_file, output_dir, result_path]
+      if parallel:
+        command.append('--parallel')
+      with open(os.devnull, 'w') as devnull:
+        if subprocess.call(command, stdout=devnull):
+          raise Exception('gyp failed with the %s generator, run: %s' %
+                          (format, ' '.join(command)))
+      with open(result_path) as f:
+        run = json.load(f)
+    finally:
+      shutil.rmtree(output_dir)
+    if result is None:
+      result = run
+      continue
+    for section in ('times', 'load_phases'):
+      for name, value in run[section].items():
+        result[section][name] = min(result[section].get(name, value), value)
+    if run['peak_rss_kb'] is not None:
+      result['peak_rss_kb'] = max(result['peak_rss_kb'], run['peak_rss_kb'])
+  return result
+
+
+def _Measurements(results):
+  """Yields (name, value, minimum delta) for each measurement of results."""
+  for format, result in sorted(results.items()):
+    for name, value in sorted(result['times'].items()):
+      yield '%s %s' % (format, name), value, MIN_TIME_DELTA
+    for name, value in sorted(result['load_phases'].items()):
+      yield '%s load.%s' % (format, name), value, MIN_TIME_DELTA
+    if result['peak_rss_kb'] is not None:
+      yield '%s peak_rss_kb' % format, result['peak_rss_kb'], MIN_RSS_DELTA
+
+
+def CompareToBaseline(results, baseline, threshold):
+  """Returns the regressions of results from baseline, as a list of
+  (name, baseline value, value)."""
+  baseline_values = dict((name, value) for name, value, _ in
+                         _Measurements(baseline))
+  regressions = []
+  for name, value, min_delta in _Measurements(results):
+    base = baseline_values.get(name)
+    if base is None:
+      continue
+    if value - base > max(min_delta, base * threshold):
+      regressions.append((name, base, value))
+  return regressions
+
+
+def PrintResults(results, baseline):
+  baseline_values = {}
+  if baseline:
+    baseline_values = dict((name, value) for name, value, _ in
+                           _Measurements(baseline))
+  for name, value, _ in _Measurements(results):
+    line = '%-40s %12.3f' % (name, value)
+    base = baseline_values.get(name)
+    if base:
+      line += '  %+7.1f%%' % ((value - base) * 100.0 / base)
+    print(line)
+
+
+def main(argv):
+  parser = optparse.OptionParser(usage='%prog [options]')
+  parser.add_option('--preset', choices=sorted(synthetic_tree.PRESETS),
+                    default='medium',
+                    help='size of the synthetic tree (default: %default)')
+  parser.add_option('--tree-param', action='append', default=[],
+                    metavar='NAME=VALUE',
+                    help='override a parameter of synthetic_tree.py')
+  parser.add_option('--generators', default=','.join(DEFAULT_GENERATORS),
+                    help='comma separated generators to run '
+                         '(default: %default)')
+  parser.add_option('--repeat', type='int', default=3,
+                    help='runs of each generator, the best time is kept '
+                         '(default: %default)')
+  parser.add_option('--parallel', action='store_true',
+                    help='load the build files in parallel')
+  parser.add_option('--baseline', help='compare to this baseline JSON file')
+  parser.add_option('--save-baseline', metavar='PATH',
+                    help='save the results as a baseline JSON file')
+  parser.add_option('--threshold', type='float', default=0.1,
+                    help='fraction by which a measurement may exceed the '
+                         'baseline (default: %default)')
+  parser.add_option('--child', nargs=4, help=optparse.SUPPRESS_HELP)
+  options, args = parser.parse_args(argv)
+  if args:
+    parser.error('Unexpected arguments: %s' % ' '.join(args))
+
+  if options.child:
+    return RunChild(*(list(options.child) + [options.parallel]))
+
+  tree_params = dict(synthetic_tree.PRESETS[options.preset])
+  for param in options.tree_param:
+    name, _, value = param.partition('=')
+    if name not in synthetic_tree.DEFAULT_PARAMS:
+      parser.error('Unknown tree parameter %s' % name)
+    tree_params[name] = type(synthetic_tree.DEFAULT_PARAMS[name])(value)
+
+  baseline = None
+  if options.baseline:
+    with open(options.baseline) as f:
+      baseline = json.load(f)
+    if baseline['tree'] != tree_params:
+      parser.error('%s was recorded for the tree %s' %
+                   (options.baseline, baseline['tree']))
+
+  tree_dir = tempfile.mkdtemp(prefix='gyp-benchmark-tree.')
+  try:
+    build_file = synthetic_tree.GenerateTree(tree_dir, **tree_params)
+    results = {}
+    for format in options.generators.split(','):
+      results[format] = RunGenerator(format, build_file, options.repeat,
+                                     options.parallel)
+  finally:
+    shutil.rmtree(tree_dir)
+
+  PrintResults(results, baseline and baseline['results'])
+  if options.save_baseline:
+    with open(options.save_baseline, 'w') as f:
+      json.dump({'tree': tree_params, 'results': results}, f, indent=2,
+                sort_keys=True)
+
+  if baseline:
+    regressions = CompareToBaseline(results, baseline['results'],
+                                    options.threshold)
+    if regressions:
+      print('\nRegressions beyond %d%% of the baseline:' %
+            (options.threshold * 100))
+      for name, base, value in regressions:
+        print('  %s: %.3f -> %.3f' % (name, base, value))
+      return 1
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014 Google Inc. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Generates a synthetic tree of .gyp and .gypi files for benchmarking gyp.
+
+The tree is made of |targets| targets spread over .gyp files of
+|targets_per_file| targets each, plus |includes| .gypi files that every .gyp
+file picks a few of.  All the targets are reachable from the 'all' target of
+all.gyp, which is the build file to run gyp on.
+
+Only the build files are written: the sources they list don't exist, which
+doesn't matter to gyp or the generators.
+"""
+
+import optparse
+import os
+import pprint
+import random
+import sys
+
+
+# Named sets of parameters, roughly the size of small, medium and
+# Chromium-sized projects.
+PRESETS = {
+  'small': {
+    'targets': 100,
+    'includes': 5,
+  },
+  'medium': {
+    'targets': 1000,
+    'includes': 20,
+  },
+  'large': {
+    'targets': 5000,
+    'includes': 50,
+  },
+}
+
+DEFAULT_PARAMS = {
+  # Number of targets, and of targets per .gyp file.
+  'targets': 100,
+  'targets_per_file': 10,
+  # Number of .gypi files, and of them included by each .gyp file.
+  'includes': 5,
+  'includes_per_file': 2,
+  # Number of dependencies of each target on random earlier targets.
+  'fan_out': 4,
+  # Number of base targets that every other target depends on.
+  'fan_in': 2,
+  # Number of conditions per target, alternating between early and late
+  # ('target_conditions') ones.
+  'conditions': 4,
+  # Fraction of the targets with a '<!()' command expansion.  The commands
+  # repeat, so some of them are cache hits.
+  'command_density': 0.1,
+  # Number of sources per target.
+  'sources': 20,
+  # Seed of the random dependencies.
+  'seed': 1,
+}
+
+
+def _WriteGypFile(path, contents):
+  with open(path, 'w') as f:
+    f.write(pprint.pformat(contents, indent=1, width=80))
+    f.write('\n')
+
+
+def _Include(index, params):
+  """Returns the contents of the index-th .gypi file."""
+  conditions = []
+  for i in range(params['conditions']):
+    conditions.append(
+        ['OS=="linux" and bench_include_%d_%d==1' % (index, i),
+         {'defines': ['INCLUDE_%d_CONDITION_%d' % (index, i)]},
+         {'cflags': ['-DINCLUDE_%d_NOT_%d' % (index, i)]}])
+  return {
+    'variables': dict(
+        [('bench_include_%d_%d%%' % (index, i), i % 2)
+         for i in range(params['conditions'])] +
+        [('include_%d_dir' % index, 'include/%d' % index)]),
+    'target_defaults': {
+      'include_dirs': ['<(include_%d_dir)' % index],
+      'defines': ['INCLUDE_%d' % index],
+      'conditions': conditions,
+    },
+  }
+
+
+def _Target(index, dependencies, params, rng):
+  """Returns the dict of the index-th target."""
+  name = 'target_%d' % index
+  if index % 10 == 9:
+    target_type = 'executable'
+  else:
+    target_type = 'static_library'
+  target = {
+    'target_name': name,
+    'type': target_type,
+    'sources': ['%s/source_%d.cc' % (name, i)
+                for i in range(params['sources'])],
+    'dependencies': dependencies,
+    'direct_dependent_settings': {
+      'include_dirs': ['%s/include' % name],
+      'defines': ['USING_%s' % name.upper()],
+    },
+  }
+  if index % 5 == 0:
+    target['all_dependent_settings'] = {
+      'defines': ['ALL_USING_%s' % name.upper()],
+    }
+  conditions = []
+  target_conditions = []
+  for i in range(params['conditions']):
+    branches = [{'defines': ['%s_CONDITION_%d' % (name.upper(), i)]},
+                {'sources!': ['%s/source_%d.cc' % (name, i)]}]
+    if i % 2:
+      target_conditions.append(
+          ['OS=="linux" and _type=="%s"' % target_type] + branches)
+    else:
+      conditions.append(['OS=="%s"' % ('linux', 'mac', 'win')[i % 3]] +
+                        branches)
+  if conditions:
+    target['conditions'] = conditions
+  if target_conditions:
+    target['target_conditions'] = target_conditions
+  if rng.random() < params['command_density']:
+    target['defines'] = ['COMMAND_<!(echo %d)' % (index % 10)]
+  return target
+
+
+def GenerateTree(tree_dir, **params):
+  """Writes a synthetic tree into tree_dir.
+
+  Arguments:
+    tree_dir: the directory to write the tree to.
+    params: overrides of DEFAULT_PARAMS.
+  Returns:
+    The path of the build file to run gyp on.
+  """
+  for key in params:
+    if key not in DEFAULT_PARAMS:
+      raise ValueError('Unknown tree parameter %r' % key)
+  params = dict(DEFAULT_PARAMS, **params)
+  rng = random.Random(params['seed'])
+
+  build_dir = os.path.join(tree_dir, 'build')
+  if not os.path.isdir(build_dir):
+    os.makedirs(build_dir)
+  _WriteGypFile(os.path.join(build_dir, 'common.gypi'), {
+    'variables': {'OS%': 'linux'},
+    'target_defaults': {
+      'default_configuration': 'Debug',
+      'configurations': {
+        'Debug': {'defines': ['DEBUG']},
+        'Release': {'defines': ['NDEBUG']},
+      },
+    },
+  })
+  includes = []
+  for i in range(params['includes']):
+    include = 'include_%d.gypi' % i
+    _WriteGypFile(os.path.join(build_dir, include), _Include(i, params))
+    includes.append(include)
+
+  num_targets = params['targets']
+  num_files = (num_targets + params['targets_per_file'] - 1) // \
+      params['targets_per_file']
+  file_names = ['dir_%d/dir_%d.gyp' % (i, i) for i in range(num_files)]
+
+  def Reference(index, from_file):
+    target_file = file_names[index // params['targets_per_file']]
+    name = 'target_%d' % index
+    if target_file == from_file:
+      return name
+    return '../%s:%s' % (target_file, name)
+
+  for file_index, file_name in enumerate(file_names):
+    first = file_index * params['targets_per_file']
+    targets = []
+    for index in range(first,
+                       min(first + params['targets_per_file'], num_targets)):
+      dependencies = set()
+      if index >= params['fan_in']:
+        dependencies.update(range(params['fan_in']))
+      if index:
+        for _ in range(params['fan_out']):
+          dependencies.add(rng.randrange(index))
+      targets.append(_Target(
+          index, [Reference(d, file_name) for d in sorted(dependencies)],
+          params, rng))
+    gyp_includes = ['../build/common.gypi']
+    if includes:
+      for i in range(params['includes_per_file']):
+        include = includes[(file_index + i) % len(includes)]
+        if '../build/' + include not in gyp_includes:
+          gyp_includes.append('../build/' + include)
+    path = os.path.join(tree_dir, file_name)
+    if not os.path.isdir(os.path.dirname(path)):
+      os.makedirs(os.path.dirname(path))
+    _WriteGypFile(path, {'includes': gyp_includes, 'targets': targets})
+
+  all_gyp = os.path.join(tree_dir, 'all.gyp')
+  _WriteGypFile(all_gyp, {
+    'includes': ['build/common.gypi'],
+    'targets': [{
+      'target_name': 'all',
+      'type': 'none',
+      'dependencies': ['%s:target_%d' % (file_names[i // params[
+          'targets_per_file']], i) for i in range(num_targets)],
+    }],
+  })
+  return all_gyp
+
+
+def main(argv):
+  parser = optparse.OptionParser(usage='%prog [options] TREE_DIR')
+  parser.add_option('--preset', choices=sorted(PRESETS),
+                    help='start from the parameters of this preset')
+  for key, value in sorted(DEFAULT_PARAMS.items()):
+    parser.add_option('--' + key.replace('_', '-'), dest=key,
+                      type=type(value).__name__,
+                      help='default: %s' % value)
+  options, args = parser.parse_args(argv)
+  if len(args) != 1:
+    parser.error('Expected the directory to write the tree to.')
+  params = dict(PRESETS.get(options.preset, {}))
+  for key in DEFAULT_PARAMS:
+    if getattr(options, key) is not None:
+      params[key] = getattr(options, key)
+  print(GenerateTree(args[0], **params))
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(main(sys.argv[1:]))
@@ -8,10 +8,14 @@ __doc__ = """
 gyptest.py -- test runner for GYP tests.
 """
 
+import json
 import os
 import optparse
+import Queue
 import subprocess
 import sys
+import threading
+import time
 
 class CommandRunner(object):
   """
@@ -144,11 +148,79 @@ def find_all_gyptest_files(directory):
   return result
 
 
+def load_times(path):
+  if not path:
+    return {}
+  try:
+    with open(path) as f:
+      return json.load(f)
+  except (IOError, ValueError):
+    return {}
+
+
+def save_times(path, times):
+  dirname = os.path.dirname(path)
+  if dirname and not os.path.isdir(dirname):
+    os.makedirs(dirname)
+  with open(path, 'w') as f:
+    json.dump(times, f, indent=0, sort_keys=True)
+
+
+def time_key(test, format):
+  return '%s:%s' % (format, test)
+
+
+def run_parallel(jobs, gyp_options, num_workers, verbose):
+  """
+  Runs the (test, format) jobs on num_workers threads, each test in its own
+  process, in the given order.  The output of each test is printed in one
+  block once it's done, so outputs don't interleave.  Returns the exit status
+  and wall time of each job, keyed by job.
+  """
+  pending = Queue.Queue()
+  for job in jobs:
+    pending.put(job)
+  done = Queue.Queue()
+
+  def worker():
+    while True:
+      try:
+        test, format = pending.get_nowait()
+      except Queue.Empty:
+        return
+      env = dict(os.environ, TESTGYP_FORMAT=format)
+      command = [sys.executable, test] + gyp_options
+      start = time.time()
+      p = subprocess.Popen(command, env=env, stdout=subprocess.PIPE,
+                           stderr=subprocess.STDOUT)
+      output = p.communicate()[0]
+      done.put(((test, format), p.returncode, time.time() - start,
+                ' '.join(command), output))
+
+  for _ in range(num_workers):
+    thread = threading.Thread(target=worker)
+    thread.daemon = True
+    thread.start()
+
+  results = {}
+  while len(results) < len(jobs):
+    # A timeout keeps the main thread responsive to Ctrl-C.
+    try:
+      job, status, elapsed, command, output = done.get(timeout=1)
+    except Queue.Empty:
+      continue
+    results[job] = (status, elapsed)
+    if verbose:
+      sys.stdout.write('TESTGYP_FORMAT=%s %s\n' % (job[1], command))
+    sys.stdout.write(output)
+  return results
+
+
 def main(argv=None):
   if argv is None:
     argv = sys.argv
 
-  usage = "gyptest.py [-ahlnq] [-f formats] [test ...]"
+  usage = "gyptest.py [-ahlnq] [-f formats] [-j jobs] [test ...]"
   parser = optparse.OptionParser(usage=usage)
   parser.add_option("-a", "--all", action="store_true",
             help="run all tests")
@@ -158,6 +230,8 @@ def main(argv=None):
             help="run tests with the specified formats")
   parser.add_option("-G", '--gyp_option', action="append", default=[],
             help="Add -G options to the gyp command line")
+  parser.add_option("-j", "--jobs", action="store", type="int", default=1,
+            help="run this many tests in parallel, slowest first")
   parser.add_option("-l", "--list", action="store_true",
             help="list available tests and exit")
   parser.add_option("-n", "--no-exec", action="store_true",
@@ -168,6 +242,11 @@ def main(argv=None):
             help="additional $PATH directory")
   parser.add_option("-q", "--quiet", action="store_true",
             help="quiet, don't print test command lines")
+  parser.add_option("--shard", action="store", default=None,
+            help="only run the tests of shard I/N (I counts from 0)")
+  parser.add_option("--times-file", action="store", default=None,
+            help="keep the wall time of each test in this file, so that "
+                 "parallel runs start the slowest tests first")
   opts, args = parser.parse_args(argv[1:])
 
   if opts.chdir:
@@ -194,6 +273,16 @@ def main(argv=None):
         sys.exit(1)
       tests.append(arg)
 
+  if opts.shard:
+    try:
+      shard, num_shards = [int(n) for n in opts.shard.split('/')]
+      if not 0 <= shard < num_shards:
+        raise ValueError
+    except ValueError:
+      print >>sys.stderr, 'Invalid --shard %r, expected I/N.' % opts.shard
+      sys.exit(1)
+    tests = tests[shard::num_shards]
+
   if opts.list:
     for test in tests:
       print test
@@ -227,27 +316,54 @@ def main(argv=None):
       'darwin':   ['make', 'ninja', 'xcode', 'xcode-ninja'],
     }[sys.platform]
 
-  for format in format_list:
-    os.environ['TESTGYP_FORMAT'] = format
-    if not opts.quiet:
-      sys.stdout.write('TESTGYP_FORMAT=%s\n' % format)
-
-    gyp_options = []
-    for option in opts.gyp_option:
-      gyp_options += ['-G', option]
-    if gyp_options and not opts.quiet:
-      sys.stdout.write('Extra Gyp options: %s\n' % gyp_options)
-
-    for test in tests:
+  gyp_options = []
+  for option in opts.gyp_option:
+    gyp_options += ['-G', option]
+  if gyp_options and not opts.quiet:
+    sys.stdout.write('Extra Gyp options: %s\n' % gyp_options)
+
+  times = load_times(opts.times_file)
+  jobs = [(test, format) for format in format_list for test in tests]
+  if opts.jobs > 1 and not opts.no_exec:
+    # Starting the slowest tests first keeps one of them from finishing last
+    # on its own.  Tests that never ran are assumed to be slow.
+    jobs.sort(key=lambda job: -times.get(time_key(*job), float('inf')))
+    results = run_parallel(jobs, gyp_options, opts.jobs, not opts.quiet)
+  else:
+    results = {}
+    for test, format in jobs:
+      if os.environ.get('TESTGYP_FORMAT') != format:
+        os.environ['TESTGYP_FORMAT'] = format
+        if not opts.quiet:
+          sys.stdout.write('TESTGYP_FORMAT=%s\n' % format)
+      start = time.time()
       status = cr.run([sys.executable, test] + gyp_options,
                       stdout=sys.stdout,
                       stderr=sys.stderr)
+      results[(test, format)] = (status, time.time() - start)
+
+  # Report each test once, with the formats it ran in if there are several.
+  for test in tests:
+    by_status = {}
+    for format in format_list:
+      status = results[(test, format)][0]
+      by_status.setdefault(status, []).append(format)
+    for status, formats in sorted(by_status.items()):
+      if len(format_list) > 1:
+        test_name = '%s (%s)' % (test, ', '.join(formats))
+      else:
+        test_name = test
       if status == 2:
-        no_result.append(test)
+        no_result.append(test_name)
       elif status:
-        failed.append(test)
+        failed.append(test_name)
       else:
-        passed.append(test)
+        passed.append(test_name)
+
+  if opts.times_file and not opts.no_exec:
+    for job, (status, elapsed) in results.items():
+      times[time_key(*job)] = round(elapsed, 2)
+    save_times(opts.times_file, times)
 
   if not opts.quiet:
     def report(description, tests):
@@ -259,6 +375,12 @@ def main(argv=None):
           sys.stdout.write(fmt % (description, len(tests)))
         sys.stdout.write("\t" + "\n\t".join(tests) + "\n")
 
+    if not opts.no_exec and results:
+      slowest = sorted(results.items(), key=lambda item: -item[1][1])[:10]
+      sys.stdout.write("\nSlowest tests:\n")
+      for (test, format), (_, elapsed) in slowest:
+        sys.stdout.write("\t%7.2fs  %s (%s)\n" % (elapsed, test, format))
+
     if opts.passed:
       report("Passed", passed)
     report("Failed", failed)
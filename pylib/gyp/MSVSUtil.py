@@ -5,7 +5,11 @@
 """Utility functions shared amongst the Windows generators."""
 
 import copy
+import math
 import os
+import re
+
+import gyp.common
 
 
 # A dictionary mapping supported target types to extensions.
@@ -17,6 +21,16 @@ TARGET_TYPE_EXT = {
 }
 
 
+# The extensions of the sources that get compiled, and so add to the cost of a
+# shard.
+_COMPILED_EXTENSIONS = ('.asm', '.c', '.cc', '.cpp', '.cxx', '.m', '.mm', '.s',
+                        '.S')
+
+# The cost, in bytes of compiled sources, 'msvs_shard': 'auto' aims for in each
+# shard unless the target sets 'msvs_shard_size'.
+DEFAULT_SHARD_SIZE = 4 * 1024 * 1024
+
+
 def _GetLargePdbShimCcPath():
   """Returns the path of the large_pdb_shim.cc file."""
   this_dir = os.path.abspath(os.path.dirname(__file__))
@@ -70,21 +84,183 @@ def _ShardName(name, number):
   return _SuffixName(name, str(number))
 
 
-def ShardTargets(target_list, target_dicts):
+class NinjaLogCompileTimes(object):
+  """The compile time of each object of a previous ninja build.
+
+  Objects are looked up by the directory and name ninja gives them, minus the
+  target name: obj/<gyp dir>/<source dir>/<target>.<source name>.o is the
+  object of <source name>.cc, whichever shard of <target> compiled it.
+  """
+
+  def __init__(self, log_paths, toplevel_dir):
+    """The .ninja_log files in log_paths are only read once a time is asked
+    for; missing ones are skipped and later files win over earlier ones."""
+    self.log_paths = log_paths
+    self.toplevel_dir = toplevel_dir
+    self.times = None
+
+  def _ReadLogs(self):
+    self.times = {}
+    shard_suffix = re.compile(r'_\d+$')
+    for log_path in self.log_paths:
+      if not os.path.exists(log_path):
+        continue
+      with open(log_path) as log:
+        for line in log:
+          fields = line.rstrip('\n').split('\t')
+          if line.startswith('#') or len(fields) < 4:
+            continue
+          output_dir, output_name = os.path.split(fields[3])
+          if '.' not in output_name:
+            continue
+          output_dir = os.path.normpath(output_dir)
+          target_name, object_name = output_name.split('.', 1)
+          time = int(fields[1]) - int(fields[0])
+          # The target may be a shard, or just have a name that looks like one.
+          self.times[(output_dir, target_name, object_name)] = time
+          target_name = shard_suffix.sub('', target_name)
+          self.times[(output_dir, target_name, object_name)] = time
+
+  def Get(self, qualified_target, spec, source):
+    """Returns the milliseconds it took to compile source into an object of
+    the target, or None if it wasn't compiled by the previous build."""
+    if self.times is None:
+      self._ReadLogs()
+    build_dir = os.path.dirname(qualified_target.split(':', 1)[0])
+    base_dir = gyp.common.RelativePath(build_dir, self.toplevel_dir)
+    # Like ninja, keep objects from escaping the obj directory.
+    base_dir = base_dir.split(os.sep)
+    i = next((i for i, x in enumerate(base_dir) if x != '..'), len(base_dir))
+    base_dir = ('..' * i) + os.sep.join(base_dir[i:])
+    obj = 'obj'
+    if spec.get('toolset', 'target') != 'target':
+      obj += '.' + spec['toolset']
+    source_dir, source_name = os.path.split(source)
+    output_dir = os.path.normpath(os.path.join(obj, base_dir, source_dir))
+    stem = os.path.splitext(source_name)[0]
+    for obj_ext in ('.o', '.obj', '_asm.obj'):
+      key = (output_dir, spec['target_name'], stem + obj_ext)
+      if key in self.times:
+        return self.times[key]
+    return None
+
+
+def _GetSourceCosts(qualified_target, spec, compile_times):
+  """Returns the cost of compiling each of the sources of a target.
+
+  The cost of a source is its size, or if compile_times knows how long it took
+  to compile, that time scaled to the bytes per millisecond of the sources
+  whose time is known.  Sources that aren't compiled cost nothing; compiled
+  ones of unknown cost (e.g. generated sources) cost the average.
+  """
+  build_dir = os.path.dirname(qualified_target.split(':', 1)[0])
+  sizes = []
+  times = []
+  for source in spec.get('sources', []):
+    source_size = source_time = None
+    if os.path.splitext(source)[1] not in _COMPILED_EXTENSIONS:
+      source_size = 0
+    elif '$' not in source:
+      try:
+        source_size = gyp.common.file_system_cache.GetSize(
+            os.path.join(build_dir, source))
+      except OSError:
+        pass
+      if compile_times:
+        source_time = compile_times.Get(qualified_target, spec, source)
+    sizes.append(source_size)
+    times.append(source_time)
+
+  timed = [(size, time) for size, time in zip(sizes, times)
+           if size and time is not None]
+  if timed and sum(time for _, time in timed):
+    bytes_per_ms = (float(sum(size for size, _ in timed)) /
+                    sum(time for _, time in timed))
+    costs = [size if time is None else time * bytes_per_ms
+             for size, time in zip(sizes, times)]
+  else:
+    costs = sizes
+  known = [cost for cost in costs if cost]
+  average = float(sum(known)) / len(known) if known else 1
+  return [average if cost is None else cost for cost in costs]
+
+
+def _BalanceShards(costs, shards):
+  """Splits a list of sources into shards of about the same total cost.
+
+  Each shard gets a run of consecutive sources, so adding or removing a source
+  only moves sources across the boundaries of the shards next to it, instead
+  of reshuffling every shard the way striping does.
+
+  Arguments:
+    costs: the cost of each source.
+    shards: the number of shards.
+  Returns:
+    The shard of each source.
+  """
+  total = float(sum(costs))
+  if not total:
+    costs = [1] * len(costs)
+    total = float(len(costs))
+  assignment = []
+  done = 0
+  for cost in costs:
+    # A source goes to the shard its midpoint falls into.
+    shard = int((done + cost / 2.0) * shards / total)
+    assignment.append(min(shards - 1, shard))
+    done += cost
+  return assignment
+
+
+def ShardTargets(target_list, target_dicts, auto_only=False, balance=False,
+                 compile_times=None):
   """Shard some targets apart to work around the linkers limits.
 
+  Targets with 'msvs_shard': N are split into N shards, striping their
+  sources.  Targets with 'msvs_shard': 'auto' get as many shards as it takes
+  for each to cost about 'msvs_shard_size' (see _GetSourceCosts), and their
+  sources are split into runs of about the same cost.
+
+  With compile_times, the costs, and so the number of shards and where they
+  split, follow the times of the previous build, so they can drift from one
+  regeneration to the next even if the sources didn't change.  Each drift
+  rebuilds the sources that moved to another shard, and relinks the shards
+  on both sides, which is why the ninja generator only passes them with
+  -G shard_by_compile_times=1.  Without compile_times they only depend on the
+  sizes of the sources.
+
   Arguments:
     target_list: List of target pairs: 'base/base.gyp:base'.
     target_dicts: Dict of target properties keyed on target pair.
+    auto_only: whether to only shard the targets with 'msvs_shard': 'auto'.
+    balance: whether to split by cost the targets with a fixed number of
+        shards too.
+    compile_times: the NinjaLogCompileTimes of a previous build, if any.
   Returns:
     Tuple of the new sharded versions of the inputs.
   """
-  # Gather the targets to shard, and how many pieces.
+  # Gather the targets to shard, how many pieces, and which sources go where.
   targets_to_shard = {}
+  source_shards = {}
   for t in target_dicts:
-    shards = int(target_dicts[t].get('msvs_shard', 0))
-    if shards:
-      targets_to_shard[t] = shards
+    shards = target_dicts[t].get('msvs_shard', 0)
+    if shards == 'auto':
+      costs = _GetSourceCosts(t, target_dicts[t], compile_times)
+      shard_size = int(target_dicts[t].get('msvs_shard_size',
+                                           DEFAULT_SHARD_SIZE))
+      shards = int(math.ceil(float(sum(costs)) / shard_size))
+      shards = max(1, min(shards, len([cost for cost in costs if cost])))
+      assignment = _BalanceShards(costs, shards)
+      # Drop the shards a costly source left empty.
+      renumber = dict((shard, i) for i, shard in
+                      enumerate(sorted(set(assignment))))
+      source_shards[t] = [renumber[shard] for shard in assignment]
+      targets_to_shard[t] = len(renumber) or 1
+    elif not auto_only and int(shards):
+      targets_to_shard[t] = int(shards)
+      if balance:
+        costs = _GetSourceCosts(t, target_dicts[t], compile_times)
+        source_shards[t] = _BalanceShards(costs, int(shards))
   # Shard target_list.
   new_target_list = []
   for t in target_list:
@@ -104,8 +280,13 @@ def ShardTargets(target_list, target_dicts):
              new_target_dicts[name]['target_name'], i)
         sources = new_target_dicts[name].get('sources', [])
         new_sources = []
-        for pos in range(i, len(sources), targets_to_shard[t]):
-          new_sources.append(sources[pos])
+        if t in source_shards:
+          for source, shard in zip(sources, source_shards[t]):
+            if shard == i:
+              new_sources.append(source)
+        else:
+          for pos in range(i, len(sources), targets_to_shard[t]):
+            new_sources.append(sources[pos])
         new_target_dicts[name]['sources'] = new_sources
     else:
       new_target_dicts[t] = target_dicts[t]
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014 Google Inc. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Unit tests for the MSVSUtil.py file."""
+
+import gyp.MSVSUtil as MSVSUtil
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class TestBalanceShards(unittest.TestCase):
+  def test_Balanced(self):
+    self.assertEqual(MSVSUtil._BalanceShards([1, 1, 1, 1], 2), [0, 0, 1, 1])
+    self.assertEqual(MSVSUtil._BalanceShards([3, 1, 1, 1], 2), [0, 1, 1, 1])
+    self.assertEqual(MSVSUtil._BalanceShards([0, 0, 0], 2), [0, 1, 1])
+
+  def test_Stable(self):
+    """Test that adding a source only moves sources next to boundaries."""
+    costs = [10] * 100
+    before = MSVSUtil._BalanceShards(costs, 4)
+    after = MSVSUtil._BalanceShards(costs[:50] + [10] + costs[50:], 4)
+    del after[50]
+    moved = [i for i in range(len(costs)) if before[i] != after[i]]
+    self.assertTrue(len(moved) <= 3, moved)
+
+
+class TestShardTargets(unittest.TestCase):
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.build_file = os.path.join(self.tmp_dir, 'a.gyp')
+    self.sizes = {'big.cc': 3000, 'one.cc': 1000, 'two.cc': 1000,
+                  'three.cc': 1000}
+    for name, size in self.sizes.items():
+      with open(os.path.join(self.tmp_dir, name), 'w') as f:
+        f.write('x' * size)
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def shard(self, spec, **kw):
+    target = self.build_file + ':lib#target'
+    user = self.build_file + ':user#target'
+    spec = dict(spec, target_name='lib',
+                sources=['big.cc', 'one.cc', 'header.h', 'two.cc', 'three.cc'])
+    target_dicts = {target: spec,
+                    user: {'target_name': 'user', 'dependencies': [target]}}
+    target_list, target_dicts = MSVSUtil.ShardTargets(
+        [target, user], target_dicts, **kw)
+    shards = [target_dicts[t]['sources'] for t in target_list if t != user]
+    self.assertEqual(target_dicts[user]['dependencies'], target_list[:-1])
+    return shards
+
+  def test_Striped(self):
+    self.assertEqual(self.shard({'msvs_shard': '2'}),
+                     [['big.cc', 'header.h', 'three.cc'], ['one.cc', 'two.cc']])
+
+  def test_Balanced(self):
+    self.assertEqual(self.shard({'msvs_shard': '2'}, balance=True),
+                     [['big.cc'], ['one.cc', 'header.h', 'two.cc', 'three.cc']])
+
+  def test_Auto(self):
+    self.assertEqual(self.shard({'msvs_shard': 'auto',
+                                 'msvs_shard_size': '3000'}),
+                     [['big.cc'], ['one.cc', 'header.h', 'two.cc', 'three.cc']])
+    # Rounds the number of shards up.
+    self.assertEqual(self.shard({'msvs_shard': 'auto',
+                                 'msvs_shard_size': '4000'}),
+                     [['big.cc'], ['one.cc', 'header.h', 'two.cc', 'three.cc']])
+    self.assertEqual(self.shard({'msvs_shard': 'auto'}),
+                     [['big.cc', 'one.cc', 'header.h', 'two.cc', 'three.cc']])
+
+  def test_AutoOnly(self):
+    self.assertEqual(self.shard({'msvs_shard': '2'}, auto_only=True),
+                     [['big.cc', 'one.cc', 'header.h', 'two.cc', 'three.cc']])
+
+  def test_CompileTimes(self):
+    log_path = os.path.join(self.tmp_dir, '.ninja_log')
+    with open(log_path, 'w') as f:
+      f.write('# ninja log v5\n')
+      # big.cc turned out to be cheap to compile, and three.cc expensive.
+      f.write('0\t100\t0\tobj/lib_0.big.o\t0\n')
+      f.write('0\t100\t0\tobj/lib_1.one.o\t0\n')
+      f.write('0\t100\t0\tobj/lib_1.two.o\t0\n')
+      f.write('0\t900\t0\tobj/lib_1.three.o\t0\n')
+    compile_times = MSVSUtil.NinjaLogCompileTimes([log_path], self.tmp_dir)
+    self.assertEqual(
+        self.shard({'msvs_shard': '2'}, balance=True,
+                   compile_times=compile_times),
+        [['big.cc', 'one.cc', 'header.h', 'two.cc'], ['three.cc']])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -7,6 +7,7 @@ from __future__ import print_function
 
 import copy
 import gyp.input
+import gyp.jumbo
 import optparse
 import os.path
 import re
@@ -22,6 +23,8 @@ debug = {}
 DEBUG_GENERAL = 'general'
 DEBUG_VARIABLES = 'variables'
 DEBUG_INCLUDES = 'includes'
+DEBUG_FILESYSTEM = 'filesystem'
+DEBUG_MEMORY = 'memory'
 
 
 def DebugOutput(mode, message, *args):
@@ -40,7 +43,7 @@ def DebugOutput(mode, message, *args):
 
 def FindBuildFiles():
   extension = '.gyp'
-  files = os.listdir(os.getcwd())
+  files = gyp.common.file_system_cache.ListDir(os.getcwd())
   build_files = []
   for file in files:
     if file.endswith(extension):
@@ -50,12 +53,16 @@ def FindBuildFiles():
 
 def Load(build_files, format, default_variables={},
          includes=[], depth='.', params=None, check=False,
-         circular_check=True):
+         circular_check=True, variants=None):
   """
   Loads one or more specified build files.
   default_variables and includes will be copied before use.
   Returns the generator for the specified format and the
   data returned by loading the specified build files.
+  If variants, a list of dicts of variables that override
+  default_variables, is given, the build files are loaded once
+  for each, and the generator is returned with the list of the
+  data of each variant, whose jumbo sources are left unmerged.
   """
   if params is None:
     params = {}
@@ -64,12 +71,17 @@ def Load(build_files, format, default_variables={},
   if '-' in format:
     format, params['flavor'] = format.split('-', 1)
 
-  default_variables = copy.copy(default_variables)
+  if variants is None:
+    variables_list = [copy.copy(default_variables)]
+  else:
+    variables_list = [dict(default_variables, **variant)
+                      for variant in variants]
 
   # Default variables provided by this program and its modules should be
   # named WITH_CAPITAL_LETTERS to provide a distinct "best practice" namespace,
   # avoiding collisions with user and automatic variables.
-  default_variables['GENERATOR'] = format
+  for default_variables in variables_list:
+    default_variables['GENERATOR'] = format
 
   # Format can be a custom python file, or by default the name of a module
   # within gyp.generator.
@@ -90,13 +102,14 @@ def Load(build_files, format, default_variables={},
   # These parameters are passed in order (as opposed to by key)
   # because ActivePython cannot handle key parameters to __import__.
   generator = __import__(generator_name, globals(), locals(), generator_name)
-  for (key, val) in generator.generator_default_variables.items():
-    default_variables.setdefault(key, val)
+  for default_variables in variables_list:
+    for (key, val) in generator.generator_default_variables.items():
+      default_variables.setdefault(key, val)
 
-  # Give the generator the opportunity to set additional variables based on
-  # the params it will receive in the output phase.
-  if getattr(generator, 'CalculateVariables', None):
-    generator.CalculateVariables(default_variables, params)
+    # Give the generator the opportunity to set additional variables based on
+    # the params it will receive in the output phase.
+    if getattr(generator, 'CalculateVariables', None):
+      generator.CalculateVariables(default_variables, params)
 
   # Give the generator the opportunity to set generator_input_info based on
   # the params it will receive in the output phase.
@@ -122,13 +135,34 @@ def Load(build_files, format, default_variables={},
         getattr(generator, 'generator_wants_sorted_dependencies', False),
     'generator_filelist_paths':
         getattr(generator, 'generator_filelist_paths', None),
+    'generator_build_file_data_keys':
+        getattr(generator, 'generator_build_file_data_keys', None),
   }
 
   # Process the input specific to this generator.
-  result = gyp.input.Load(build_files, default_variables, includes[:],
-                          depth, generator_input_info, check, circular_check,
-                          params['parallel'], params['root_targets'])
-  return [generator] + result
+  if variants is None:
+    results = [gyp.input.Load(build_files, variables_list[0], includes[:],
+                              depth, generator_input_info, check,
+                              circular_check, params['parallel'],
+                              params['root_targets'],
+                              params.get('lazy_load', False))]
+  else:
+    results = gyp.input.LoadVariants(build_files, variables_list, includes[:],
+                                     depth, generator_input_info, check,
+                                     circular_check, params['root_targets'],
+                                     params.get('lazy_load', False))
+
+  if variants is None:
+    # Merge the sources of jumbo targets before the generators that build
+    # them get to see them.  The others, e.g. the analyzer, see the original
+    # sources.
+    if getattr(generator, 'generator_supports_jumbo', False):
+      flat_list, targets, data = results[0]
+      gyp.jumbo.MergeJumboSources(flat_list, targets, params)
+    return [generator] + results[0]
+  # The unity files of each variant go under its own generator output, so the
+  # caller merges the jumbo sources of each, see gyp.jumbo.
+  return [generator, results]
 
 def NameValueListToDict(name_value_list):
   """
@@ -278,6 +312,8 @@ class RegeneratableOptionParser(optparse.OptionParser):
 
 def gyp_main(args):
   my_name = os.path.basename(sys.argv[0])
+  # File system queries are cached for the duration of a run.
+  gyp.common.file_system_cache.Reset()
 
   parser = RegeneratableOptionParser()
   usage = 'usage: %s [options ...] [build_file ...]'
@@ -293,7 +329,8 @@ def gyp_main(args):
   parser.add_option('-d', '--debug', dest='debug', metavar='DEBUGMODE',
                     action='append', default=[], help='turn on a debugging '
                     'mode for debugging GYP.  Supported modes are "variables", '
-                    '"includes" and "general" or "all" for all of them.')
+                    '"includes", "filesystem", "memory" and "general" or "all" '
+                    'for all of them.')
   parser.add_option('-D', dest='defines', action='append', metavar='VAR=VAL',
                     env_name='GYP_DEFINES',
                     help='sets variable VAR to value VAL')
@@ -335,6 +372,16 @@ def gyp_main(args):
   parser.add_option('-R', '--root-target', dest='root_targets',
                     action='append', metavar='TARGET',
                     help='include only TARGET and its deep dependencies')
+  parser.add_option('--lazy-load', dest='lazy_load', action='store_true',
+                    default=False,
+                    help='with --root-target, load only the build files '
+                         'that the root targets depend on')
+  parser.add_option('--variant', dest='variants', action='append',
+                    metavar='"NAME VAR=VAL ..."',
+                    help='also generate the variant NAME of the build, with '
+                         'the given variables, under the subdirectory NAME '
+                         'of the generator output; the variants are loaded '
+                         'together')
 
   options, build_files_arg = parser.parse_args(args)
   build_files = build_files_arg
@@ -483,6 +530,22 @@ def gyp_main(args):
   if DEBUG_GENERAL in gyp.debug.keys():
     DebugOutput(DEBUG_GENERAL, "generator_flags: %s", generator_flags)
 
+  # Each variant is a name followed by the defines that set it apart.
+  variant_names = []
+  variant_defines = []
+  variants = None
+  if options.variants:
+    variants = []
+    for variant in options.variants:
+      variant = shlex.split(variant)
+      if not variant or '=' in variant[0]:
+        raise GypError('--variant needs a name before its defines')
+      if variant[0] in variant_names:
+        raise GypError('Variant %s given twice' % variant[0])
+      variant_names.append(variant[0])
+      variant_defines.append(variant[1:])
+      variants.append(NameValueListToDict(variant[1:]))
+
   # Generate all requested formats (use a set in case we got one format request
   # twice)
   for format in set(options.formats):
@@ -494,28 +557,55 @@ def gyp_main(args):
               'gyp_binary': sys.argv[0],
               'home_dot_gyp': home_dot_gyp,
               'parallel': options.parallel,
-              'root_targets': options.root_targets}
+              'root_targets': options.root_targets,
+              'lazy_load': options.lazy_load}
 
     # Start with the default variables from the command line.
-    [generator, flat_list, targets, data] = Load(
-        build_files, format, cmdline_default_variables, includes, options.depth,
-        params, options.check, options.circular_check)
-
-    # TODO(mark): Pass |data| for now because the generator needs a list of
-    # build files that came in.  In the future, maybe it should just accept
-    # a list, and not the whole data dict.
-    # NOTE: flat_list is the flattened dependency graph specifying the order
-    # that targets may be built.  Build systems that operate serially or that
-    # need to have dependencies defined before dependents reference them should
-    # generate targets in the order specified in flat_list.
-    generator.GenerateOutput(flat_list, targets, data, params)
-
-    if options.configs:
-      valid_configs = targets[flat_list[0]]['configurations'].keys()
-      for conf in options.configs:
-        if conf not in valid_configs:
-          raise GypError('Invalid config specified via --build: %s' % conf)
-      generator.PerformBuild(data, options.configs, params)
+    if variants is None:
+      [generator, flat_list, targets, data] = Load(
+          build_files, format, cmdline_default_variables, includes,
+          options.depth, params, options.check, options.circular_check)
+      outputs = [(params, flat_list, targets, data)]
+    else:
+      [generator, results] = Load(
+          build_files, format, cmdline_default_variables, includes,
+          options.depth, params, options.check, options.circular_check,
+          variants)
+      outputs = []
+      for name, defines, result in zip(variant_names, variant_defines,
+                                       results):
+        # Each variant goes to its own subdirectory of the generator output,
+        # and is regenerated on its own, from its defines.
+        variant_options = copy.copy(options)
+        variant_options.generator_output = os.path.join(
+            options.generator_output or '.', name)
+        variant_options.defines = (options.defines or []) + defines
+        variant_options.variants = None
+        variant_params = dict(params, options=variant_options)
+        if getattr(generator, 'generator_supports_jumbo', False):
+          flat_list, targets, data = result
+          gyp.jumbo.MergeJumboSources(flat_list, targets, variant_params)
+        outputs.append((variant_params,) + tuple(result))
+
+    for output_params, flat_list, targets, data in outputs:
+      # TODO(mark): Pass |data| for now because the generator needs a list of
+      # build files that came in.  In the future, maybe it should just accept
+      # a list, and not the whole data dict.
+      # NOTE: flat_list is the flattened dependency graph specifying the order
+      # that targets may be built.  Build systems that operate serially or
+      # that need to have dependencies defined before dependents reference
+      # them should generate targets in the order specified in flat_list.
+      generator.GenerateOutput(flat_list, targets, data, output_params)
+
+      if options.configs:
+        valid_configs = targets[flat_list[0]]['configurations'].keys()
+        for conf in options.configs:
+          if conf not in valid_configs:
+            raise GypError('Invalid config specified via --build: %s' % conf)
+        generator.PerformBuild(data, options.configs, output_params)
+
+  if DEBUG_FILESYSTEM in gyp.debug or 'all' in gyp.debug:
+    DebugOutput(DEBUG_FILESYSTEM, gyp.common.file_system_cache.Report())
 
   # Done
   return 0
@@ -0,0 +1,208 @@
+# Copyright (c) 2014 Google Inc. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""A compact binary file format for dependency graphs.
+
+The dump_dependency_json generator writes the graph as JSON by default,
+which for big trees is slow to write and to load.  This format stores
+each build file, target name and toolset once in a string table, and the
+edges as CSR arrays: for each node, an offset into one array of node
+indices.  The forward edges go to a node's dependencies and the reverse
+edges to its dependents.  Everything is little endian uint32.  The layout
+is:
+
+  header:          'GYPGRAPH', version, nodes, edges, strings, blob size
+  string offsets:  strings + 1 offsets into the blob
+  nodes:           build file, target name and toolset string of each node,
+                   sorted by qualified name
+  forward offsets: nodes + 1
+  forward indices: edges
+  reverse offsets: nodes + 1
+  reverse indices: edges
+  blob:            the UTF-8 strings, concatenated
+
+Graph memory-maps the file and reads only the parts that a query touches,
+so that finding the closure of a few targets doesn't load the whole graph.
+"""
+
+import mmap
+import struct
+
+import gyp.common
+
+MAGIC = b'GYPGRAPH'
+VERSION = 1
+
+_HEADER = struct.Struct('<8s5I')
+_UINT32 = 4
+
+
+def _Encode(string):
+  if isinstance(string, bytes):
+    return string
+  return string.encode('utf-8')
+
+
+def Write(f, edges):
+  """Writes a graph to the binary file object |f|.
+
+  |edges| maps each qualified target to the list of targets it depends on.
+  """
+  nodes = set(edges)
+  for dependencies in edges.values():
+    nodes.update(dependencies)
+  names = sorted(nodes, key=_Encode)
+  index = dict((name, i) for i, name in enumerate(names))
+
+  strings = {}
+  string_list = []
+  def Intern(string):
+    string = _Encode(string or '')
+    if string not in strings:
+      strings[string] = len(string_list)
+      string_list.append(string)
+    return strings[string]
+  Intern('')
+
+  node_strings = []
+  for name in names:
+    build_file, target, toolset = gyp.common.ParseQualifiedTarget(name)
+    node_strings.extend([Intern(build_file), Intern(target), Intern(toolset)])
+
+  string_offsets = [0]
+  for string in string_list:
+    string_offsets.append(string_offsets[-1] + len(string))
+
+  forward = [[] for _ in names]
+  reverse = [[] for _ in names]
+  for name, dependencies in edges.items():
+    for dependency in dependencies:
+      forward[index[name]].append(index[dependency])
+      reverse[index[dependency]].append(index[name])
+
+  def Csr(adjacency):
+    offsets = [0]
+    indices = []
+    for neighbors in adjacency:
+      indices.extend(sorted(neighbors))
+      offsets.append(len(indices))
+    return offsets + indices
+
+  def Array(values):
+    return struct.pack('<%dI' % len(values), *values)
+
+  edge_count = sum(len(dependencies) for dependencies in forward)
+  f.write(_HEADER.pack(MAGIC, VERSION, len(names), edge_count,
+                       len(string_list), string_offsets[-1]))
+  f.write(Array(string_offsets))
+  f.write(Array(node_strings))
+  f.write(Array(Csr(forward)))
+  f.write(Array(Csr(reverse)))
+  f.write(b''.join(string_list))
+
+
+def IsBinaryGraph(path):
+  """Returns whether the file at |path| is in this format."""
+  with open(path, 'rb') as f:
+    return f.read(len(MAGIC)) == MAGIC
+
+
+class Graph(object):
+  """A memory-mapped graph file.
+
+  Nodes are referred to by their index, which Find returns for a qualified
+  target name.
+  """
+
+  def __init__(self, path):
+    with open(path, 'rb') as f:
+      if f.read(len(MAGIC)) != MAGIC:
+        raise gyp.common.GypError('%s is not a graph file' % path)
+      self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    _, version, self._node_count, edge_count, string_count, _ = \
+        _HEADER.unpack_from(self._map, 0)
+    if version != VERSION:
+      self._map.close()
+      raise gyp.common.GypError('%s is a version %d graph file, not %d' %
+                                (path, version, VERSION))
+    offset = _HEADER.size
+    self._string_offsets = offset
+    offset += (string_count + 1) * _UINT32
+    self._nodes = offset
+    offset += self._node_count * 3 * _UINT32
+    self._forward_offsets = offset
+    offset += (self._node_count + 1) * _UINT32
+    self._forward_indices = offset
+    offset += edge_count * _UINT32
+    self._reverse_offsets = offset
+    offset += (self._node_count + 1) * _UINT32
+    self._reverse_indices = offset
+    offset += edge_count * _UINT32
+    self._blob = offset
+
+  def close(self):
+    self._map.close()
+
+  def __len__(self):
+    return self._node_count
+
+  def _Uint32s(self, offset, count):
+    return struct.unpack_from('<%dI' % count, self._map, offset)
+
+  def _String(self, string_id):
+    start, end = self._Uint32s(self._string_offsets + string_id * _UINT32, 2)
+    return self._map[self._blob + start:self._blob + end]
+
+  def _EncodedName(self, node):
+    build_file, target, toolset = [
+        self._String(string_id) for string_id in
+        self._Uint32s(self._nodes + node * 3 * _UINT32, 3)]
+    name = build_file + b':' + target
+    if toolset:
+      name += b'#' + toolset
+    return name
+
+  def Name(self, node):
+    """Returns the qualified target name of |node|."""
+    return self._EncodedName(node).decode('utf-8')
+
+  def Find(self, name):
+    """Returns the node of the qualified target |name|, or None."""
+    name = _Encode(name)
+    low, high = 0, self._node_count
+    while low < high:
+      middle = (low + high) // 2
+      if self._EncodedName(middle) < name:
+        low = middle + 1
+      else:
+        high = middle
+    if low < self._node_count and self._EncodedName(low) == name:
+      return low
+    return None
+
+  def _Neighbors(self, offsets, indices, node):
+    start, end = self._Uint32s(offsets + node * _UINT32, 2)
+    return list(self._Uint32s(indices + start * _UINT32, end - start))
+
+  def Dependencies(self, node):
+    """Returns the nodes that |node| depends on directly."""
+    return self._Neighbors(self._forward_offsets, self._forward_indices, node)
+
+  def Dependents(self, node):
+    """Returns the nodes that depend on |node| directly."""
+    return self._Neighbors(self._reverse_offsets, self._reverse_indices, node)
+
+  def Closure(self, nodes, reverse=False):
+    """Returns |nodes| and everything they depend on, or with |reverse|,
+    everything that depends on them, as a set of nodes."""
+    neighbors = reverse and self.Dependents or self.Dependencies
+    closure = set()
+    to_visit = list(nodes)
+    while to_visit:
+      node = to_visit.pop()
+      if node in closure:
+        continue
+      closure.add(node)
+      to_visit.extend(neighbors(node))
+    return closure
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014 Google Inc. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Unit tests for the binary_graph.py file."""
+
+import gyp.binary_graph
+import gyp.common
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class TestGraph(unittest.TestCase):
+  edges = {
+    'a/a.gyp:app#target': ['b/b.gyp:lib#target', 'b/b.gyp:gen#host'],
+    'b/b.gyp:lib#target': ['c/c.gyp:base#target'],
+    'b/b.gyp:gen#host': ['c/c.gyp:base#host'],
+    'c/c.gyp:base#target': [],
+    'd/d.gyp:other': ['c/c.gyp:base#target'],
+  }
+
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.path = os.path.join(self.tmp_dir, 'dump.bin')
+    with open(self.path, 'wb') as f:
+      gyp.binary_graph.Write(f, self.edges)
+    self.graph = gyp.binary_graph.Graph(self.path)
+
+  def tearDown(self):
+    self.graph.close()
+    shutil.rmtree(self.tmp_dir)
+
+  def names(self, nodes):
+    return sorted(self.graph.Name(node) for node in nodes)
+
+  def test_Nodes(self):
+    # c/c.gyp:base#host only appears as a dependency.
+    self.assertEqual(len(self.graph), 6)
+    for name in list(self.edges) + ['c/c.gyp:base#host']:
+      self.assertEqual(self.graph.Name(self.graph.Find(name)), name)
+    self.assertEqual(self.graph.Find('a/a.gyp:app'), None)
+    self.assertEqual(self.graph.Find('z/z.gyp:z#target'), None)
+
+  def test_Edges(self):
+    for name, dependencies in self.edges.items():
+      node = self.graph.Find(name)
+      self.assertEqual(self.names(self.graph.Dependencies(node)),
+                       sorted(dependencies))
+    base = self.graph.Find('c/c.gyp:base#target')
+    self.assertEqual(self.names(self.graph.Dependents(base)),
+                     ['b/b.gyp:lib#target', 'd/d.gyp:other'])
+
+  def test_Closure(self):
+    lib = self.graph.Find('b/b.gyp:lib#target')
+    self.assertEqual(self.names(self.graph.Closure([lib])),
+                     ['b/b.gyp:lib#target', 'c/c.gyp:base#target'])
+    self.assertEqual(self.names(self.graph.Closure([lib], reverse=True)),
+                     ['a/a.gyp:app#target', 'b/b.gyp:lib#target'])
+
+  def test_NotAGraph(self):
+    path = os.path.join(self.tmp_dir, 'dump.json')
+    with open(path, 'w') as f:
+      f.write('{}')
+    self.assertFalse(gyp.binary_graph.IsBinaryGraph(path))
+    self.assertTrue(gyp.binary_graph.IsBinaryGraph(self.path))
+    self.assertRaises(gyp.common.GypError, gyp.binary_graph.Graph, path)
+
+
+if __name__ == '__main__':
+  unittest.main()
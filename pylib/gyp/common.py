@@ -5,10 +5,11 @@
 from __future__ import with_statement
 
 import collections
-import errno
 import filecmp
 import os.path
 import re
+import stat
+import subprocess
 import tempfile
 import sys
 
@@ -130,6 +131,115 @@ def QualifiedTarget(build_file, target, toolset):
   return fully_qualified
 
 
+class FileSystemCache(object):
+  """Caches the file system queries of one gyp run.
+
+  Gyp asks about the same paths many times over (build files, realpaths of the
+  directories paths are made relative to, sources and output directories),
+  which adds up on slow file systems.  The results are kept until Reset(), and
+  dropped by Invalidate() for the paths gyp writes; WriteOnDiff,
+  EnsureDirExists and CopyTool do so.  Process pools inherit the cache at the
+  time they fork, but the lookups done in them aren't merged back.
+
+  Paths are made absolute against the working directory at the time of the
+  last Reset(), so gyp must not change it (except temporarily, without using
+  the cache meanwhile).  They are not normalized otherwise: 'link/..' need not
+  be the same directory as '.' once symlinks are resolved, so the queries get
+  the paths as they are given.
+  """
+
+  KINDS = ('stat', 'realpath', 'listdir')
+
+  def __init__(self):
+    self.Reset()
+
+  def Reset(self):
+    """Forgets everything, e.g. at the start of a run."""
+    self._cwd = os.getcwd()
+    self._stats = {}
+    self._realpaths = {}
+    self._listdirs = {}
+    # The keys of the lookups made so far, by normalized path, for Invalidate.
+    self._keys = {}
+    self.hits = dict((kind, 0) for kind in self.KINDS)
+    self.misses = dict((kind, 0) for kind in self.KINDS)
+
+  def _Key(self, path):
+    return os.path.join(self._cwd, path)
+
+  def _Lookup(self, kind, cache, path, query):
+    """Returns query(key), cached in cache.  Errors are cached as well, and
+    raised again on every lookup."""
+    key = self._Key(path)
+    try:
+      result = cache[key]
+      self.hits[kind] += 1
+    except KeyError:
+      self.misses[kind] += 1
+      try:
+        result = (query(key), None)
+      except OSError as e:
+        result = (None, e)
+      cache[key] = result
+      self._keys.setdefault(os.path.normpath(key), set()).add(key)
+    if result[1]:
+      raise result[1]
+    return result[0]
+
+  def Stat(self, path):
+    """Returns os.stat(path), or None if path doesn't exist."""
+    try:
+      return self._Lookup('stat', self._stats, path, os.stat)
+    except OSError:
+      return None
+
+  def Exists(self, path):
+    return self.Stat(path) is not None
+
+  def IsDir(self, path):
+    st = self.Stat(path)
+    return st is not None and stat.S_ISDIR(st.st_mode)
+
+  def IsFile(self, path):
+    st = self.Stat(path)
+    return st is not None and stat.S_ISREG(st.st_mode)
+
+  def GetSize(self, path):
+    """Like os.path.getsize, raises OSError if path doesn't exist."""
+    return self._Lookup('stat', self._stats, path, os.stat).st_size
+
+  def RealPath(self, path):
+    return self._Lookup('realpath', self._realpaths, path, os.path.realpath)
+
+  def ListDir(self, path):
+    """Like os.listdir, the returned list must not be modified."""
+    return self._Lookup('listdir', self._listdirs, path, os.listdir)
+
+  def Invalidate(self, path):
+    """Forgets what is known about path and its parent directories, which
+    gyp is about to change or just has."""
+    normalized = os.path.normpath(self._Key(path))
+    while True:
+      for key in self._keys.pop(normalized, ()):
+        self._stats.pop(key, None)
+        self._realpaths.pop(key, None)
+        self._listdirs.pop(key, None)
+      parent = os.path.dirname(normalized)
+      if parent == normalized:
+        break
+      normalized = parent
+
+  def Report(self):
+    """Returns a line with the hits and misses of each kind of query."""
+    return 'file system cache: ' + ', '.join(
+        '%s %d hits %d misses' % (kind, self.hits[kind], self.misses[kind])
+        for kind in self.KINDS)
+
+
+# The cache of the current gyp run.
+file_system_cache = FileSystemCache()
+
+
 @memoize
 def RelativePath(path, relative_to):
   # Assuming both |path| and |relative_to| are relative to the current
@@ -137,8 +247,8 @@ def RelativePath(path, relative_to):
   # relative_to.
 
   # Convert to normalized (and therefore absolute paths).
-  path = os.path.realpath(path)
-  relative_to = os.path.realpath(relative_to)
+  path = file_system_cache.RealPath(path)
+  relative_to = file_system_cache.RealPath(relative_to)
 
   # On Windows, we can't create a relative path to a different drive, so just
   # use the absolute path.
@@ -286,8 +396,19 @@ def EncodePOSIXShellList(list):
   return ' '.join(encoded_arguments)
 
 
-def DeepDependencyTargets(target_dicts, roots):
-  """Returns the recursive list of target dependencies."""
+def DeepDependencyTargets(target_dicts, roots, cache=None):
+  """Returns the recursive list of target dependencies.
+
+  If |cache| is given, it is a dict mapping a target to the frozenset of its
+  own recursive dependencies.  It is filled in as targets are visited and can
+  be shared between calls on the same target_dicts, so that callers asking
+  about many overlapping sets of roots only walk each subgraph once.
+  """
+  if cache is not None:
+    dependencies = set()
+    for r in roots:
+      dependencies.update(_CachedDeepDependencies(target_dicts, r, cache))
+    return list(dependencies - set(roots))
   dependencies = set()
   pending = set(roots)
   while pending:
@@ -305,6 +426,34 @@ def DeepDependencyTargets(target_dicts, roots):
   return list(dependencies - set(roots))
 
 
+def _CachedDeepDependencies(target_dicts, target, cache):
+  """Returns the frozenset of recursive dependencies of |target|.
+
+  Walks the graph like DeepDependencyTargets, but stops at targets already in
+  |cache| and reuses their result, then records the result for |target|.
+  """
+  if target in cache:
+    return cache[target]
+  dependencies = set()
+  spec = target_dicts[target]
+  pending = (spec.get('dependencies', []) +
+             spec.get('dependencies_original', []))
+  while pending:
+    r = pending.pop()
+    if r in dependencies:
+      continue
+    dependencies.add(r)
+    if r in cache:
+      dependencies.update(cache[r])
+    else:
+      spec = target_dicts[r]
+      pending.extend(spec.get('dependencies', []))
+      pending.extend(spec.get('dependencies_original', []))
+  dependencies = frozenset(dependencies)
+  cache[target] = dependencies
+  return dependencies
+
+
 def BuildFileTargets(target_list, build_file):
   """From a target_list, returns the subset from the specified build_file.
   """
@@ -330,8 +479,33 @@ def WriteOnDiff(filename):
   """
 
   class Writer(object):
-    """Wrapper around file which only covers the target if it differs."""
+    """Wrapper around file which only covers the target if it differs.
+
+    What is written is compared with the existing file as it comes in, and
+    the temporary file is only created once the two diverge.  Regenerating an
+    unchanged file therefore reads it once and writes nothing, and neither
+    version has to be held in memory.
+    """
     def __init__(self):
+      self.name = filename
+      # Used by print >> f in Python 2.
+      self.softspace = 0
+      self.tmp_file = None
+      self.tmp_path = None
+      self.existing = None
+      # Number of bytes written so far, all of which match the existing file
+      # as long as self.tmp_file is None.
+      self.matched = 0
+      # Whether the temporary file was created for something else than a
+      # difference, in which case the two files still need comparing.
+      self.compare_on_close = False
+      try:
+        self.existing = open(filename, 'rb')
+      except IOError:
+        self.existing = None
+        self._Diverge()
+
+    def _Diverge(self):
       # Pick temporary file.
       tmp_fd, self.tmp_path = tempfile.mkstemp(
           suffix='.tmp',
@@ -339,55 +513,115 @@ def WriteOnDiff(filename):
           dir=os.path.split(filename)[0])
       try:
         self.tmp_file = os.fdopen(tmp_fd, 'wb')
+        if self.existing:
+          # Carry over the part that was the same as the existing file.
+          self.existing.seek(0)
+          remaining = self.matched
+          while remaining:
+            chunk = self.existing.read(min(remaining, 1 << 16))
+            self.tmp_file.write(chunk)
+            remaining -= len(chunk)
+          self.existing.close()
+          self.existing = None
       except Exception:
         # Don't leave turds behind.
         os.unlink(self.tmp_path)
         raise
 
     def __getattr__(self, attrname):
-      # Delegate everything else to self.tmp_file
+      # Delegate everything else to the temporary file.
+      if self.tmp_file is None:
+        self._Diverge()
+        self.compare_on_close = True
       return getattr(self.tmp_file, attrname)
 
+    def __del__(self):
+      # Not closed, most likely because of an exception.
+      self.discard()
+
+    def tell(self):
+      if self.tmp_file is None:
+        return self.matched
+      return self.tmp_file.tell()
+
+    def write(self, data):
+      if self.tmp_file is None:
+        if self.existing.read(len(data)) == data:
+          self.matched += len(data)
+          return
+        self._Diverge()
+      self.tmp_file.write(data)
+
+    def writelines(self, lines):
+      for line in lines:
+        self.write(line)
+
+    def flush(self):
+      if self.tmp_file:
+        self.tmp_file.flush()
+
+    def __enter__(self):
+      return self
+
     def __exit__(self, type, value, traceback):
+      if type is None:
         self.close()
+      else:
+        self.discard()
+
+    def discard(self):
+      """Leaves the target alone and gets rid of the temporary file, if any."""
+      if self.existing:
+        self.existing.close()
+        self.existing = None
+      if self.tmp_file:
+        self.tmp_file.close()
+        os.unlink(self.tmp_path)
+        self.tmp_file = None
 
     def close(self):
+      if self.tmp_file is None:
+        if self.existing is None:
+          # Already closed.
+          return
+        same = not self.existing.read(1)
+        if same:
+          # The new file is identical to the old one, there's nothing to do.
+          self.existing.close()
+          self.existing = None
+          return
+        # The old file is longer than the new one.
+        self._Diverge()
+      tmp_file = self.tmp_file
+      self.tmp_file = None
       try:
         # Close tmp file.
-        self.tmp_file.close()
-        # Determine if different.
-        same = False
-        try:
-          same = filecmp.cmp(self.tmp_path, filename, False)
-        except OSError:
-          e = sys.exc_info()[1]
-          if e.errno != errno.ENOENT:
-            raise
-
-        if same:
-          # The new file is identical to the old one, just get rid of the new
-          # one.
+        tmp_file.close()
+        if (self.compare_on_close and os.path.exists(filename) and
+            filecmp.cmp(self.tmp_path, filename, False)):
+          # The new file is identical to the old one after all.
           os.unlink(self.tmp_path)
-        else:
-          # The new file is different from the old one, or there is no old one.
-          # Rename the new file to the permanent name.
-          #
-          # tempfile.mkstemp uses an overly restrictive mode, resulting in a
-          # file that can only be read by the owner, regardless of the umask.
-          # There's no reason to not respect the umask here, which means that
-          # an extra hoop is required to fetch it and reset the new file's mode.
-          #
-          # No way to get the umask without setting a new one?  Set a safe one
-          # and then set it back to the old value.
-          umask = os.umask(int('077', 8))
-          os.umask(umask)
-          os.chmod(self.tmp_path, int('0666', 8) & ~umask)
-          if sys.platform == 'win32' and os.path.exists(filename):
-            # NOTE: on windows (but not cygwin) rename will not replace an
-            # existing file, so it must be preceded with a remove. Sadly there
-            # is no way to make the switch atomic.
-            os.remove(filename)
-          os.rename(self.tmp_path, filename)
+          return
+        # The new file is different from the old one, or there is no old one.
+        # Rename the new file to the permanent name.
+        #
+        # tempfile.mkstemp uses an overly restrictive mode, resulting in a
+        # file that can only be read by the owner, regardless of the umask.
+        # There's no reason to not respect the umask here, which means that
+        # an extra hoop is required to fetch it and reset the new file's mode.
+        #
+        # No way to get the umask without setting a new one?  Set a safe one
+        # and then set it back to the old value.
+        umask = os.umask(int('077', 8))
+        os.umask(umask)
+        os.chmod(self.tmp_path, int('0666', 8) & ~umask)
+        file_system_cache.Invalidate(filename)
+        if sys.platform == 'win32' and os.path.exists(filename):
+          # NOTE: on windows (but not cygwin) rename will not replace an
+          # existing file, so it must be preceded with a remove. Sadly there
+          # is no way to make the switch atomic.
+          os.remove(filename)
+        os.rename(self.tmp_path, filename)
       except Exception:
         # Don't leave turds behind.
         os.unlink(self.tmp_path)
@@ -398,8 +632,12 @@ def WriteOnDiff(filename):
 
 def EnsureDirExists(path):
   """Make sure the directory for |path| exists."""
+  dirname = os.path.dirname(path)
+  if file_system_cache.IsDir(dirname):
+    return
+  file_system_cache.Invalidate(dirname)
   try:
-    os.makedirs(os.path.dirname(path))
+    os.makedirs(dirname)
   except OSError:
     pass
 
@@ -428,17 +666,19 @@ def GetFlavor(params):
   return 'linux'
 
 
-def CopyTool(flavor, out_path):
+def CopyTool(flavor, out_path, prefix=None):
   """Finds (flock|mac|win)_tool.gyp in the gyp directory and copies it
-  to |out_path|."""
+  to |out_path|.  |prefix| names the tool to copy when it is not the one that
+  |flavor| needs, e.g. 'flock'."""
   # aix and solaris just need flock emulation. mac and win use more complicated
   # support scripts.
-  prefix = {
-      'aix': 'flock',
-      'solaris': 'flock',
-      'mac': 'mac',
-      'win': 'win'
-      }.get(flavor, None)
+  if not prefix:
+    prefix = {
+        'aix': 'flock',
+        'solaris': 'flock',
+        'mac': 'mac',
+        'win': 'win'
+        }.get(flavor, None)
   if not prefix:
     return
 
@@ -450,6 +690,7 @@ def CopyTool(flavor, out_path):
 
   # Add header and write it out.
   tool_path = os.path.join(out_path, 'gyp-%s-tool' % prefix)
+  file_system_cache.Invalidate(tool_path)
   with open(tool_path, 'w') as tool_file:
     tool_file.write(
         ''.join([source[0], '# Generated by gyp. Do not edit.\n'] + source[1:]))
@@ -458,6 +699,59 @@ def CopyTool(flavor, out_path):
   os.chmod(tool_path, int('755', 8))
 
 
+def GetDefaultConcurrentLinks():
+  """Returns a best-guess for a number of concurrent links."""
+  pool_size = int(os.getenv('GYP_LINK_CONCURRENCY', 0))
+  if pool_size:
+    return pool_size
+
+  if sys.platform in ('win32', 'cygwin'):
+    import ctypes
+
+    class MEMORYSTATUSEX(ctypes.Structure):
+      _fields_ = [
+        ("dwLength", ctypes.c_ulong),
+        ("dwMemoryLoad", ctypes.c_ulong),
+        ("ullTotalPhys", ctypes.c_ulonglong),
+        ("ullAvailPhys", ctypes.c_ulonglong),
+        ("ullTotalPageFile", ctypes.c_ulonglong),
+        ("ullAvailPageFile", ctypes.c_ulonglong),
+        ("ullTotalVirtual", ctypes.c_ulonglong),
+        ("ullAvailVirtual", ctypes.c_ulonglong),
+        ("sullAvailExtendedVirtual", ctypes.c_ulonglong),
+      ]
+
+    stat = MEMORYSTATUSEX()
+    stat.dwLength = ctypes.sizeof(stat)
+    ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(stat))
+
+    mem_limit = max(1, stat.ullTotalPhys / (4 * (2 ** 30)))  # total / 4GB
+    hard_cap = max(1, int(os.getenv('GYP_LINK_CONCURRENCY_MAX', 2**32)))
+    return min(mem_limit, hard_cap)
+  elif sys.platform.startswith('linux'):
+    if os.path.exists("/proc/meminfo"):
+      with open("/proc/meminfo") as meminfo:
+        memtotal_re = re.compile(r'^MemTotal:\s*(\d*)\s*kB')
+        for line in meminfo:
+          match = memtotal_re.match(line)
+          if not match:
+            continue
+          # Allow 8Gb per link on Linux because Gold is quite memory hungry
+          return max(1, int(match.group(1)) / (8 * (2 ** 20)))
+    return 1
+  elif sys.platform == 'darwin':
+    try:
+      avail_bytes = int(subprocess.check_output(['sysctl', '-n', 'hw.memsize']))
+      # A static library debug build of Chromium's unit_tests takes ~2.7GB, so
+      # 4GB per ld process allows for some more bloat.
+      return max(1, avail_bytes / (4 * (2 ** 30)))  # total / 4GB
+    except:
+      return 1
+  else:
+    # TODO(scottmg): Implement this for other platforms.
+    return 1
+
+
 # From Alex Martelli,
 # http://aspn.activestate.com/ASPN/Cookbook/Python/Recipe/52560
 # ASPN: Python Cookbook: Remove duplicates from a sequence
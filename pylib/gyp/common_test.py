@@ -7,6 +7,9 @@
 """Unit tests for the common.py file."""
 
 import gyp.common
+import os
+import shutil
+import tempfile
 import unittest
 import sys
 
@@ -41,6 +44,209 @@ class TestTopologicallySorted(unittest.TestCase):
       graph.keys(), GetEdge)
 
 
+class TestDeepDependencyTargets(unittest.TestCase):
+  target_dicts = {
+      'a': {'dependencies': ['b', 'c']},
+      'b': {'dependencies': ['d']},
+      'c': {'dependencies': ['d'], 'dependencies_original': ['e']},
+      'd': {},
+      'e': {},
+      }
+
+  def test_Uncached(self):
+    self.assertEqual(
+      sorted(gyp.common.DeepDependencyTargets(self.target_dicts, ['a'])),
+      ['b', 'c', 'd', 'e'])
+    self.assertEqual(
+      sorted(gyp.common.DeepDependencyTargets(self.target_dicts, ['b', 'c'])),
+      ['d', 'e'])
+
+  def test_CachedMatchesUncached(self):
+    """Test that a shared cache gives the same answers as fresh walks."""
+    cache = {}
+    for roots in (['d'], ['c'], ['a'], ['b', 'c'], ['a', 'b'], ['e']):
+      self.assertEqual(
+        sorted(gyp.common.DeepDependencyTargets(self.target_dicts, roots,
+                                                cache)),
+        sorted(gyp.common.DeepDependencyTargets(self.target_dicts, roots)))
+    self.assertEqual(cache['a'], frozenset(['b', 'c', 'd', 'e']))
+
+
+class TestWriteOnDiff(unittest.TestCase):
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.path = os.path.join(self.tmp_dir, 'out.txt')
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def write(self, *chunks):
+    f = gyp.common.WriteOnDiff(self.path)
+    for chunk in chunks:
+      f.write(chunk)
+    f.close()
+
+  def read(self):
+    with open(self.path, 'rb') as f:
+      return f.read()
+
+  def test_NewFile(self):
+    self.write('abc', 'def')
+    self.assertEqual(self.read(), 'abcdef')
+    self.assertEqual(os.listdir(self.tmp_dir), ['out.txt'])
+
+  def test_Unchanged(self):
+    self.write('abcdef')
+    inode = os.stat(self.path).st_ino
+    self.write('ab', 'cd', 'ef')
+    self.assertEqual(os.stat(self.path).st_ino, inode)
+    self.assertEqual(self.read(), 'abcdef')
+
+  def test_Changed(self):
+    for old, new in (('abcdef', 'abcxef'),
+                     ('abcdef', 'abc'),
+                     ('abc', 'abcdef'),
+                     ('abcdef', '')):
+      self.write(old)
+      inode = os.stat(self.path).st_ino
+      self.write(*new)
+      self.assertNotEqual(os.stat(self.path).st_ino, inode)
+      self.assertEqual(self.read(), new)
+      self.assertEqual(os.listdir(self.tmp_dir), ['out.txt'])
+
+  def test_ExceptionDiscards(self):
+    self.write('abcdef')
+    try:
+      with gyp.common.WriteOnDiff(self.path) as f:
+        f.write('xyz')
+        raise ValueError
+    except ValueError:
+      pass
+    self.assertEqual(self.read(), 'abcdef')
+    self.assertEqual(os.listdir(self.tmp_dir), ['out.txt'])
+
+  def test_FileAttributes(self):
+    self.write('abcdef')
+    inode = os.stat(self.path).st_ino
+    f = gyp.common.WriteOnDiff(self.path)
+    f.write('abc')
+    self.assertEqual((f.name, f.softspace, f.tell()), (self.path, 0, 3))
+    f.write('def')
+    f.close()
+    self.assertEqual(os.stat(self.path).st_ino, inode)
+
+  def test_ComparedAgainWhenDelegating(self):
+    self.write('abcdef')
+    inode = os.stat(self.path).st_ino
+    f = gyp.common.WriteOnDiff(self.path)
+    f.write('abc')
+    f.fileno()
+    f.write('def')
+    f.close()
+    self.assertEqual(os.stat(self.path).st_ino, inode)
+    self.assertEqual(os.listdir(self.tmp_dir), ['out.txt'])
+
+  def test_UnclosedDiscards(self):
+    self.write('abcdef')
+    f = gyp.common.WriteOnDiff(self.path)
+    f.write('xyz')
+    del f
+    self.assertEqual(self.read(), 'abcdef')
+    self.assertEqual(os.listdir(self.tmp_dir), ['out.txt'])
+
+
+class TestFileSystemCache(unittest.TestCase):
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.cache = gyp.common.file_system_cache
+    self.cache.Reset()
+
+  def tearDown(self):
+    self.cache.Reset()
+    shutil.rmtree(self.tmp_dir)
+
+  def test_HitsAndMisses(self):
+    path = os.path.join(self.tmp_dir, 'file')
+    with open(path, 'w') as f:
+      f.write('abc')
+    self.assertTrue(self.cache.IsFile(path))
+    self.assertEqual(self.cache.GetSize(path), 3)
+    self.assertFalse(self.cache.IsDir(path))
+    self.assertTrue(self.cache.IsDir(self.tmp_dir))
+    self.assertEqual(self.cache.hits['stat'], 2)
+    self.assertEqual(self.cache.misses['stat'], 2)
+
+    self.assertEqual(self.cache.ListDir(self.tmp_dir), ['file'])
+    self.assertEqual(self.cache.ListDir(self.tmp_dir), ['file'])
+    # Other spellings of a path are looked up on their own, see
+    # test_SymlinksBeforeParentDirectories.
+    self.assertEqual(self.cache.ListDir(self.tmp_dir + '/.'), ['file'])
+    self.assertEqual((self.cache.hits['listdir'],
+                      self.cache.misses['listdir']), (1, 2))
+
+  def test_ErrorsAreCached(self):
+    path = os.path.join(self.tmp_dir, 'missing')
+    self.assertFalse(self.cache.Exists(path))
+    self.assertRaises(OSError, self.cache.GetSize, path)
+    self.assertRaises(OSError, self.cache.ListDir, path)
+    self.assertEqual(self.cache.hits['stat'], 1)
+    self.assertEqual(self.cache.misses['stat'], 1)
+
+  def test_WritesInvalidate(self):
+    path = os.path.join(self.tmp_dir, 'dir', 'file')
+    self.assertFalse(self.cache.Exists(path))
+    self.assertFalse(self.cache.IsDir(os.path.dirname(path)))
+    self.assertEqual(self.cache.ListDir(self.tmp_dir), [])
+
+    gyp.common.EnsureDirExists(path)
+    self.assertTrue(self.cache.IsDir(os.path.dirname(path)))
+    self.assertEqual(self.cache.ListDir(self.tmp_dir), ['dir'])
+    with gyp.common.WriteOnDiff(path) as f:
+      f.write('abc')
+    self.assertTrue(self.cache.Exists(path))
+    self.assertEqual(self.cache.ListDir(os.path.dirname(path)), ['file'])
+
+  def test_SymlinksBeforeParentDirectories(self):
+    # top/link/.. is real, not top.
+    top = os.path.join(self.tmp_dir, 'top')
+    os.makedirs(os.path.join(self.tmp_dir, 'real', 'inner'))
+    os.makedirs(top)
+    os.symlink(os.path.join(self.tmp_dir, 'real', 'inner'),
+               os.path.join(top, 'link'))
+    with open(os.path.join(self.tmp_dir, 'real', 'x.cc'), 'w') as f:
+      f.write('')
+    cwd = os.getcwd()
+    os.chdir(top)
+    try:
+      self.cache.Reset()
+      self.assertTrue(self.cache.Exists('link/../x.cc'))
+      self.assertFalse(self.cache.Exists('x.cc'))
+      self.assertEqual(self.cache.RealPath('link/../x.cc'),
+                       os.path.realpath(os.path.join(self.tmp_dir, 'real',
+                                                     'x.cc')))
+      self.assertEqual(gyp.common.RelativePath('link/../x.cc', '.'),
+                       os.path.join('..', 'real', 'x.cc'))
+    finally:
+      os.chdir(cwd)
+
+  def test_InvalidatesEverySpelling(self):
+    path = os.path.join(self.tmp_dir, 'file')
+    self.assertFalse(self.cache.Exists(path))
+    self.assertFalse(self.cache.Exists(self.tmp_dir + '/./file'))
+    with open(path, 'w') as f:
+      f.write('abc')
+    self.cache.Invalidate(path)
+    self.assertTrue(self.cache.Exists(self.tmp_dir + '/./file'))
+
+  def test_Report(self):
+    self.cache.RealPath(self.tmp_dir)
+    self.cache.RealPath(self.tmp_dir)
+    self.assertEqual(
+        self.cache.Report(),
+        'file system cache: stat 0 hits 0 misses, '
+        'realpath 1 hits 1 misses, listdir 0 hits 0 misses')
+
+
 class TestGetFlavor(unittest.TestCase):
   """Test that gyp.common.GetFlavor works as intended"""
   original_platform = ''
@@ -2,9 +2,10 @@
 # Use of this source code is governed by a BSD-style license that can be
 # found in the LICENSE file.
 
-import re
 import os
 
+import gyp.common
+
 
 def XmlToString(content, encoding='utf-8', pretty=False):
   """ Writes the XML content to disk, touching the file only if it has changed.
@@ -44,91 +45,126 @@ def XmlToString(content, encoding='utf-8', pretty=False):
   Returns:
     The XML content as a string.
   """
-  # We create a huge list of all the elements of the file.
-  xml_parts = ['<?xml version="1.0" encoding="%s"?>' % encoding]
-  if pretty:
-    xml_parts.append('\n')
-  _ConstructContentList(xml_parts, content, pretty)
-
-  # Convert it to a string
+  xml_parts = []
+  _WriteXml(xml_parts.append, content, encoding, pretty)
   return ''.join(xml_parts)
 
 
-def _ConstructContentList(xml_parts, specification, pretty, level=0):
-  """ Appends the XML parts corresponding to the specification.
+# Number of XML fragments accumulated by _XmlWriter before they are joined and
+# handed to the output in one write.
+_CHUNK_PARTS = 4096
 
-  Args:
-    xml_parts: A list of XML parts to be appended to.
-    specification:  The specification of the element.  See EasyXml docs.
-    pretty: True if we want pretty printing with indents and new lines.
-    level: Indentation level.
+
+class _XmlWriter(object):
+  """Streams EasyXml content to a write function in large chunks.
+
+  Only a bounded number of string fragments is held at any time, so writing a
+  document does not need several times its size in memory.
   """
-  # The first item in a specification is the name of the element.
+
+  def __init__(self, write, pretty):
+    self.write = write
+    self.pretty = pretty
+    self.parts = []
+    self.indentations = ['']
+
+  def Flush(self):
+    if self.parts:
+      self.write(''.join(self.parts))
+      del self.parts[:]
+
+  def _Indentation(self, level):
+    indentations = self.indentations
+    while len(indentations) <= level:
+      indentations.append('  ' * len(indentations))
+    return indentations[level]
+
+  def WriteElement(self, specification, level=0):
+    """ Appends the XML parts corresponding to the specification.
+
+    Args:
+      specification:  The specification of the element.  See EasyXml docs.
+      level: Indentation level.
+    """
+    parts = self.parts
+    # The first item in a specification is the name of the element.
+    if self.pretty:
+      indentation = self._Indentation(level)
+      new_line = '\n'
+    else:
+      indentation = ''
+      new_line = ''
+    name = specification[0]
+    if not isinstance(name, str):
+      raise Exception('The first item of an EasyXml specification should be '
+                      'a string.  Specification was ' + str(specification))
+    parts.append(indentation + '<' + name)
+
+    # Optionally in second position is a dictionary of the attributes.
+    rest = specification[1:]
+    if rest and isinstance(rest[0], dict):
+      for at, val in sorted(rest[0].items()):
+        parts.append(' %s="%s"' % (at, _XmlEscape(val, attr=True)))
+      rest = rest[1:]
+    if rest:
+      parts.append('>')
+      multi_line = False
+      for child_spec in rest:
+        if not isinstance(child_spec, str):
+          multi_line = True
+          break
+      if multi_line and new_line:
+        parts.append(new_line)
+      for child_spec in rest:
+        # If it's a string, append a text node.
+        # Otherwise recurse over that child definition
+        if isinstance(child_spec, str):
+          parts.append(_XmlEscape(child_spec))
+        else:
+          self.WriteElement(child_spec, level + 1)
+      if multi_line and indentation:
+        parts.append(indentation)
+      parts.append('</%s>%s' % (name, new_line))
+    else:
+      parts.append('/>%s' % new_line)
+    if len(parts) >= _CHUNK_PARTS:
+      self.Flush()
+
+
+def _WriteXml(write, content, encoding, pretty):
+  """ Streams the XML document for |content| to the |write| function."""
+  writer = _XmlWriter(write, pretty)
+  writer.parts.append('<?xml version="1.0" encoding="%s"?>' % encoding)
   if pretty:
-    indentation = '  ' * level
-    new_line = '\n'
-  else:
-    indentation = ''
-    new_line = ''
-  name = specification[0]
-  if not isinstance(name, str):
-    raise Exception('The first item of an EasyXml specification should be '
-                    'a string.  Specification was ' + str(specification))
-  xml_parts.append(indentation + '<' + name)
-
-  # Optionally in second position is a dictionary of the attributes.
-  rest = specification[1:]
-  if rest and isinstance(rest[0], dict):
-    for at, val in sorted(rest[0].items()):
-      xml_parts.append(' %s="%s"' % (at, _XmlEscape(val, attr=True)))
-    rest = rest[1:]
-  if rest:
-    xml_parts.append('>')
-    all_strings = reduce(lambda x, y: x and isinstance(y, str), rest, True)
-    multi_line = not all_strings
-    if multi_line and new_line:
-      xml_parts.append(new_line)
-    for child_spec in rest:
-      # If it's a string, append a text node.
-      # Otherwise recurse over that child definition
-      if isinstance(child_spec, str):
-       xml_parts.append(_XmlEscape(child_spec))
-      else:
-        _ConstructContentList(xml_parts, child_spec, pretty, level + 1)
-    if multi_line and indentation:
-      xml_parts.append(indentation)
-    xml_parts.append('</%s>%s' % (name, new_line))
-  else:
-    xml_parts.append('/>%s' % new_line)
+    writer.parts.append('\n')
+  writer.WriteElement(content)
+  writer.Flush()
 
 
 def WriteXmlIfChanged(content, path, encoding='utf-8', pretty=False,
                       win32=False):
   """ Writes the XML content to disk, touching the file only if it has changed.
 
+  The document is streamed through gyp.common.WriteOnDiff, which compares it
+  with the existing file as it is produced, so neither the new nor the old
+  content is ever held in memory as a whole.
+
   Args:
     content:  The structured content to be written.
     path: Location of the file.
     encoding: The encoding to report on the first line of the XML file.
     pretty: True if we want pretty printing with indents and new lines.
+    win32: True if the file should use '\\r\\n' line endings.
   """
-  xml_string = XmlToString(content, encoding, pretty)
-  if win32 and os.linesep != '\r\n':
-    xml_string = xml_string.replace('\n', '\r\n')
-
-  # Get the old content
-  try:
-    f = open(path, 'r')
-    existing = f.read()
-    f.close()
-  except:
-    existing = None
-
-  # It has changed, write it
-  if existing != xml_string:
-    f = open(path, 'w')
-    f.write(xml_string)
-    f.close()
+  f = gyp.common.WriteOnDiff(path)
+  # The file used to be written in text mode, which on Windows turns every
+  # '\n' into '\r\n' by itself.
+  if win32 or os.linesep == '\r\n':
+    write = lambda chunk: f.write(chunk.replace('\n', '\r\n'))
+  else:
+    write = f.write
+  _WriteXml(write, content, encoding, pretty)
+  f.close()
 
 
 _xml_escape_map = {
@@ -142,16 +178,21 @@ _xml_escape_map = {
 }
 
 
-_xml_escape_re = re.compile(
-    "(%s)" % "|".join(map(re.escape, _xml_escape_map.keys())))
+# The replacements done by _XmlEscape, in order.  '&' goes first so that the
+# entities introduced by the other replacements are not escaped again.
+_xml_escape_table = [('&', _xml_escape_map['&'])] + sorted(
+    (c, e) for c, e in _xml_escape_map.items() if c != '&')
+# Single quotes are left alone in attribute values.
+_xml_attr_escape_table = [(c, e) for c, e in _xml_escape_table if c != "'"]
 
 
 def _XmlEscape(value, attr=False):
   """ Escape a string for inclusion in XML."""
-  def replace(match):
-    m = match.string[match.start() : match.end()]
-    # don't replace single quotes in attrs
-    if attr and m == "'":
-      return m
-    return _xml_escape_map[m]
-  return _xml_escape_re.sub(replace, value)
+  if attr:
+    table = _xml_attr_escape_table
+  else:
+    table = _xml_escape_table
+  for char, escaped in table:
+    if char in value:
+      value = value.replace(char, escaped)
+  return value
@@ -7,6 +7,9 @@
 """ Unit tests for the easy_xml.py file. """
 
 import gyp.easy_xml as easy_xml
+import os
+import shutil
+import tempfile
 import unittest
 import StringIO
 
@@ -98,6 +101,36 @@ class TestSequenceFunctions(unittest.TestCase):
         ])
     self.assertEqual(xml, target)
 
+  def test_EasyXml_many_children(self):
+    # Enough elements for the writer to flush several chunks.
+    children = [['Item', {'Include': 'file%d.cc' % i}, 'a<b'] for i in
+                range(5000)]
+    self.assertEqual(
+      easy_xml.XmlToString(['ItemGroup'] + children, pretty=True),
+      '<?xml version="1.0" encoding="utf-8"?>\n<ItemGroup>\n' +
+      ''.join('  <Item Include="file%d.cc">a&lt;b</Item>\n' % i
+              for i in range(5000)) +
+      '</ItemGroup>\n')
+
+  def test_WriteXmlIfChanged(self):
+    tmp_dir = tempfile.mkdtemp()
+    try:
+      path = os.path.join(tmp_dir, 'test.xml')
+      content = ['test', ['child', 'text']]
+      easy_xml.WriteXmlIfChanged(content, path, pretty=True, win32=True)
+      with open(path, 'rb') as f:
+        self.assertEqual(
+          f.read(),
+          '<?xml version="1.0" encoding="utf-8"?>\r\n<test>\r\n'
+          '  <child>text</child>\r\n</test>\r\n')
+      inode = os.stat(path).st_ino
+      easy_xml.WriteXmlIfChanged(content, path, pretty=True, win32=True)
+      self.assertEqual(os.stat(path).st_ino, inode)
+      easy_xml.WriteXmlIfChanged(['test'], path, pretty=True, win32=True)
+      self.assertNotEqual(os.stat(path).st_ino, inode)
+    finally:
+      shutil.rmtree(tmp_dir)
+
 
 if __name__ == '__main__':
   unittest.main()
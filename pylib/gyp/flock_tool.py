@@ -4,29 +4,32 @@
 # found in the LICENSE file.
 
 """These functions are executed via gyp-flock-tool when using the Makefile
-generator.  Used on systems that don't have a built-in flock."""
+generator.  Used to limit the number of concurrent links, and on systems that
+don't have a built-in flock."""
 
+import errno
 import fcntl
 import os
 import struct
 import subprocess
 import sys
+import time
 
 
 def main(args):
   executor = FlockTool()
-  executor.Dispatch(args)
+  return executor.Dispatch(args)
 
 
 class FlockTool(object):
-  """This class emulates the 'flock' command."""
+  """This class emulates the 'flock' command, and a counting semaphore."""
   def Dispatch(self, args):
     """Dispatches a string command to a method."""
     if len(args) < 1:
       raise Exception("Not enough arguments")
 
     method = "Exec%s" % self._CommandifyName(args[0])
-    getattr(self, method)(*args[1:])
+    return getattr(self, method)(*args[1:])
 
   def _CommandifyName(self, name_string):
     """Transforms a tool name like copy-info-plist to CopyInfoPlist"""
@@ -39,7 +42,7 @@ class FlockTool(object):
     # where fcntl.flock(fd, LOCK_EX) always fails
     # with EBADF, that's why we use this F_SETLK
     # hack instead.
-    fd = os.open(lockfile, os.O_WRONLY|os.O_NOCTTY|os.O_CREAT, 0666)
+    fd = os.open(lockfile, os.O_WRONLY|os.O_NOCTTY|os.O_CREAT, 0o666)
     if sys.platform.startswith('aix'):
       # Python on AIX is compiled with LARGEFILE support, which changes the
       # struct size.
@@ -49,6 +52,33 @@ class FlockTool(object):
     fcntl.fcntl(fd, fcntl.F_SETLK, op)
     return subprocess.call(cmd_list)
 
+  def ExecSemaphore(self, slots, lockfile, *cmd_list):
+    """Runs cmd_list once it holds one of |slots| locks on lockfile, so that
+    at most |slots| commands sharing lockfile run at the same time.  A
+    |slots| that isn't a positive count, e.g. empty, stands for one."""
+    try:
+      slots = max(1, int(slots))
+    except ValueError:
+      slots = 1
+    fd = os.open(lockfile, os.O_WRONLY|os.O_NOCTTY|os.O_CREAT, 0o666)
+    # Every slot is a byte of lockfile.  Starting from a slot picked by the
+    # process id spreads the commands that start together over the slots.
+    first = os.getpid() % slots
+    delay = 0.01
+    while True:
+      for i in range(slots):
+        try:
+          fcntl.lockf(fd, fcntl.LOCK_EX|fcntl.LOCK_NB, 1, (first + i) % slots)
+        except IOError as e:
+          if e.errno not in (errno.EACCES, errno.EAGAIN):
+            raise
+          continue
+        return subprocess.call(cmd_list)
+      # All the slots are taken.  Poll for one to be released, since there is
+      # no way to wait for any of several locks at once.
+      time.sleep(delay)
+      delay = min(delay * 2, 0.1)
+
 
 if __name__ == '__main__':
   sys.exit(main(sys.argv[1:]))
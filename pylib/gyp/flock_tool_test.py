@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014 Google Inc. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Unit tests for the flock_tool.py file."""
+
+import gyp.flock_tool
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+
+# Holds the slots given on the command line until its stdin is closed.
+_HOLD_SLOTS = '''
+import fcntl, os, sys
+fd = os.open(sys.argv[1], os.O_WRONLY|os.O_CREAT)
+for slot in sys.argv[2:]:
+  fcntl.lockf(fd, fcntl.LOCK_EX, 1, int(slot))
+sys.stdout.write('locked\\n')
+sys.stdout.flush()
+sys.stdin.read()
+'''
+
+_RUN_FLOCK_TOOL = '''
+import sys, gyp.flock_tool
+sys.exit(gyp.flock_tool.main(sys.argv[1:]))
+'''
+
+
+class TestSemaphore(unittest.TestCase):
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.lockfile = os.path.join(self.tmp_dir, 'linker.lock')
+    self.holders = []
+
+  def tearDown(self):
+    for holder in self.holders:
+      holder.stdin.close()
+      holder.wait()
+    shutil.rmtree(self.tmp_dir)
+
+  def hold(self, *slots):
+    holder = subprocess.Popen(
+        [sys.executable, '-c', _HOLD_SLOTS, self.lockfile] +
+        [str(slot) for slot in slots],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    self.holders.append(holder)
+    self.assertEqual(holder.stdout.readline(), 'locked\n')
+    return holder
+
+  def pylib(self):
+    return os.path.abspath(
+        os.path.dirname(os.path.dirname(gyp.flock_tool.__file__)))
+
+  def semaphore(self, slots, *cmd_list):
+    return gyp.flock_tool.FlockTool().Dispatch(
+        ['semaphore', str(slots), self.lockfile] + list(cmd_list))
+
+  def test_ReturnsExitCode(self):
+    self.assertEqual(
+        self.semaphore(2, sys.executable, '-c', 'import sys; sys.exit(3)'), 3)
+    self.assertEqual(self.semaphore(2, 'true'), 0)
+
+  def test_EmptyOrZeroSlotsIsOne(self):
+    holder = self.hold(0)
+    waiter = subprocess.Popen(
+        [sys.executable, '-c', _RUN_FLOCK_TOOL,
+         'semaphore', '0', self.lockfile, 'true'],
+        env=dict(os.environ, PYTHONPATH=self.pylib()))
+    time.sleep(0.5)
+    self.assertEqual(waiter.poll(), None)
+    holder.stdin.close()
+    holder.wait()
+    self.holders.remove(holder)
+    self.assertEqual(waiter.wait(), 0)
+    # In this process, after the others are done with the lock.
+    for slots in ('', '0', '-1'):
+      self.assertEqual(self.semaphore(slots, 'true'), 0)
+
+  def test_TakesFreeSlot(self):
+    self.hold(0, 1, 3)
+    self.assertEqual(self.semaphore(4, 'true'), 0)
+
+  def test_WaitsForSlot(self):
+    holder = self.hold(0, 1)
+    done = os.path.join(self.tmp_dir, 'done')
+    waiter = subprocess.Popen(
+        [sys.executable, '-c', _RUN_FLOCK_TOOL,
+         'semaphore', '2', self.lockfile, 'touch', done],
+        env=dict(os.environ, PYTHONPATH=self.pylib()))
+    time.sleep(0.5)
+    self.assertEqual(waiter.poll(), None)
+    self.assertFalse(os.path.exists(done))
+    holder.stdin.close()
+    holder.wait()
+    self.holders.remove(holder)
+    self.assertEqual(waiter.wait(), 0)
+    self.assertTrue(os.path.exists(done))
+
+
+if __name__ == '__main__':
+  unittest.main()
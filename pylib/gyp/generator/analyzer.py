@@ -58,6 +58,9 @@ generator_supports_multiple_toolsets = True
 
 generator_wants_static_library_dependencies_adjusted = False
 
+# Only the included files of each build file are read from |data|.
+generator_build_file_data_keys = ['included_files']
+
 generator_default_variables = {
 }
 for dirname in ['INTERMEDIATE_DIR', 'SHARED_INTERMEDIATE_DIR', 'PRODUCT_DIR',
@@ -505,7 +508,8 @@ def CalculateVariables(default_variables, params):
     generator_additional_path_sections = getattr(msvs_generator,
         'generator_additional_path_sections', [])
 
-    gyp.msvs_emulation.CalculateCommonVariables(default_variables, params)
+    import gyp.msvs_emulation as msvs_emulation
+    msvs_emulation.CalculateCommonVariables(default_variables, params)
   else:
     operating_system = flavor
     if flavor == 'android':
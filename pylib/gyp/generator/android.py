@@ -56,6 +56,11 @@ generator_additional_non_configuration_keys = [
 generator_additional_path_sections = []
 generator_extra_sources_for_rules = []
 
+# Only the included files of each build file are read from |data|.
+generator_build_file_data_keys = ['included_files']
+
+generator_supports_jumbo = True
+
 
 ALL_MODULES_FOOTER = """\
 # "gyp_all_modules" is a concatenation of the "gyp_all_modules" targets from
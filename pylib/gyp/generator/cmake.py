@@ -28,12 +28,12 @@ not be able to find the header file directories described in the generated
 CMakeLists.txt file.
 """
 
-import multiprocessing
 import os
 import signal
 import string
 import subprocess
 import gyp.common
+from cStringIO import StringIO
 
 generator_default_variables = {
   'EXECUTABLE_PREFIX': '',
@@ -60,6 +60,11 @@ FULL_PATH_VARS = ('${CMAKE_SOURCE_DIR}', '${builddir}', '${obj}')
 generator_supports_multiple_toolsets = True
 generator_wants_static_library_dependencies_adjusted = True
 
+# Nothing is read from the build file dicts in |data|.
+generator_build_file_data_keys = []
+
+generator_supports_jumbo = True
+
 COMPILABLE_EXTENSIONS = {
   '.c': 'cc',
   '.cc': 'cxx',
@@ -1011,8 +1016,9 @@ def WriteTarget(namer, qualified_target, target_dicts, build_dir, config_to_use,
   UnsetVariable(output, 'TARGET')
 
 
-def GenerateOutputForConfig(target_list, target_dicts, data,
-                            params, config_to_use):
+def GetBuildDir(params, config_name):
+  """Returns the relative path from the source root to the output files of
+  config_name, e.g. "out/Debug"."""
   options = params['options']
   generator_flags = params['generator_flags']
 
@@ -1025,14 +1031,114 @@ def GenerateOutputForConfig(target_list, target_dicts, data,
   # output_dir: relative path from generator_dir to the build directory.
   output_dir = generator_flags.get('output_dir', 'out')
 
-  # build_dir: relative path from source root to our output files.
-  # e.g. "out/Debug"
-  build_dir = os.path.normpath(os.path.join(generator_dir,
-                                            output_dir,
-                                            config_to_use))
+  return os.path.normpath(os.path.join(generator_dir, output_dir, config_name))
+
+
+def GetAllQualifiedTargets(target_list, target_dicts, params):
+  """Returns the set of targets upon which the 'all' target should depend.
+
+  CMake has it's own implicit 'all' target, one is not created explicitly.
+  """
+  all_qualified_targets = set()
+  for build_file in params['build_files']:
+    for qualified_target in gyp.common.AllTargets(target_list,
+                                                  target_dicts,
+                                                  os.path.normpath(build_file)):
+      all_qualified_targets.add(qualified_target)
+  return all_qualified_targets
+
+
+def RenderTarget(namer, qualified_target, target_dicts, build_dir,
+                 config_to_use, options, generator_flags,
+                 all_qualified_targets):
+  """Returns the CMakeLists.txt fragment that WriteTarget writes."""
+  output = StringIO()
+  WriteTarget(namer, qualified_target, target_dicts, build_dir, config_to_use,
+              options, generator_flags, all_qualified_targets, output)
+  return output.getvalue()
+
+
+# The arguments RenderTarget shares across a pool, set by _InitTargetWorker.
+_target_worker_args = None
+
+
+def _InitTargetWorker(namer, target_dicts, options, generator_flags,
+                      all_qualified_targets):
+  # Ignore the interrupt signal so that the parent process catches it and
+  # kills all multiprocessing children.
+  signal.signal(signal.SIGINT, signal.SIG_IGN)
+  global _target_worker_args
+  _target_worker_args = (namer, target_dicts, options, generator_flags,
+                         all_qualified_targets)
+
+
+def _CallRenderTarget(job):
+  (namer, target_dicts, options, generator_flags,
+   all_qualified_targets) = _target_worker_args
+  qualified_target, build_dir, config_to_use = job
+  return RenderTarget(namer, qualified_target, target_dicts, build_dir,
+                      config_to_use, options, generator_flags,
+                      all_qualified_targets)
+
+
+def RenderTargets(jobs, namer, target_dicts, options, generator_flags,
+                  all_qualified_targets, parallel):
+  """Renders the CMakeLists.txt fragments of many targets.
+
+  Arguments:
+    jobs: list of (qualified_target, build_dir, config_to_use) tuples.
+    namer: the CMakeNamer of the whole target list.
+    target_dicts: dict of target specs, keyed by qualified target.
+    options: the gyp command line options.
+    generator_flags: dict of generator-specific flags.
+    all_qualified_targets: set of targets the 'all' target depends on.
+    parallel: whether to spread the targets across a pool of processes.
+  Returns:
+    A list with the fragment of each job, in the order of jobs.
+  """
+  processes = 1
+  if parallel:
+    import multiprocessing
+    processes = min(multiprocessing.cpu_count(), len(jobs))
+  if processes < 2:
+    return [RenderTarget(namer, qualified_target, target_dicts, build_dir,
+                         config_to_use, options, generator_flags,
+                         all_qualified_targets)
+            for qualified_target, build_dir, config_to_use in jobs]
+
+  # Each fragment only depends on its own target and the shared namer, so
+  # they can be rendered in any order and concatenated afterwards.
+  chunksize = max(1, len(jobs) // (processes * 4))
+  pool = multiprocessing.Pool(
+      processes, _InitTargetWorker,
+      (namer, target_dicts, options, generator_flags, all_qualified_targets))
+  try:
+    return pool.map(_CallRenderTarget, jobs, chunksize)
+  finally:
+    pool.terminate()
+    pool.join()
+
+
+def GenerateOutputForConfig(target_list, target_dicts, data,
+                            params, config_to_use, fragments=None):
+  """Writes the CMakeLists.txt of config_to_use.
+
+  fragments, if given, is the list of the rendered targets of target_list (as
+  returned by RenderTargets); otherwise they are rendered here.
+  """
+  options = params['options']
+  generator_flags = params['generator_flags']
 
+  build_dir = GetBuildDir(params, config_to_use)
   toplevel_build = os.path.join(options.toplevel_dir, build_dir)
 
+  if fragments is None:
+    fragments = RenderTargets(
+        [(qualified_target, build_dir, config_to_use)
+         for qualified_target in target_list],
+        CMakeNamer(target_list), target_dicts, options, generator_flags,
+        GetAllQualifiedTargets(target_list, target_dicts, params), False)
+
   output_file = os.path.join(toplevel_build, 'CMakeLists.txt')
   gyp.common.EnsureDirExists(output_file)
 
@@ -1066,41 +1172,14 @@ def GenerateOutputForConfig(target_list, target_dicts, data,
   output.write('set(CMAKE_CXX_OUTPUT_EXTENSION_REPLACE 1)\n')
   output.write('\n')
 
-  namer = CMakeNamer(target_list)
-
-  # The list of targets upon which the 'all' target should depend.
-  # CMake has it's own implicit 'all' target, one is not created explicitly.
-  all_qualified_targets = set()
-  for build_file in params['build_files']:
-    for qualified_target in gyp.common.AllTargets(target_list,
-                                                  target_dicts,
-                                                  os.path.normpath(build_file)):
-      all_qualified_targets.add(qualified_target)
-
-  for qualified_target in target_list:
-    WriteTarget(namer, qualified_target, target_dicts, build_dir, config_to_use,
-                options, generator_flags, all_qualified_targets, output)
+  output.write(''.join(fragments))
 
   output.close()
 
 
 def PerformBuild(data, configurations, params):
-  options = params['options']
-  generator_flags = params['generator_flags']
-
-  # generator_dir: relative path from pwd to where make puts build files.
-  # Makes migrating from make to cmake easier, cmake doesn't put anything here.
-  generator_dir = os.path.relpath(options.generator_output or '.')
-
-  # output_dir: relative path from generator_dir to the build directory.
-  output_dir = generator_flags.get('output_dir', 'out')
-
   for config_name in configurations:
-    # build_dir: relative path from source root to our output files.
-    # e.g. "out/Debug"
-    build_dir = os.path.normpath(os.path.join(generator_dir,
-                                              output_dir,
-                                              config_name))
+    build_dir = GetBuildDir(params, config_name)
     arguments = ['cmake', '-G', 'Ninja']
     print 'Generating [%s]: %s' % (config_name, arguments)
     subprocess.check_call(arguments, cwd=build_dir)
@@ -1110,34 +1189,29 @@ def PerformBuild(data, configurations, params):
     subprocess.check_call(arguments)
 
 
-def CallGenerateOutputForConfig(arglist):
-  # Ignore the interrupt signal so that the parent process catches it and
-  # kills all multiprocessing children.
-  signal.signal(signal.SIGINT, signal.SIG_IGN)
-
-  target_list, target_dicts, data, params, config_name = arglist
-  GenerateOutputForConfig(target_list, target_dicts, data, params, config_name)
-
-
 def GenerateOutput(target_list, target_dicts, data, params):
   user_config = params.get('generator_flags', {}).get('config', None)
   if user_config:
-    GenerateOutputForConfig(target_list, target_dicts, data,
-                            params, user_config)
+    config_names = [user_config]
   else:
     config_names = target_dicts[target_list[0]]['configurations'].keys()
-    if params['parallel']:
-      try:
-        pool = multiprocessing.Pool(len(config_names))
-        arglists = []
-        for config_name in config_names:
-          arglists.append((target_list, target_dicts, data,
-                           params, config_name))
-          pool.map(CallGenerateOutputForConfig, arglists)
-      except KeyboardInterrupt, e:
-        pool.terminate()
-        raise e
-    else:
-      for config_name in config_names:
-        GenerateOutputForConfig(target_list, target_dicts, data,
-                                params, config_name)
+
+  # Target names and the 'all' target do not depend on the configuration, so
+  # they are worked out once; every (configuration, target) fragment is then
+  # rendered independently, in parallel if allowed.
+  namer = CMakeNamer(target_list)
+  all_qualified_targets = GetAllQualifiedTargets(target_list, target_dicts,
+                                                 params)
+  jobs = []
+  for config_name in config_names:
+    build_dir = GetBuildDir(params, config_name)
+    jobs.extend((qualified_target, build_dir, config_name)
+                for qualified_target in target_list)
+  fragments = RenderTargets(jobs, namer, target_dicts, params['options'],
+                            params['generator_flags'], all_qualified_targets,
+                            params['parallel'])
+
+  for i, config_name in enumerate(config_names):
+    GenerateOutputForConfig(
+        target_list, target_dicts, data, params, config_name,
+        fragments[i * len(target_list):(i + 1) * len(target_list)])
@@ -6,7 +6,6 @@ import collections
 import os
 import gyp
 import gyp.common
-import gyp.msvs_emulation
 import json
 import sys
 
@@ -14,6 +13,8 @@ generator_supports_multiple_toolsets = True
 
 generator_wants_static_library_dependencies_adjusted = False
 
+generator_build_file_data_keys = []
+
 generator_default_variables = {
 }
 for dirname in ['INTERMEDIATE_DIR', 'SHARED_INTERMEDIATE_DIR', 'PRODUCT_DIR',
@@ -45,7 +46,8 @@ def CalculateVariables(default_variables, params):
     generator_additional_path_sections = getattr(msvs_generator,
         'generator_additional_path_sections', [])
 
-    gyp.msvs_emulation.CalculateCommonVariables(default_variables, params)
+    import gyp.msvs_emulation as msvs_emulation
+    msvs_emulation.CalculateCommonVariables(default_variables, params)
 
 
 def CalculateGeneratorInputInfo(params):
@@ -74,6 +76,16 @@ def GenerateOutput(target_list, target_dicts, data, params):
       edges[target].append(dep)
       targets_to_visit.append(dep)
 
+  # The generator flag dump_format=binary writes the compact format of
+  # gyp.binary_graph instead, which readers can query without loading it all.
+  if params.get('generator_flags', {}).get('dump_format') == 'binary':
+    import gyp.binary_graph
+    filename = 'dump.bin'
+    with gyp.common.WriteOnDiff(filename) as f:
+      gyp.binary_graph.Write(f, edges)
+    print 'Wrote binary graph to %s.' % filename
+    return
+
   filename = 'dump.json'
   f = open(filename, 'w')
   json.dump(edges, f)
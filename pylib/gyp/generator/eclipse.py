@@ -18,16 +18,19 @@ This generator has no automated tests, so expect it to be broken.
 """
 
 from xml.sax.saxutils import escape
+import json
 import os.path
 import subprocess
 import gyp
 import gyp.common
-import gyp.msvs_emulation
 import shlex
 import xml.etree.cElementTree as ET
 
 generator_wants_static_library_dependencies_adjusted = False
 
+# Only make_global_settings is read from the build file dicts in |data|.
+generator_build_file_data_keys = ['make_global_settings']
+
 generator_default_variables = {
 }
 
@@ -65,7 +68,8 @@ def CalculateVariables(default_variables, params):
     generator_additional_path_sections = getattr(msvs_generator,
         'generator_additional_path_sections', [])
 
-    gyp.msvs_emulation.CalculateCommonVariables(default_variables, params)
+    import gyp.msvs_emulation as msvs_emulation
+    msvs_emulation.CalculateCommonVariables(default_variables, params)
 
 
 def CalculateGeneratorInputInfo(params):
@@ -77,9 +81,88 @@ def CalculateGeneratorInputInfo(params):
     generator_wants_static_library_dependencies_adjusted = True
 
 
+class CompilerProbeCache(object):
+  """Remembers the output of running the compiler on an empty input.
+
+  Probes are keyed by the compiler command, the path, mtime and size of each
+  file the command names (so that upgrading the toolchain invalidates them)
+  and the probe flags, which include the language.  Results are kept in memory
+  and, if a path is given, in a JSON file that carries them across runs.
+  """
+
+  def __init__(self, path=None):
+    self.path = path
+    self.probes = {}
+    self.dirty = False
+    if path and os.path.exists(path):
+      try:
+        with open(path) as f:
+          probes = json.load(f)
+      except ValueError:
+        probes = {}
+      for key, outputs in probes.iteritems():
+        self.probes[key] = tuple(output.encode('utf-8') for output in outputs)
+
+  def _Key(self, command, flags):
+    """Returns the cache key for running command with flags, or None if the
+    compiler binary can't be found (and the probe is not cached)."""
+    files = []
+    for i, word in enumerate(command):
+      path = _FindExecutable(word)
+      if path:
+        stat = os.stat(path)
+        files.append([path, stat.st_mtime, stat.st_size])
+      elif i == 0:
+        return None
+    return json.dumps([command, files, flags])
+
+  def Run(self, compiler_path, flags):
+    """Returns the (stdout, stderr) of compiler_path run with flags on an empty
+    stdin, running it only if it wasn't already probed successfully."""
+    command = shlex.split(compiler_path)
+    key = self._Key(command, flags)
+    if key in self.probes:
+      return self.probes[key]
+    proc = subprocess.Popen(args=command + flags, stdin=subprocess.PIPE,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    outputs = proc.communicate()
+    # A failed probe may succeed next time, e.g. once the compiler is fixed.
+    if key and proc.returncode == 0:
+      self.probes[key] = outputs
+      self.dirty = True
+    return outputs
+
+  def Save(self):
+    """Writes the probes to disk, if there is a path and anything changed."""
+    if not self.path or not self.dirty:
+      return
+    gyp.common.EnsureDirExists(self.path)
+    with gyp.common.WriteOnDiff(self.path) as f:
+      json.dump(self.probes, f, sort_keys=True)
+    self.dirty = False
+
+
+def _FindExecutable(name):
+  """Returns the path of the executable file name refers to, searching PATH if
+  name has no directory part, or None if there is none."""
+  if os.path.dirname(name):
+    candidates = [name]
+  else:
+    candidates = [os.path.join(path_dir, name) for path_dir in
+                  os.environ.get('PATH', '').split(os.pathsep) if path_dir]
+  for candidate in candidates:
+    if os.path.isfile(candidate) and os.access(candidate, os.X_OK):
+      return os.path.abspath(candidate)
+  return None
+
+
+# Probes made without an explicit cache are only remembered for this run.
+_default_probe_cache = CompilerProbeCache()
+
+
 def GetAllIncludeDirectories(target_list, target_dicts,
                              shared_intermediate_dirs, config_name, params,
-                             compiler_path):
+                             compiler_path, probe_cache=None):
   """Calculate the set of include directories to be used.
 
   Returns:
@@ -92,11 +175,8 @@ def GetAllIncludeDirectories(target_list, target_dicts,
 
   # Find compiler's default include dirs.
   if compiler_path:
-    command = shlex.split(compiler_path)
-    command.extend(['-E', '-xc++', '-v', '-'])
-    proc = subprocess.Popen(args=command, stdin=subprocess.PIPE,
-                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    output = proc.communicate()[1]
+    probe_cache = probe_cache or _default_probe_cache
+    output = probe_cache.Run(compiler_path, ['-E', '-xc++', '-v', '-'])[1]
     # Extract the list of include dirs from the output, which has this format:
     #   ...
     #   #include "..." search starts here:
@@ -130,7 +210,8 @@ def GetAllIncludeDirectories(target_list, target_dicts,
       # TODO(jgreenwald): Change the gyp files to not abuse cflags for this, and
       # remove this.
       if flavor == 'win':
-        msvs_settings = gyp.msvs_emulation.MsvsSettings(target, generator_flags)
+        import gyp.msvs_emulation as msvs_emulation
+        msvs_settings = msvs_emulation.MsvsSettings(target, generator_flags)
         cflags = msvs_settings.GetCflags(config_name)
       else:
         cflags = config['cflags']
@@ -191,7 +272,7 @@ def GetCompilerPath(target_list, data, options):
 
 
 def GetAllDefines(target_list, target_dicts, data, config_name, params,
-                  compiler_path):
+                  compiler_path, probe_cache=None):
   """Calculate the defines for a project.
 
   Returns:
@@ -208,7 +289,8 @@ def GetAllDefines(target_list, target_dicts, data, config_name, params,
     target = target_dicts[target_name]
 
     if flavor == 'win':
-      msvs_settings = gyp.msvs_emulation.MsvsSettings(target, generator_flags)
+      import gyp.msvs_emulation as msvs_emulation
+      msvs_settings = msvs_emulation.MsvsSettings(target, generator_flags)
       extra_defines = msvs_settings.GetComputedDefines(config_name)
     else:
       extra_defines = []
@@ -229,11 +311,8 @@ def GetAllDefines(target_list, target_dicts, data, config_name, params,
   if flavor == 'win':
     return all_defines  # Default defines already processed in the loop above.
   if compiler_path:
-    command = shlex.split(compiler_path)
-    command.extend(['-E', '-dM', '-'])
-    cpp_proc = subprocess.Popen(args=command, cwd='.',
-                                stdin=subprocess.PIPE, stdout=subprocess.PIPE)
-    cpp_output = cpp_proc.communicate()[0]
+    probe_cache = probe_cache or _default_probe_cache
+    cpp_output = probe_cache.Run(compiler_path, ['-E', '-dM', '-'])[0]
     cpp_lines = cpp_output.split('\n')
     for cpp_line in cpp_lines:
       if not cpp_line.strip():
@@ -280,7 +359,7 @@ def WriteMacros(out, eclipse_langs, defines):
 
 
 def GenerateOutputForConfig(target_list, target_dicts, data, params,
-                            config_name):
+                            config_name, probe_cache=None):
   options = params['options']
   generator_flags = params.get('generator_flags', {})
 
@@ -303,7 +382,8 @@ def GenerateOutputForConfig(target_list, target_dicts, data, params,
                           os.path.join(toplevel_build,
                                        'eclipse-cdt-settings.xml'),
                           options,
-                          shared_intermediate_dirs)
+                          shared_intermediate_dirs,
+                          probe_cache)
   GenerateClasspathFile(target_list,
                         target_dicts,
                         options.toplevel_dir,
@@ -314,7 +394,7 @@ def GenerateOutputForConfig(target_list, target_dicts, data, params,
 
 def GenerateCdtSettingsFile(target_list, target_dicts, data, params,
                             config_name, out_name, options,
-                            shared_intermediate_dirs):
+                            shared_intermediate_dirs, probe_cache=None):
   gyp.common.EnsureDirExists(out_name)
   with open(out_name, 'w') as out:
     out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
@@ -325,10 +405,11 @@ def GenerateCdtSettingsFile(target_list, target_dicts, data, params,
     compiler_path = GetCompilerPath(target_list, data, options)
     include_dirs = GetAllIncludeDirectories(target_list, target_dicts,
                                             shared_intermediate_dirs,
-                                            config_name, params, compiler_path)
+                                            config_name, params, compiler_path,
+                                            probe_cache)
     WriteIncludePaths(out, eclipse_langs, include_dirs)
     defines = GetAllDefines(target_list, target_dicts, data, config_name,
-                            params, compiler_path)
+                            params, compiler_path, probe_cache)
     WriteMacros(out, eclipse_langs, defines)
 
     out.write('</cdtprojectproperties>\n')
@@ -413,13 +494,21 @@ def GenerateOutput(target_list, target_dicts, data, params):
   if params['options'].generator_output:
     raise NotImplementedError("--generator_output not implemented for eclipse")
 
-  user_config = params.get('generator_flags', {}).get('config', None)
+  generator_flags = params.get('generator_flags', {})
+  # The compiler is probed once per toolchain, not once per configuration and
+  # run: the results are kept next to the configurations' output.
+  probe_cache = CompilerProbeCache(
+      os.path.join(params['options'].toplevel_dir,
+                   generator_flags.get('output_dir', 'out'),
+                   'eclipse-compiler-probes.json'))
+  user_config = generator_flags.get('config', None)
   if user_config:
     GenerateOutputForConfig(target_list, target_dicts, data, params,
-                            user_config)
+                            user_config, probe_cache)
   else:
     config_names = target_dicts[target_list[0]]['configurations'].keys()
     for config_name in config_names:
       GenerateOutputForConfig(target_list, target_dicts, data, params,
-                              config_name)
+                              config_name, probe_cache)
+  probe_cache.Save()
 
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014 Google Inc. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+""" Unit tests for the eclipse.py file. """
+
+import gyp.generator.eclipse as eclipse
+import os
+import shutil
+import tempfile
+import unittest
+
+
+# Logs its arguments and prints a fixed probe result on stdout and stderr.
+_FAKE_COMPILER = '''#!/bin/sh
+echo "$@" >> "%(log)s"
+echo "#define FAKE 1"
+echo "#include <...> search starts here:" >&2
+echo " %(include)s" >&2
+echo "End of search list." >&2
+exit %(status)d
+'''
+
+
+class TestCompilerProbeCache(unittest.TestCase):
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.log = os.path.join(self.tmp_dir, 'log')
+    self.compiler = os.path.join(self.tmp_dir, 'fakecc')
+    self.cache_path = os.path.join(self.tmp_dir, 'out', 'probes.json')
+    self.write_compiler('/fake/include')
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def write_compiler(self, include, status=0):
+    with open(self.compiler, 'w') as f:
+      f.write(_FAKE_COMPILER % {'log': self.log, 'include': include,
+                                'status': status})
+    os.chmod(self.compiler, 0o755)
+
+  def calls(self):
+    if not os.path.exists(self.log):
+      return []
+    with open(self.log) as f:
+      return f.read().splitlines()
+
+  def probe(self, cache):
+    includes = eclipse.GetAllIncludeDirectories(
+        [], {}, [], 'Default', {}, self.compiler, cache)
+    defines = eclipse.GetAllDefines(
+        [], {}, {}, 'Default', {}, self.compiler, cache)
+    return includes, defines
+
+  def test_ProbesOncePerRun(self):
+    cache = eclipse.CompilerProbeCache()
+    self.assertEqual(self.probe(cache), (['/fake/include'], {'FAKE': '1'}))
+    self.assertEqual(self.probe(cache), (['/fake/include'], {'FAKE': '1'}))
+    self.assertEqual(self.calls(), ['-E -xc++ -v -', '-E -dM -'])
+
+  def test_ProbesPersist(self):
+    cache = eclipse.CompilerProbeCache(self.cache_path)
+    self.probe(cache)
+    cache.Save()
+    self.assertEqual(len(self.calls()), 2)
+
+    cache = eclipse.CompilerProbeCache(self.cache_path)
+    self.assertEqual(self.probe(cache), (['/fake/include'], {'FAKE': '1'}))
+    self.assertEqual(len(self.calls()), 2)
+
+  def test_CompilerChangeInvalidates(self):
+    cache = eclipse.CompilerProbeCache(self.cache_path)
+    self.probe(cache)
+    cache.Save()
+
+    self.write_compiler('/other/fake/include')
+    cache = eclipse.CompilerProbeCache(self.cache_path)
+    self.assertEqual(self.probe(cache)[0], ['/other/fake/include'])
+    self.assertEqual(len(self.calls()), 4)
+
+  def test_FailuresAreNotCached(self):
+    self.write_compiler('/fake/include', status=1)
+    cache = eclipse.CompilerProbeCache(self.cache_path)
+    self.probe(cache)
+    self.probe(cache)
+    self.assertEqual(len(self.calls()), 4)
+    cache.Save()
+    self.assertFalse(os.path.exists(self.cache_path))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -23,8 +23,10 @@
 
 import os
 import re
+import signal
 import sys
 import subprocess
+from cStringIO import StringIO
 import gyp
 import gyp.common
 import gyp.xcode_emulation
@@ -60,6 +62,13 @@ generator_additional_path_sections = []
 generator_extra_sources_for_rules = []
 generator_filelist_paths = None
 
+# The keys of the build file dicts in |data| that are read below; the rest of
+# |data| is dropped after loading.
+generator_build_file_data_keys = [
+    'included_files', 'make_global_settings', 'xcode_settings']
+
+generator_supports_jumbo = True
+
 
 def CalculateVariables(default_variables, params):
   """Calculate additional variables for use in the build (called by gyp)."""
@@ -279,12 +288,13 @@ CXXFLAGS.target ?= $(CXXFLAGS)
 LINK.target ?= %(LINK.target)s
 LDFLAGS.target ?= $(LDFLAGS)
 AR.target ?= $(AR)
-
+%(link_concurrency)s
 # C++ apps need to be linked with g++.
 #
-# Note: flock is used to seralize linking. Linking is a memory-intensive
+# Note: a lock is used to limit the number of concurrent links, to
+# GYP_LINK_CONCURRENCY (or to one, with flock). Linking is a memory-intensive
 # process so running parallel links can often lead to thrashing.  To disable
-# the serialization, override LINK via an envrionment variable as follows:
+# the limit, override LINK via an envrionment variable as follows:
 #
 #   export LINK=g++
 #
@@ -549,6 +559,39 @@ ifneq ($(d_files),)
 endif
 """
 
+# Replaces SHARED_FOOTER with the fast_startup generator flag.
+SHARED_FOOTER_FAST_STARTUP = """\
+# "all" is a concatenation of the "all" targets from all the included
+# sub-makefiles. This is just here to clarify.
+all:
+
+# Add in dependency-tracking rules.  $(all_deps) is the list of every single
+# target in our tree. Only consider the ones with .d (dependency) info.
+# Rather than including every .d file, the .d files of each directory are
+# merged into a d.mk database, which make brings up to date like any other
+# makefile before reading it.  The shell glob doing the merge skips hidden
+# files, so the .d files of hidden outputs are included directly.
+d_files := $(wildcard $(foreach f,$(all_deps),$(depsdir)/$(f).d))
+d_dirs := $(sort $(dir $(d_files)))
+define d_database_rule
+$(1)d.mk: $$(wildcard $(1)*.d)
+	@cat $(1)*.d > $$@
+endef
+$(foreach d,$(d_dirs),$(eval $(call d_database_rule,$(d))))
+d_hidden := $(foreach f,$(d_files),$(if $(filter .%,$(notdir $(f))),$(f)))
+ifneq ($(d_files),)
+  include $(addsuffix d.mk,$(d_dirs)) $(d_hidden)
+endif
+"""
+
+# The toolchain variables that the fast_startup generator flag turns into
+# simply expanded ones, on top of the make_global_settings.
+FAST_STARTUP_SIMPLE_VARIABLES = [
+    tool + '.' + toolset
+    for toolset in ('target', 'host')
+    for tool in ('CC', 'CFLAGS', 'CXX', 'CXXFLAGS', 'LINK', 'LDFLAGS', 'AR')
+] + ['LINK']
+
 header = """\
 # This file is generated by gyp; do not edit.
 
@@ -683,6 +726,14 @@ class MakefileWriter(object):
     self.generator_flags = generator_flags
     self.flavor = flavor
 
+    # The variable the outputs to read depfiles for are added to.  Appending
+    # to all_deps copies the whole list every time, so with fast_startup each
+    # target gets its own list, which GenerateOutput gathers into all_deps.
+    if generator_flags.get('fast_startup'):
+      self.deps_variable = 'target_deps'
+    else:
+      self.deps_variable = 'all_deps'
+
     self.suffix_rules_srcdir = {}
     self.suffix_rules_objdir1 = {}
     self.suffix_rules_objdir2 = {}
@@ -707,7 +758,7 @@ $(obj).$(TOOLSET)/$(TARGET)/%%.o: $(obj)/%%%s FORCE_DO_CMD
 
 
   def Write(self, qualified_target, base_path, output_filename, spec, configs,
-            part_of_all):
+            part_of_all, output=None):
     """The main entry point: writes a .mk file for a single target.
 
     Arguments:
@@ -717,24 +768,17 @@ $(obj).$(TOOLSET)/$(TARGET)/%%.o: $(obj)/%%%s FORCE_DO_CMD
       output_filename: output .mk file name to write
       spec, configs: gyp info
       part_of_all: flag indicating this target is part of 'all'
+      output: file object to write the target's rules to instead of creating
+              output_filename, without the header.  It is left open.
     """
-    gyp.common.EnsureDirExists(output_filename)
-
-    self.fp = open(output_filename, 'w')
-
-    self.fp.write(header)
-
-    self.qualified_target = qualified_target
-    self.path = base_path
-    self.target = spec['target_name']
-    self.type = spec['type']
-    self.toolset = spec['toolset']
-
-    self.is_mac_bundle = gyp.xcode_emulation.IsMacBundle(self.flavor, spec)
-    if self.flavor == 'mac':
-      self.xcode_settings = gyp.xcode_emulation.XcodeSettings(spec)
+    if output:
+      self.fp = output
     else:
-      self.xcode_settings = None
+      gyp.common.EnsureDirExists(output_filename)
+      self.fp = open(output_filename, 'w')
+      self.fp.write(header)
+
+    self._SetUpTarget(qualified_target, base_path, spec)
 
     deps, link_deps = self.ComputeDeps(spec)
 
@@ -747,24 +791,6 @@ $(obj).$(TOOLSET)/$(TARGET)/%%.o: $(obj)/%%%s FORCE_DO_CMD
     extra_mac_bundle_resources = []
     mac_bundle_deps = []
 
-    if self.is_mac_bundle:
-      self.output = self.ComputeMacBundleOutput(spec)
-      self.output_binary = self.ComputeMacBundleBinaryOutput(spec)
-    else:
-      self.output = self.output_binary = self.ComputeOutput(spec)
-
-    self.is_standalone_static_library = bool(
-        spec.get('standalone_static_library', 0))
-    self._INSTALLABLE_TARGETS = ('executable', 'loadable_module',
-                                 'shared_library')
-    if (self.is_standalone_static_library or
-        self.type in self._INSTALLABLE_TARGETS):
-      self.alias = os.path.basename(self.output)
-      install_path = self._InstallableTargetInstallPath()
-    else:
-      self.alias = self.output
-      install_path = self.output
-
     self.WriteLn("TOOLSET := " + self.toolset)
     self.WriteLn("TARGET := " + self.target)
 
@@ -803,19 +829,23 @@ $(obj).$(TOOLSET)/$(TARGET)/%%.o: $(obj)/%%%s FORCE_DO_CMD
               self.Pchify))
       sources = filter(Compilable, all_sources)
       if sources:
-        self.WriteLn(SHARED_HEADER_SUFFIX_RULES_COMMENT1)
-        extensions = set([os.path.splitext(s)[1] for s in sources])
-        for ext in extensions:
-          if ext in self.suffix_rules_srcdir:
-            self.WriteLn(self.suffix_rules_srcdir[ext])
-        self.WriteLn(SHARED_HEADER_SUFFIX_RULES_COMMENT2)
-        for ext in extensions:
-          if ext in self.suffix_rules_objdir1:
-            self.WriteLn(self.suffix_rules_objdir1[ext])
-        for ext in extensions:
-          if ext in self.suffix_rules_objdir2:
-            self.WriteLn(self.suffix_rules_objdir2[ext])
-        self.WriteLn('# End of this set of suffix rules')
+        if (self.generator_flags.get('fast_startup') and
+            not any('$(' in source for source in sources)):
+          self.WriteObjectRules(sources)
+        else:
+          self.WriteLn(SHARED_HEADER_SUFFIX_RULES_COMMENT1)
+          extensions = set([os.path.splitext(s)[1] for s in sources])
+          for ext in extensions:
+            if ext in self.suffix_rules_srcdir:
+              self.WriteLn(self.suffix_rules_srcdir[ext])
+          self.WriteLn(SHARED_HEADER_SUFFIX_RULES_COMMENT2)
+          for ext in extensions:
+            if ext in self.suffix_rules_objdir1:
+              self.WriteLn(self.suffix_rules_objdir1[ext])
+          for ext in extensions:
+            if ext in self.suffix_rules_objdir2:
+              self.WriteLn(self.suffix_rules_objdir2[ext])
+          self.WriteLn('# End of this set of suffix rules')
 
         # Add dependency from bundle to bundle binary.
         if self.is_mac_bundle:
@@ -824,6 +854,60 @@ $(obj).$(TOOLSET)/$(TARGET)/%%.o: $(obj)/%%%s FORCE_DO_CMD
     self.WriteTarget(spec, configs, deps, extra_link_deps + link_deps,
                      mac_bundle_deps, extra_outputs, part_of_all)
 
+    # Currently any versions have the same effect, but in future the behavior
+    # could be different.
+    if self.generator_flags.get('android_ndk_version', None):
+      self.WriteAndroidNdkModuleRule(self.target, all_sources, link_deps)
+
+    if not output:
+      self.fp.close()
+
+
+  def _SetUpTarget(self, qualified_target, base_path, spec):
+    """Sets up the attributes describing a target and where its outputs go.
+
+    Returns the location of the target's final output.
+    """
+    self.qualified_target = qualified_target
+    self.path = base_path
+    self.target = spec['target_name']
+    self.type = spec['type']
+    self.toolset = spec['toolset']
+
+    self.is_mac_bundle = gyp.xcode_emulation.IsMacBundle(self.flavor, spec)
+    if self.flavor == 'mac':
+      self.xcode_settings = gyp.xcode_emulation.XcodeSettings(spec)
+    else:
+      self.xcode_settings = None
+
+    if self.is_mac_bundle:
+      self.output = self.ComputeMacBundleOutput(spec)
+      self.output_binary = self.ComputeMacBundleBinaryOutput(spec)
+    else:
+      self.output = self.output_binary = self.ComputeOutput(spec)
+
+    self.is_standalone_static_library = bool(
+        spec.get('standalone_static_library', 0))
+    self._INSTALLABLE_TARGETS = ('executable', 'loadable_module',
+                                 'shared_library')
+    if (self.is_standalone_static_library or
+        self.type in self._INSTALLABLE_TARGETS):
+      self.alias = os.path.basename(self.output)
+      install_path = self._InstallableTargetInstallPath()
+    else:
+      self.alias = self.output
+      install_path = self.output
+    return install_path
+
+
+  def RecordTargetOutputs(self, qualified_target, base_path, spec):
+    """Records a target's outputs in target_outputs and target_link_deps.
+
+    Write() looks up the outputs of a target's dependencies there, so this has
+    to be done for every target before any .mk file is written.
+    """
+    install_path = self._SetUpTarget(qualified_target, base_path, spec)
+
     # Update global list of target outputs, used in dependency tracking.
     target_outputs[qualified_target] = install_path
 
@@ -831,13 +915,6 @@ $(obj).$(TOOLSET)/$(TARGET)/%%.o: $(obj)/%%%s FORCE_DO_CMD
     if self.type in ('static_library', 'shared_library'):
       target_link_deps[qualified_target] = self.output_binary
 
-    # Currently any versions have the same effect, but in future the behavior
-    # could be different.
-    if self.generator_flags.get('android_ndk_version', None):
-      self.WriteAndroidNdkModuleRule(self.target, all_sources, link_deps)
-
-    self.fp.close()
-
 
   def WriteSubMake(self, output_filename, makefile_path, targets, build_dir):
     """Write a "sub-project" Makefile.
@@ -1037,7 +1114,7 @@ $(obj).$(TOOLSET)/$(TARGET)/%%.o: $(obj)/%%%s FORCE_DO_CMD
           output = re.sub(variables_with_spaces, '', output)
           assert ' ' not in output, (
               "Spaces in rule filenames not yet supported (%s)"  % output)
-        self.WriteLn('all_deps += %s' % ' '.join(outputs))
+        self.WriteLn('%s += %s' % (self.deps_variable, ' '.join(outputs)))
 
         action = [self.ExpandInputRoot(ac, rule_source_root,
                                        rule_source_dirname)
@@ -1229,7 +1306,7 @@ $(obj).$(TOOLSET)/$(TARGET)/%%.o: $(obj)/%%%s FORCE_DO_CMD
           "Spaces in object filenames not supported (%s)"  % obj)
     self.WriteLn('# Add to the list of files we specially track '
                  'dependencies for.')
-    self.WriteLn('all_deps += $(OBJS)')
+    self.WriteLn('%s += $(OBJS)' % self.deps_variable)
     self.WriteLn()
 
     # Make sure our dependencies are built first.
@@ -1297,6 +1374,22 @@ $(obj).$(TOOLSET)/$(TARGET)/%%.o: $(obj)/%%%s FORCE_DO_CMD
 
     self.WriteLn()
 
+  def WriteObjectRules(self, sources):
+    """Writes an explicit rule for the object of each source file.
+
+    This takes the place of the suffix rules, which make would otherwise match
+    against every file it considers, for targets whose sources are all in the
+    source tree.
+    """
+    self.WriteLn('# Rules for the objects, in place of suffix rules.')
+    for source in sources:
+      source = self.Absolutify(source)
+      self.WriteLn('%s: $(srcdir)/%s FORCE_DO_CMD' %
+                   (self.Objectify(Target(source)), source))
+      self.WriteLn('\t@$(call do_cmd,%s,1)' %
+                   COMPILABLE_EXTENSIONS[os.path.splitext(source)[1]])
+    self.WriteLn()
+
   def WritePchTargets(self, pch_commands):
     """Writes make rules to compile prefix headers."""
     if not pch_commands:
@@ -1326,7 +1419,7 @@ $(obj).$(TOOLSET)/$(TARGET)/%%.o: $(obj)/%%%s FORCE_DO_CMD
       self.WriteLn('')
       assert ' ' not in gch, (
           "Spaces in gch filenames not supported (%s)"  % gch)
-      self.WriteLn('all_deps += %s' % gch)
+      self.WriteLn('%s += %s' % (self.deps_variable, gch))
       self.WriteLn('')
 
 
@@ -1702,7 +1795,7 @@ $(obj).$(TOOLSET)/$(TARGET)/%%.o: $(obj)/%%%s FORCE_DO_CMD
     # spaces with ? because escaping doesn't work with make's $(sort) and
     # other functions.
     outputs = [QuoteSpaces(o, SPACE_REPLACEMENT) for o in outputs]
-    self.WriteLn('all_deps += %s' % ' '.join(outputs))
+    self.WriteLn('%s += %s' % (self.deps_variable, ' '.join(outputs)))
 
 
   def WriteMakeRule(self, outputs, inputs, actions=None, comment=None,
@@ -1936,6 +2029,85 @@ $(obj).$(TOOLSET)/$(TARGET)/%%.o: $(obj)/%%%s FORCE_DO_CMD
     return '$(builddir)/' + self.alias
 
 
+# The arguments shared by every _CallWriteMakefile call in a worker process,
+# set once per worker by _InitMakefileWorker.
+_makefile_worker_args = None
+
+
+def _InitMakefileWorker(target_dicts, generator_flags, flavor, outputs,
+                        link_deps, prefix):
+  # Ignore the interrupt signal so that the parent process catches it and
+  # kills all multiprocessing children.
+  signal.signal(signal.SIGINT, signal.SIG_IGN)
+  global _makefile_worker_args, target_outputs, target_link_deps
+  global srcdir_prefix
+  _makefile_worker_args = (target_dicts, generator_flags, flavor)
+  # Workers that are not forked from the generator start out with a fresh
+  # copy of this module.
+  target_outputs = outputs
+  target_link_deps = link_deps
+  srcdir_prefix = prefix
+
+
+def _WriteMakefile(target_dicts, generator_flags, flavor, qualified_target,
+                   base_path, output_file, part_of_all):
+  spec = target_dicts[qualified_target]
+  writer = MakefileWriter(generator_flags, flavor)
+  if generator_flags.get('fast_startup'):
+    # The rules end up in a .mk file shared with the other targets of the
+    # same .gyp file, which GenerateOutput writes.
+    output = StringIO()
+    writer.Write(qualified_target, base_path, output_file, spec,
+                 spec['configurations'], part_of_all=part_of_all,
+                 output=output)
+    return output.getvalue()
+  writer.Write(qualified_target, base_path, output_file, spec,
+               spec['configurations'], part_of_all=part_of_all)
+
+
+def _CallWriteMakefile(makefile):
+  target_dicts, generator_flags, flavor = _makefile_worker_args
+  return _WriteMakefile(target_dicts, generator_flags, flavor, *makefile)
+
+
+def _WriteMakefiles(makefiles, target_dicts, generator_flags, flavor,
+                    parallel):
+  """Writes the .mk files of all the targets.
+
+  Arguments:
+    makefiles: list of (qualified_target, base_path, output_file, part_of_all)
+               tuples, one per target.
+    target_dicts: dict of target specs, keyed by qualified target.
+    generator_flags: dict of generator-specific flags.
+    flavor: the flavor of the build.
+    parallel: whether to spread the .mk files across a pool of processes.
+  Returns:
+    A list with the rules of each target, in the order of makefiles, if the
+    fast_startup generator flag is set.  Nothing is written in that case.
+  """
+  processes = 1
+  if parallel:
+    import multiprocessing
+    processes = min(multiprocessing.cpu_count(), len(makefiles))
+  if processes < 2:
+    return [_WriteMakefile(target_dicts, generator_flags, flavor, *makefile)
+            for makefile in makefiles]
+
+  # Once target_outputs and target_link_deps are complete, each .mk file only
+  # depends on its own target, so they can be written in any order.
+  chunksize = max(1, len(makefiles) // (processes * 4))
+  pool = multiprocessing.Pool(
+      processes, _InitMakefileWorker,
+      (target_dicts, generator_flags, flavor, target_outputs, target_link_deps,
+       srcdir_prefix))
+  try:
+    return pool.map(_CallWriteMakefile, makefiles, chunksize)
+  finally:
+    # Every .mk file has been written (or one of them failed) by now.
+    pool.terminate()
+    pool.join()
+
+
 def WriteAutoRegenerationRule(params, root_makefile, makefile_name,
                               build_files):
   """Write the target to regenerate the Makefile."""
@@ -1979,6 +2151,8 @@ def GenerateOutput(target_list, target_dicts, data, params):
   builddir_name = generator_flags.get('output_dir', 'out')
   android_ndk_version = generator_flags.get('android_ndk_version', None)
   default_target = generator_flags.get('default_target', 'all')
+  # Trades the per-target .mk files for output that GNU make reads faster.
+  fast_startup = generator_flags.get('fast_startup', False)
 
   def CalculateMakefilePath(build_file, base_name):
     """Determine where to write a Makefile for a given gyp file."""
@@ -2020,13 +2194,26 @@ def GenerateOutput(target_list, target_dicts, data, params):
     srcdir = gyp.common.RelativePath(srcdir, options.generator_output)
     srcdir_prefix = '$(srcdir)/'
 
-  flock_command= 'flock'
+  # Links are wrapped in a counting semaphore, which lets as many of them run at
+  # once as the ninja generator's link_pool does.  That number depends on the
+  # machine the Makefile is generated on, so it can be overridden at build time.
+  flock_command = './gyp-flock-tool semaphore $(GYP_LINK_CONCURRENCY)'
+  link_concurrency = (
+      '\n'
+      '# The number of links that can run at once.  The default is worked out\n'
+      '# from the memory of the machine that generated this Makefile, and is\n'
+      '# also used for 0 or an empty value, as gyp does.\n'
+      'GYP_LINK_CONCURRENCY ?= %(links)d\n'
+      'ifeq ($(filter-out 0,$(GYP_LINK_CONCURRENCY)),)\n'
+      '  override GYP_LINK_CONCURRENCY := %(links)d\n'
+      'endif\n' % {'links': gyp.common.GetDefaultConcurrentLinks()})
   header_params = {
       'default_target': default_target,
       'builddir': builddir_name,
       'default_configuration': default_configuration,
       'flock': flock_command,
       'flock_index': 1,
+      'link_concurrency': link_concurrency,
       'link_commands': LINK_COMMANDS_LINUX,
       'extra_commands': '',
       'srcdir': srcdir,
@@ -2035,6 +2222,7 @@ def GenerateOutput(target_list, target_dicts, data, params):
     flock_command = './gyp-mac-tool flock'
     header_params.update({
         'flock': flock_command,
+        'link_concurrency': '',
         'flock_index': 2,
         'link_commands': LINK_COMMANDS_MAC,
         'extra_commands': SHARED_HEADER_MAC_COMMANDS,
@@ -2043,21 +2231,16 @@ def GenerateOutput(target_list, target_dicts, data, params):
     header_params.update({
         'link_commands': LINK_COMMANDS_ANDROID,
     })
-  elif flavor == 'solaris':
-    header_params.update({
-        'flock': './gyp-flock-tool flock',
-        'flock_index': 2,
-    })
   elif flavor == 'freebsd':
-    # Note: OpenBSD has sysutils/flock. lockf seems to be FreeBSD specific.
+    # lockf seems to be FreeBSD specific.
+    flock_command = 'lockf'
     header_params.update({
-        'flock': 'lockf',
+        'flock': flock_command,
+        'link_concurrency': '',
     })
   elif flavor == 'aix':
     header_params.update({
         'link_commands': LINK_COMMANDS_AIX,
-        'flock': './gyp-flock-tool flock',
-        'flock_index': 2,
     })
 
   header_params.update({
@@ -2107,6 +2290,16 @@ def GenerateOutput(target_list, target_dicts, data, params):
   gyp.common.EnsureDirExists(makefile_path)
   root_makefile = open(makefile_path, 'w')
   root_makefile.write(SHARED_HEADER % header_params)
+  if fast_startup:
+    # Recursively expanded variables are expanded again every time a command
+    # line refers to them.  Now that their final values are known, expand the
+    # toolchain settings once and for all.
+    root_makefile.write('# Expand the toolchain settings only once.\n')
+    simple_variables = FAST_STARTUP_SIMPLE_VARIABLES + [
+        setting[0] for setting in make_global_settings_array
+        if not setting[0].endswith('_wrapper')]
+    for variable in gyp.common.uniquer(simple_variables):
+      root_makefile.write('%s := $(%s)\n' % (variable, variable))
   # Currently any versions have the same effect, but in future the behavior
   # could be different.
   if android_ndk_version:
@@ -2121,6 +2314,8 @@ def GenerateOutput(target_list, target_dicts, data, params):
   # Put build-time support tools next to the root Makefile.
   dest_path = os.path.dirname(makefile_path)
   gyp.common.CopyTool(flavor, dest_path)
+  if flock_command.startswith('./gyp-flock-tool'):
+    gyp.common.CopyTool(flavor, dest_path, 'flock')
 
   # Find the list of targets that derive from the gyp file(s) being built.
   needed_targets = set()
@@ -2128,8 +2323,13 @@ def GenerateOutput(target_list, target_dicts, data, params):
     for target in gyp.common.AllTargets(target_list, target_dicts, build_file):
       needed_targets.add(target)
 
+  # The .mk files are written in two passes: the first one collects the
+  # outputs of every target, which the .mk files of their dependents refer to,
+  # and the second one writes the .mk files themselves.  With fast_startup,
+  # the targets of each .gyp file share a single .mk file instead.
   build_files = set()
   include_list = set()
+  makefiles = []
   for qualified_target in target_list:
     build_file, target, toolset = gyp.common.ParseQualifiedTarget(
         qualified_target)
@@ -2157,18 +2357,22 @@ def GenerateOutput(target_list, target_dicts, data, params):
       else:
         build_files.add(relative_include_file)
 
-    base_path, output_file = CalculateMakefilePath(build_file,
-        target + '.' + toolset + options.suffix + '.mk')
+    if fast_startup:
+      base_path, output_file = CalculateMakefilePath(build_file,
+          os.path.basename(build_file) + options.suffix + '.mk')
+    else:
+      base_path, output_file = CalculateMakefilePath(build_file,
+          target + '.' + toolset + options.suffix + '.mk')
 
     spec = target_dicts[qualified_target]
-    configs = spec['configurations']
 
     if flavor == 'mac':
       gyp.xcode_emulation.MergeGlobalXcodeSettingsToSpec(data[build_file], spec)
 
     writer = MakefileWriter(generator_flags, flavor)
-    writer.Write(qualified_target, base_path, output_file, spec, configs,
-                 part_of_all=qualified_target in needed_targets)
+    writer.RecordTargetOutputs(qualified_target, base_path, spec)
+    makefiles.append((qualified_target, base_path, output_file,
+                      qualified_target in needed_targets))
 
     # Our root_makefile lives at the source root.  Compute the relative path
     # from there to the output_file for including.
@@ -2176,6 +2380,23 @@ def GenerateOutput(target_list, target_dicts, data, params):
                                               os.path.dirname(makefile_path))
     include_list.add(mkfile_rel_path)
 
+  target_rules = _WriteMakefiles(makefiles, target_dicts, generator_flags,
+                                 flavor, params['parallel'])
+  if fast_startup:
+    # Each target's list of outputs to read depfiles for is kept in a
+    # variable of its own, see MakefileWriter.deps_variable.
+    rules_by_file = {}
+    for index, makefile in enumerate(makefiles):
+      output_file = makefile[2]
+      rules_by_file.setdefault(output_file, []).append(
+          'target_deps :=\n%starget_deps_%d := $(target_deps)\n' %
+          (target_rules[index], index))
+    for output_file, rules in rules_by_file.iteritems():
+      gyp.common.EnsureDirExists(output_file)
+      with open(output_file, 'w') as fp:
+        fp.write(header)
+        fp.write('\n'.join(rules))
+
   # Write out per-gyp (sub-project) Makefiles.
   depth_rel_path = gyp.common.RelativePath(options.depth, os.getcwd())
   for build_file in build_files:
@@ -2193,6 +2414,7 @@ def GenerateOutput(target_list, target_dicts, data, params):
         os.path.splitext(os.path.basename(build_file))[0] + '.Makefile')
     makefile_rel_path = gyp.common.RelativePath(os.path.dirname(makefile_path),
                                                 os.path.dirname(output_file))
+    writer = MakefileWriter(generator_flags, flavor)
     writer.WriteSubMake(output_file, makefile_rel_path, gyp_targets,
                         builddir_name)
 
@@ -2216,6 +2438,11 @@ def GenerateOutput(target_list, target_dicts, data, params):
       and generator_flags.get('auto_regeneration', True)):
     WriteAutoRegenerationRule(params, root_makefile, makefile_name, build_files)
 
-  root_makefile.write(SHARED_FOOTER)
+  if fast_startup:
+    root_makefile.write('all_deps := %s\n\n' % ' '.join(
+        '$(target_deps_%d)' % index for index in range(len(makefiles))))
+    root_makefile.write(SHARED_FOOTER_FAST_STARTUP)
+  else:
+    root_makefile.write(SHARED_FOOTER)
 
   root_makefile.close()
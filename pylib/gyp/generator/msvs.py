@@ -7,6 +7,7 @@ import ntpath
 import os
 import posixpath
 import re
+import signal
 import subprocess
 import sys
 
@@ -72,12 +73,18 @@ generator_additional_path_sections = [
     'msvs_props',
 ]
 
+# Only the names of the build files are read from |data|.
+generator_build_file_data_keys = []
+
+generator_supports_jumbo = True
+
 
 generator_additional_non_configuration_keys = [
     'msvs_cygwin_dirs',
     'msvs_cygwin_shell',
     'msvs_large_pdb',
     'msvs_shard',
+    'msvs_shard_size',
     'msvs_external_builder',
     'msvs_external_builder_out_dir',
     'msvs_external_builder_build_cmd',
@@ -130,8 +137,6 @@ def _GetDomainAndUserName():
     cached_username = username
   return (cached_domain, cached_username)
 
-fixpath_prefix = None
-
 
 def _NormalizedSource(source):
   """Normalize the path.
@@ -151,11 +156,13 @@ def _NormalizedSource(source):
   return source
 
 
-def _FixPath(path):
+def _FixPath(path, fixpath_prefix):
   """Convert paths to a form that will make sense in a vcproj file.
 
   Arguments:
     path: The path to convert, may contain / etc.
+    fixpath_prefix: prefix joined to relative paths (the project's
+        fixpath_prefix), or None.
   Returns:
     The path with all slashes made into backslashes.
   """
@@ -168,9 +175,9 @@ def _FixPath(path):
   return path
 
 
-def _FixPaths(paths):
+def _FixPaths(paths, fixpath_prefix):
   """Fix each of the paths of the list."""
-  return [_FixPath(i) for i in paths]
+  return [_FixPath(i, fixpath_prefix) for i in paths]
 
 
 def _ConvertSourcesToFilterHierarchy(sources, prefix=None, excluded=None,
@@ -283,7 +290,7 @@ def _ConfigFullName(config_name, config_data):
 
 
 def _BuildCommandLineForRuleRaw(spec, cmd, cygwin_shell, has_input_path,
-                                quote_cmd, do_setup_env):
+                                quote_cmd, do_setup_env, fixpath_prefix):
 
   if [x for x in cmd if '$(InputDir)' in x]:
     input_dir_preamble = (
@@ -296,7 +303,8 @@ def _BuildCommandLineForRuleRaw(spec, cmd, cygwin_shell, has_input_path,
 
   if cygwin_shell:
     # Find path to cygwin.
-    cygwin_dir = _FixPath(spec.get('msvs_cygwin_dirs', ['.'])[0])
+    cygwin_dir = _FixPath(spec.get('msvs_cygwin_dirs', ['.'])[0],
+                          fixpath_prefix)
     # Prepare command.
     direct_cmd = cmd
     direct_cmd = [i.replace('$(IntDir)',
@@ -345,7 +353,8 @@ def _BuildCommandLineForRuleRaw(spec, cmd, cygwin_shell, has_input_path,
     #              for arguments like "--arg=path" or "/opt:path".
     # If the argument starts with a slash or dash, it's probably a command line
     # switch
-    arguments = [i if (i[:1] in "/-") else _FixPath(i) for i in cmd[1:]]
+    arguments = [i if (i[:1] in "/-") else _FixPath(i, fixpath_prefix)
+                 for i in cmd[1:]]
     arguments = [i.replace('$(InputDir)', '%INPUTDIR%') for i in arguments]
     arguments = [MSVSSettings.FixVCMacroSlashes(i) for i in arguments]
     if quote_cmd:
@@ -357,7 +366,8 @@ def _BuildCommandLineForRuleRaw(spec, cmd, cygwin_shell, has_input_path,
     return input_dir_preamble + ' '.join(command + arguments)
 
 
-def _BuildCommandLineForRule(spec, rule, has_input_path, do_setup_env):
+def _BuildCommandLineForRule(spec, rule, has_input_path, do_setup_env,
+                             fixpath_prefix):
   # Currently this weird argument munging is used to duplicate the way a
   # python script would need to be run as part of the chrome tree.
   # Eventually we should add some sort of rule_default option to set this
@@ -369,7 +379,8 @@ def _BuildCommandLineForRule(spec, rule, has_input_path, do_setup_env):
     mcs = int(mcs)
   quote_cmd = int(rule.get('msvs_quote_cmd', 1))
   return _BuildCommandLineForRuleRaw(spec, rule['action'], mcs, has_input_path,
-                                     quote_cmd, do_setup_env=do_setup_env)
+                                     quote_cmd, do_setup_env=do_setup_env,
+                                     fixpath_prefix=fixpath_prefix)
 
 
 def _AddActionStep(actions_dict, inputs, outputs, description, command):
@@ -408,7 +419,8 @@ def _AddActionStep(actions_dict, inputs, outputs, description, command):
 
 
 def _AddCustomBuildToolForMSVS(p, spec, primary_input,
-                               inputs, outputs, description, cmd):
+                               inputs, outputs, description, cmd,
+                               fixpath_prefix):
   """Add a custom build tool to execute something.
 
   Arguments:
@@ -420,8 +432,8 @@ def _AddCustomBuildToolForMSVS(p, spec, primary_input,
     description: description of the action
     cmd: command line to execute
   """
-  inputs = _FixPaths(inputs)
-  outputs = _FixPaths(outputs)
+  inputs = _FixPaths(inputs, fixpath_prefix)
+  outputs = _FixPaths(outputs, fixpath_prefix)
   tool = MSVSProject.Tool(
       'VCCustomBuildTool',
       {'Description': description,
@@ -431,11 +443,11 @@ def _AddCustomBuildToolForMSVS(p, spec, primary_input,
       })
   # Add to the properties of primary input for each config.
   for config_name, c_data in spec['configurations'].items():
-    p.AddFileConfig(_FixPath(primary_input),
+    p.AddFileConfig(_FixPath(primary_input, fixpath_prefix),
                     _ConfigFullName(config_name, c_data), tools=[tool])
 
 
-def _AddAccumulatedActionsToMSVS(p, spec, actions_dict):
+def _AddAccumulatedActionsToMSVS(p, spec, actions_dict, fixpath_prefix):
   """Add actions accumulated into an actions_dict, merging as needed.
 
   Arguments:
@@ -462,7 +474,7 @@ def _AddAccumulatedActionsToMSVS(p, spec, actions_dict):
                                inputs=inputs,
                                outputs=outputs,
                                description=description,
-                               cmd=command)
+                               cmd=command, fixpath_prefix=fixpath_prefix)
 
 
 def _RuleExpandPath(path, input_file):
@@ -496,7 +508,7 @@ def _FindRuleTriggerFiles(rule, sources):
   return rule.get('rule_sources', [])
 
 
-def _RuleInputsAndOutputs(rule, trigger_file):
+def _RuleInputsAndOutputs(rule, trigger_file, fixpath_prefix):
   """Find the inputs and outputs generated by a rule.
 
   Arguments:
@@ -505,8 +517,8 @@ def _RuleInputsAndOutputs(rule, trigger_file):
   Returns:
     The pair of (inputs, outputs) involved in this rule.
   """
-  raw_inputs = _FixPaths(rule.get('inputs', []))
-  raw_outputs = _FixPaths(rule.get('outputs', []))
+  raw_inputs = _FixPaths(rule.get('inputs', []), fixpath_prefix)
+  raw_outputs = _FixPaths(rule.get('outputs', []), fixpath_prefix)
   inputs = OrderedSet()
   outputs = OrderedSet()
   inputs.add(trigger_file)
@@ -517,7 +529,8 @@ def _RuleInputsAndOutputs(rule, trigger_file):
   return (inputs, outputs)
 
 
-def _GenerateNativeRulesForMSVS(p, rules, output_dir, spec, options):
+def _GenerateNativeRulesForMSVS(p, rules, output_dir, spec, options,
+                                fixpath_prefix):
   """Generate a native rules file.
 
   Arguments:
@@ -535,13 +548,14 @@ def _GenerateNativeRulesForMSVS(p, rules, output_dir, spec, options):
   for r in rules:
     rule_name = r['rule_name']
     rule_ext = r['extension']
-    inputs = _FixPaths(r.get('inputs', []))
-    outputs = _FixPaths(r.get('outputs', []))
+    inputs = _FixPaths(r.get('inputs', []), fixpath_prefix)
+    outputs = _FixPaths(r.get('outputs', []), fixpath_prefix)
     # Skip a rule with no action and no inputs.
     if 'action' not in r and not r.get('rule_sources', []):
       continue
     cmd = _BuildCommandLineForRule(spec, r, has_input_path=True,
-                                   do_setup_env=True)
+                                   do_setup_env=True,
+                                   fixpath_prefix=fixpath_prefix)
     rules_file.AddCustomBuildRule(name=rule_name,
                                   description=r.get('message', rule_name),
                                   extensions=[rule_ext],
@@ -562,7 +576,7 @@ def _Cygwinify(path):
 
 
 def _GenerateExternalRules(rules, output_dir, spec,
-                           sources, options, actions_to_add):
+                           sources, options, actions_to_add, fixpath_prefix):
   """Generate an external makefile to do a set of rules.
 
   Arguments:
@@ -586,7 +600,7 @@ def _GenerateExternalRules(rules, output_dir, spec,
   for rule in rules:
     trigger_files = _FindRuleTriggerFiles(rule, sources)
     for tf in trigger_files:
-      inputs, outputs = _RuleInputsAndOutputs(rule, tf)
+      inputs, outputs = _RuleInputsAndOutputs(rule, tf, fixpath_prefix)
       all_inputs.update(OrderedSet(inputs))
       all_outputs.update(OrderedSet(outputs))
       # Only use one target from each rule as the dependency for
@@ -608,7 +622,7 @@ def _GenerateExternalRules(rules, output_dir, spec,
     trigger_files = _FindRuleTriggerFiles(rule, sources)
     for tf in trigger_files:
       # Get all the inputs and outputs for this rule for this trigger file.
-      inputs, outputs = _RuleInputsAndOutputs(rule, tf)
+      inputs, outputs = _RuleInputsAndOutputs(rule, tf, fixpath_prefix)
       inputs = [_Cygwinify(i) for i in inputs]
       outputs = [_Cygwinify(i) for i in outputs]
       # Prepare the command line for this rule.
@@ -629,14 +643,15 @@ def _GenerateExternalRules(rules, output_dir, spec,
          'IntDir=$(IntDir)',
          '-j', '${NUMBER_OF_PROCESSORS_PLUS_1}',
          '-f', filename]
-  cmd = _BuildCommandLineForRuleRaw(spec, cmd, True, False, True, True)
+  cmd = _BuildCommandLineForRuleRaw(spec, cmd, True, False, True, True,
+                                    fixpath_prefix)
   # Insert makefile as 0'th input, so it gets the action attached there,
   # as this is easier to understand from in the IDE.
   all_inputs = list(all_inputs)
   all_inputs.insert(0, filename)
   _AddActionStep(actions_to_add,
-                 inputs=_FixPaths(all_inputs),
-                 outputs=_FixPaths(all_outputs),
+                 inputs=_FixPaths(all_inputs, fixpath_prefix),
+                 outputs=_FixPaths(all_outputs, fixpath_prefix),
                  description='Running external rules for %s' %
                      spec['target_name'],
                  command=cmd)
@@ -793,7 +808,7 @@ def _EscapeCppDefineForMSBuild(s):
 
 def _GenerateRulesForMSVS(p, output_dir, options, spec,
                           sources, excluded_sources,
-                          actions_to_add):
+                          actions_to_add, fixpath_prefix):
   """Generate all the rules for a particular project.
 
   Arguments:
@@ -811,16 +826,19 @@ def _GenerateRulesForMSVS(p, output_dir, options, spec,
 
   # Handle rules that use a native rules file.
   if rules_native:
-    _GenerateNativeRulesForMSVS(p, rules_native, output_dir, spec, options)
+    _GenerateNativeRulesForMSVS(p, rules_native, output_dir, spec, options,
+                                fixpath_prefix)
 
   # Handle external rules (non-native rules).
   if rules_external:
     _GenerateExternalRules(rules_external, output_dir, spec,
-                           sources, options, actions_to_add)
-  _AdjustSourcesForRules(rules, sources, excluded_sources, False)
+                           sources, options, actions_to_add, fixpath_prefix)
+  _AdjustSourcesForRules(rules, sources, excluded_sources, False,
+                         fixpath_prefix)
 
 
-def _AdjustSourcesForRules(rules, sources, excluded_sources, is_msbuild):
+def _AdjustSourcesForRules(rules, sources, excluded_sources, is_msbuild,
+                           fixpath_prefix):
   # Add outputs generated by each rule (if applicable).
   for rule in rules:
     # Add in the outputs from this rule.
@@ -829,20 +847,22 @@ def _AdjustSourcesForRules(rules, sources, excluded_sources, is_msbuild):
       # Remove trigger_file from excluded_sources to let the rule be triggered
       # (e.g. rule trigger ax_enums.idl is added to excluded_sources
       # because it's also in an action's inputs in the same project)
-      excluded_sources.discard(_FixPath(trigger_file))
+      excluded_sources.discard(_FixPath(trigger_file, fixpath_prefix))
       # Done if not processing outputs as sources.
       if int(rule.get('process_outputs_as_sources', False)):
-        inputs, outputs = _RuleInputsAndOutputs(rule, trigger_file)
-        inputs = OrderedSet(_FixPaths(inputs))
-        outputs = OrderedSet(_FixPaths(outputs))
-        inputs.remove(_FixPath(trigger_file))
+        inputs, outputs = _RuleInputsAndOutputs(rule, trigger_file,
+                                                fixpath_prefix)
+        inputs = OrderedSet(_FixPaths(inputs, fixpath_prefix))
+        outputs = OrderedSet(_FixPaths(outputs, fixpath_prefix))
+        inputs.remove(_FixPath(trigger_file, fixpath_prefix))
         sources.update(inputs)
         if not is_msbuild:
           excluded_sources.update(inputs)
         sources.update(outputs)
 
 
-def _FilterActionsFromExcluded(excluded_sources, actions_to_add):
+def _FilterActionsFromExcluded(excluded_sources, actions_to_add,
+                               fixpath_prefix):
   """Take inputs with actions attached out of the list of exclusions.
 
   Arguments:
@@ -851,7 +871,7 @@ def _FilterActionsFromExcluded(excluded_sources, actions_to_add):
   Returns:
     excluded_sources with files that have actions attached removed.
   """
-  must_keep = OrderedSet(_FixPaths(actions_to_add.keys()))
+  must_keep = OrderedSet(_FixPaths(actions_to_add.keys(), fixpath_prefix))
   return [s for s in excluded_sources if s not in must_keep]
 
 
@@ -924,6 +944,67 @@ def _GenerateProject(project, options, version, generator_flags):
     return _GenerateMSVSProject(project, options, version, generator_flags)
 
 
+# The arguments shared by every _CallGenerateProject call in a worker process,
+# set once per worker by _InitProjectWorker.
+_project_worker_args = None
+
+
+def _InitProjectWorker(project_objects, options, version, generator_flags):
+  # Ignore the interrupt signal so that the parent process catches it and
+  # kills all multiprocessing children.
+  signal.signal(signal.SIGINT, signal.SIG_IGN)
+  global _project_worker_args
+  _project_worker_args = (project_objects, options, version, generator_flags)
+
+
+def _CallGenerateProject(qualified_target):
+  project_objects, options, version, generator_flags = _project_worker_args
+  return _GenerateProject(project_objects[qualified_target], options, version,
+                          generator_flags)
+
+
+def _GenerateProjects(project_objects, options, version, generator_flags,
+                      parallel):
+  """Generates the project files of all the projects.
+
+  Arguments:
+    project_objects: dict of MSVSProject objects, keyed by qualified target.
+    options: global generator options.
+    version: the MSVSVersion object.
+    generator_flags: dict of generator-specific flags.
+    parallel: whether to spread the projects across a pool of processes.
+  Returns:
+    A list of source files that cannot be found on disk.
+  """
+  if not parallel or len(project_objects) < 2:
+    missing_sources = []
+    for project in project_objects.values():
+      missing_sources.extend(_GenerateProject(project, options, version,
+                                              generator_flags))
+    return missing_sources
+
+  # Each project only writes its own files, so they can be generated in any
+  # order.  The project objects are handed to each worker once, and the work
+  # items are just the qualified target names.
+  import multiprocessing
+  qualified_targets = sorted(project_objects)
+  processes = min(multiprocessing.cpu_count(), len(qualified_targets))
+  chunksize = max(1, len(qualified_targets) // (processes * 4))
+  pool = multiprocessing.Pool(
+      processes, _InitProjectWorker,
+      (project_objects, options, version, generator_flags))
+  try:
+    results = pool.map(_CallGenerateProject, qualified_targets, chunksize)
+  finally:
+    # Every project has been written (or one of them failed) by now.
+    pool.terminate()
+    pool.join()
+  missing_sources = []
+  for missing in results:
+    missing_sources.extend(missing)
+  return missing_sources
+
+
 # TODO: Avoid code duplication with _ValidateSourcesForOSX in make.py.
 def _ValidateSourcesForMSVSProject(spec, version):
   """Makes sure if duplicate basenames are not specified in the source list.
@@ -970,6 +1051,7 @@ def _GenerateMSVSProject(project, options, version, generator_flags):
     generator_flags: dict of generator-specific flags.
   """
   spec = project.spec
+  fixpath_prefix = project.fixpath_prefix
   gyp.common.EnsureDirExists(project.path)
 
   platforms = _GetUniquePlatforms(spec)
@@ -983,7 +1065,8 @@ def _GenerateMSVSProject(project, options, version, generator_flags):
 
   config_type = _GetMSVSConfigurationType(spec, project.build_file)
   for config_name, config in spec['configurations'].items():
-    _AddConfigurationToMSVSProject(p, spec, config_type, config_name, config)
+    _AddConfigurationToMSVSProject(p, spec, config_type, config_name, config,
+                                   fixpath_prefix)
 
   # MSVC08 and prior version cannot handle duplicate basenames in the same
   # target.
@@ -999,30 +1082,31 @@ def _GenerateMSVSProject(project, options, version, generator_flags):
   actions_to_add = {}
   _GenerateRulesForMSVS(p, project_dir, options, spec,
                         sources, excluded_sources,
-                        actions_to_add)
+                        actions_to_add, fixpath_prefix)
   list_excluded = generator_flags.get('msvs_list_excluded_files', True)
   sources, excluded_sources, excluded_idl = (
       _AdjustSourcesAndConvertToFilterHierarchy(spec, options, project_dir,
                                                 sources, excluded_sources,
-                                                list_excluded, version))
+                                                list_excluded, version,
+                                                fixpath_prefix))
 
   # Add in files.
   missing_sources = _VerifySourcesExist(sources, project_dir)
   p.AddFiles(sources)
 
   _AddToolFilesToMSVS(p, spec)
-  _HandlePreCompiledHeaders(p, sources, spec)
-  _AddActions(actions_to_add, spec, relative_path_of_gyp_file)
-  _AddCopies(actions_to_add, spec)
+  _HandlePreCompiledHeaders(p, sources, spec, fixpath_prefix)
+  _AddActions(actions_to_add, spec, relative_path_of_gyp_file, fixpath_prefix)
+  _AddCopies(actions_to_add, spec, fixpath_prefix)
   _WriteMSVSUserFile(project.path, version, spec)
 
   # NOTE: this stanza must appear after all actions have been decided.
   # Don't excluded sources with actions attached, or they won't run.
   excluded_sources = _FilterActionsFromExcluded(
-      excluded_sources, actions_to_add)
+      excluded_sources, actions_to_add, fixpath_prefix)
   _ExcludeFilesFromBeingBuilt(p, spec, excluded_sources, excluded_idl,
-                              list_excluded)
-  _AddAccumulatedActionsToMSVS(p, spec, actions_to_add)
+                              list_excluded, fixpath_prefix)
+  _AddAccumulatedActionsToMSVS(p, spec, actions_to_add, fixpath_prefix)
 
   # Write it out.
   p.WriteIfChanged()
@@ -1094,7 +1178,8 @@ def _GetMSVSConfigurationType(spec, build_file):
   return config_type
 
 
-def _AddConfigurationToMSVSProject(p, spec, config_type, config_name, config):
+def _AddConfigurationToMSVSProject(p, spec, config_type, config_name, config,
+                                   fixpath_prefix):
   """Adds a configuration to the MSVS project.
 
   Many settings in a vcproj file are specific to a configuration.  This
@@ -1110,16 +1195,16 @@ def _AddConfigurationToMSVSProject(p, spec, config_type, config_name, config):
   """
   # Get the information for this configuration
   include_dirs, midl_include_dirs, resource_include_dirs = \
-      _GetIncludeDirs(config)
+      _GetIncludeDirs(config, fixpath_prefix)
   libraries = _GetLibraries(spec)
-  library_dirs = _GetLibraryDirs(config)
+  library_dirs = _GetLibraryDirs(config, fixpath_prefix)
   out_file, vc_tool, _ = _GetOutputFilePathAndTool(spec, msbuild=False)
   defines = _GetDefines(config)
   defines = [_EscapeCppDefineForMSVS(d) for d in defines]
   disabled_warnings = _GetDisabledWarnings(config)
   prebuild = config.get('msvs_prebuild')
   postbuild = config.get('msvs_postbuild')
-  def_file = _GetModuleDefinition(spec)
+  def_file = _GetModuleDefinition(spec, fixpath_prefix)
   precompiled_header = config.get('msvs_precompiled_header')
 
   # Prepare the list of tools as a dictionary.
@@ -1178,10 +1263,11 @@ def _AddConfigurationToMSVSProject(p, spec, config_type, config_name, config):
   if def_file:
     _ToolAppend(tools, 'VCLinkerTool', 'ModuleDefinitionFile', def_file)
 
-  _AddConfigurationToMSVS(p, spec, tools, config, config_type, config_name)
+  _AddConfigurationToMSVS(p, spec, tools, config, config_type, config_name,
+                          fixpath_prefix)
 
 
-def _GetIncludeDirs(config):
+def _GetIncludeDirs(config, fixpath_prefix):
   """Returns the list of directories to be used for #include directives.
 
   Arguments:
@@ -1199,13 +1285,13 @@ def _GetIncludeDirs(config):
       config.get('midl_include_dirs', []) +
       config.get('msvs_system_include_dirs', []))
   resource_include_dirs = config.get('resource_include_dirs', include_dirs)
-  include_dirs = _FixPaths(include_dirs)
-  midl_include_dirs = _FixPaths(midl_include_dirs)
-  resource_include_dirs = _FixPaths(resource_include_dirs)
+  include_dirs = _FixPaths(include_dirs, fixpath_prefix)
+  midl_include_dirs = _FixPaths(midl_include_dirs, fixpath_prefix)
+  resource_include_dirs = _FixPaths(resource_include_dirs, fixpath_prefix)
   return include_dirs, midl_include_dirs, resource_include_dirs
 
 
-def _GetLibraryDirs(config):
+def _GetLibraryDirs(config, fixpath_prefix):
   """Returns the list of directories to be used for library search paths.
 
   Arguments:
@@ -1216,7 +1302,7 @@ def _GetLibraryDirs(config):
   """
 
   library_dirs = config.get('library_dirs', [])
-  library_dirs = _FixPaths(library_dirs)
+  library_dirs = _FixPaths(library_dirs, fixpath_prefix)
   return library_dirs
 
 
@@ -1325,12 +1411,12 @@ def _GetDisabledWarnings(config):
   return [str(i) for i in config.get('msvs_disabled_warnings', [])]
 
 
-def _GetModuleDefinition(spec):
+def _GetModuleDefinition(spec, fixpath_prefix):
   def_file = ''
   if spec['type'] in ['shared_library', 'loadable_module', 'executable']:
     def_files = [s for s in spec.get('sources', []) if s.endswith('.def')]
     if len(def_files) == 1:
-      def_file = _FixPath(def_files[0])
+      def_file = _FixPath(def_files[0], fixpath_prefix)
     elif def_files:
       raise ValueError(
           'Multiple module definition files in one target, target %s lists '
@@ -1366,7 +1452,8 @@ def _ConvertToolsToExpectedForm(tools):
   return tool_list
 
 
-def _AddConfigurationToMSVS(p, spec, tools, config, config_type, config_name):
+def _AddConfigurationToMSVS(p, spec, tools, config, config_type, config_name,
+                            fixpath_prefix):
   """Add to the project file the configuration specified by config.
 
   Arguments:
@@ -1378,14 +1465,14 @@ def _AddConfigurationToMSVS(p, spec, tools, config, config_type, config_name):
     config_type: The configuration type, a number as defined by Microsoft.
     config_name: The name of the configuration.
   """
-  attributes = _GetMSVSAttributes(spec, config, config_type)
+  attributes = _GetMSVSAttributes(spec, config, config_type, fixpath_prefix)
   # Add in this configuration.
   tool_list = _ConvertToolsToExpectedForm(tools)
   p.AddConfig(_ConfigFullName(config_name, config),
               attrs=attributes, tools=tool_list)
 
 
-def _GetMSVSAttributes(spec, config, config_type):
+def _GetMSVSAttributes(spec, config, config_type, fixpath_prefix):
   # Prepare configuration attributes.
   prepared_attrs = {}
   source_attrs = config.get('msvs_configuration_attributes', {})
@@ -1393,19 +1480,22 @@ def _GetMSVSAttributes(spec, config, config_type):
     prepared_attrs[a] = source_attrs[a]
   # Add props files.
   vsprops_dirs = config.get('msvs_props', [])
-  vsprops_dirs = _FixPaths(vsprops_dirs)
+  vsprops_dirs = _FixPaths(vsprops_dirs, fixpath_prefix)
   if vsprops_dirs:
     prepared_attrs['InheritedPropertySheets'] = ';'.join(vsprops_dirs)
   # Set configuration type.
   prepared_attrs['ConfigurationType'] = config_type
   output_dir = prepared_attrs.get('OutputDirectory',
                                   '$(SolutionDir)$(ConfigurationName)')
-  prepared_attrs['OutputDirectory'] = _FixPath(output_dir) + '\\'
+  prepared_attrs['OutputDirectory'] = (
+      _FixPath(output_dir, fixpath_prefix) + '\\')
   if 'IntermediateDirectory' not in prepared_attrs:
     intermediate = '$(ConfigurationName)\\obj\\$(ProjectName)'
-    prepared_attrs['IntermediateDirectory'] = _FixPath(intermediate) + '\\'
+    prepared_attrs['IntermediateDirectory'] = (
+        _FixPath(intermediate, fixpath_prefix) + '\\')
   else:
-    intermediate = _FixPath(prepared_attrs['IntermediateDirectory']) + '\\'
+    intermediate = _FixPath(prepared_attrs['IntermediateDirectory'],
+                            fixpath_prefix) + '\\'
     intermediate = MSVSSettings.FixVCMacroSlashes(intermediate)
     prepared_attrs['IntermediateDirectory'] = intermediate
   return prepared_attrs
@@ -1455,7 +1545,8 @@ def _PrepareListOfSources(spec, generator_flags, gyp_file):
 
 
 def _AdjustSourcesAndConvertToFilterHierarchy(
-    spec, options, gyp_dir, sources, excluded_sources, list_excluded, version):
+    spec, options, gyp_dir, sources, excluded_sources, list_excluded, version,
+    fixpath_prefix):
   """Adjusts the list of sources and excluded sources.
 
   Also converts the sets to lists.
@@ -1478,13 +1569,13 @@ def _AdjustSourcesAndConvertToFilterHierarchy(
   # Convert to proper windows form.
   # NOTE: sources goes from being a set to a list here.
   # NOTE: excluded_sources goes from being a set to a list here.
-  sources = _FixPaths(sources)
+  sources = _FixPaths(sources, fixpath_prefix)
   # Convert to proper windows form.
-  excluded_sources = _FixPaths(excluded_sources)
+  excluded_sources = _FixPaths(excluded_sources, fixpath_prefix)
 
   excluded_idl = _IdlFilesHandledNonNatively(spec, sources)
 
-  precompiled_related = _GetPrecompileRelatedFiles(spec)
+  precompiled_related = _GetPrecompileRelatedFiles(spec, fixpath_prefix)
   # Find the excluded ones, minus the precompiled header related ones.
   fully_excluded = [i for i in excluded_sources if i not in precompiled_related]
 
@@ -1523,20 +1614,21 @@ def _IdlFilesHandledNonNatively(spec, sources):
   return excluded_idl
 
 
-def _GetPrecompileRelatedFiles(spec):
+def _GetPrecompileRelatedFiles(spec, fixpath_prefix):
   # Gather a list of precompiled header related sources.
   precompiled_related = []
   for _, config in spec['configurations'].items():
     for k in precomp_keys:
       f = config.get(k)
       if f:
-        precompiled_related.append(_FixPath(f))
+        precompiled_related.append(_FixPath(f, fixpath_prefix))
   return precompiled_related
 
 
 def _ExcludeFilesFromBeingBuilt(p, spec, excluded_sources, excluded_idl,
-                                list_excluded):
-  exclusions = _GetExcludedFilesFromBuild(spec, excluded_sources, excluded_idl)
+                                list_excluded, fixpath_prefix):
+  exclusions = _GetExcludedFilesFromBuild(spec, excluded_sources, excluded_idl,
+                                          fixpath_prefix)
   for file_name, excluded_configs in exclusions.items():
     if (not list_excluded and
             len(excluded_configs) == len(spec['configurations'])):
@@ -1549,13 +1641,15 @@ def _ExcludeFilesFromBeingBuilt(p, spec, excluded_sources, excluded_idl,
                         {'ExcludedFromBuild': 'true'})
 
 
-def _GetExcludedFilesFromBuild(spec, excluded_sources, excluded_idl):
+def _GetExcludedFilesFromBuild(spec, excluded_sources, excluded_idl,
+                               fixpath_prefix):
   exclusions = {}
   # Exclude excluded sources from being built.
   for f in excluded_sources:
     excluded_configs = []
     for config_name, config in spec['configurations'].items():
-      precomped = [_FixPath(config.get(i, '')) for i in precomp_keys]
+      precomped = [_FixPath(config.get(i, ''), fixpath_prefix)
+                   for i in precomp_keys]
       # Don't do this for ones that are precompiled header related.
       if f not in precomped:
         excluded_configs.append((config_name, config))
@@ -1580,7 +1674,7 @@ def _AddToolFilesToMSVS(p, spec):
     p.AddToolFile(f)
 
 
-def _HandlePreCompiledHeaders(p, sources, spec):
+def _HandlePreCompiledHeaders(p, sources, spec, fixpath_prefix):
   # Pre-compiled header source stubs need a different compiler flag
   # (generate precompiled header) and any source file not of the same
   # kind (i.e. C vs. C++) as the precompiled header source stub needs
@@ -1589,7 +1683,7 @@ def _HandlePreCompiledHeaders(p, sources, spec):
   for config_name, config in spec['configurations'].items():
     source = config.get('msvs_precompiled_source')
     if source:
-      source = _FixPath(source)
+      source = _FixPath(source, fixpath_prefix)
       # UsePrecompiledHeader=1 for if using precompiled headers.
       tool = MSVSProject.Tool('VCCLCompilerTool',
                               {'UsePrecompiledHeader': '1'})
@@ -1611,7 +1705,7 @@ def _HandlePreCompiledHeaders(p, sources, spec):
             tool = MSVSProject.Tool('VCCLCompilerTool',
                                     {'UsePrecompiledHeader': '0',
                                      'ForcedIncludeFiles': '$(NOINHERIT)'})
-            p.AddFileConfig(_FixPath(source),
+            p.AddFileConfig(_FixPath(source, fixpath_prefix),
                             _ConfigFullName(config_name, config),
                             {}, tools=[tool])
   # Do nothing if there was no precompiled source.
@@ -1619,7 +1713,8 @@ def _HandlePreCompiledHeaders(p, sources, spec):
     DisableForSourceTree(sources)
 
 
-def _AddActions(actions_to_add, spec, relative_path_of_gyp_file):
+def _AddActions(actions_to_add, spec, relative_path_of_gyp_file,
+                fixpath_prefix):
   # Add actions.
   actions = spec.get('actions', [])
   # Don't setup_env every time. When all the actions are run together in one
@@ -1633,7 +1728,8 @@ def _AddActions(actions_to_add, spec, relative_path_of_gyp_file):
     attached_to = inputs[0]
     need_setup_env = attached_to not in have_setup_env
     cmd = _BuildCommandLineForRule(spec, a, has_input_path=False,
-                                   do_setup_env=need_setup_env)
+                                   do_setup_env=need_setup_env,
+                                   fixpath_prefix=fixpath_prefix)
     have_setup_env.add(attached_to)
     # Add the action.
     _AddActionStep(actions_to_add,
@@ -1664,14 +1760,14 @@ def _WriteMSVSUserFile(project_path, version, spec):
   user_file.WriteIfChanged()
 
 
-def _AddCopies(actions_to_add, spec):
-  copies = _GetCopies(spec)
+def _AddCopies(actions_to_add, spec, fixpath_prefix):
+  copies = _GetCopies(spec, fixpath_prefix)
   for inputs, outputs, cmd, description in copies:
     _AddActionStep(actions_to_add, inputs=inputs, outputs=outputs,
                    description=description, command=cmd)
 
 
-def _GetCopies(spec):
+def _GetCopies(spec, fixpath_prefix):
   copies = []
   # Add copies.
   for cpy in spec.get('copies', []):
@@ -1684,12 +1780,14 @@ def _GetCopies(spec):
         base_dir = posixpath.split(src_bare)[0]
         outer_dir = posixpath.split(src_bare)[1]
         cmd = 'cd "%s" && xcopy /e /f /y "%s" "%s\\%s\\"' % (
-            _FixPath(base_dir), outer_dir, _FixPath(dst), outer_dir)
+            _FixPath(base_dir, fixpath_prefix), outer_dir,
+            _FixPath(dst, fixpath_prefix), outer_dir)
         copies.append(([src], ['dummy_copies', dst], cmd,
                        'Copying %s to %s' % (src, dst)))
       else:
         cmd = 'mkdir "%s" 2>nul & set ERRORLEVEL=0 & copy /Y "%s" "%s"' % (
-            _FixPath(cpy['destination']), _FixPath(src), _FixPath(dst))
+            _FixPath(cpy['destination'], fixpath_prefix),
+            _FixPath(src, fixpath_prefix), _FixPath(dst, fixpath_prefix))
         copies.append(([src], [dst], cmd, 'Copying %s to %s' % (src, dst)))
   return copies
 
@@ -1801,7 +1899,6 @@ def _CreateProjectObjects(target_list, target_dicts, options, msvs_version):
   Returns:
     A set of created projects, keyed by target.
   """
-  global fixpath_prefix
   # Generate each project.
   projects = {}
   for qualified_target in target_list:
@@ -1940,8 +2037,6 @@ def GenerateOutput(target_list, target_dicts, data, params):
     target_dicts: Dict of target properties keyed on target pair.
     data: Dictionary containing per .gyp data.
   """
-  global fixpath_prefix
-
   options = params['options']
 
   # Get the project file format version back out of where we stashed it in
@@ -1950,8 +2045,10 @@ def GenerateOutput(target_list, target_dicts, data, params):
 
   generator_flags = params.get('generator_flags', {})
 
-  # Optionally shard targets marked with 'msvs_shard': SHARD_COUNT.
-  (target_list, target_dicts) = MSVSUtil.ShardTargets(target_list, target_dicts)
+  # Optionally shard targets marked with 'msvs_shard': SHARD_COUNT or 'auto'.
+  (target_list, target_dicts) = MSVSUtil.ShardTargets(
+      target_list, target_dicts,
+      balance=generator_flags.get('balance_shards', False))
 
   # Optionally use the large PDB workaround for targets marked with
   # 'msvs_large_pdb': 1.
@@ -1975,12 +2072,18 @@ def GenerateOutput(target_list, target_dicts, data, params):
                                           msvs_version)
 
   # Generate each project.
-  missing_sources = []
-  for project in project_objects.values():
-    fixpath_prefix = project.fixpath_prefix
-    missing_sources.extend(_GenerateProject(project, options, msvs_version,
-                                            generator_flags))
-  fixpath_prefix = None
+  missing_sources = _GenerateProjects(project_objects, options, msvs_version,
+                                      generator_flags, params['parallel'])
+
+  # Compute each target's deep dependencies once, in dependency order, so that
+  # the solutions below share them instead of re-walking the graph each time.
+  deep_dependencies = {}
+  build_file_targets = {}
+  for qualified_target in target_list:
+    gyp.common.DeepDependencyTargets(target_dicts, [qualified_target],
+                                     deep_dependencies)
+    build_file = gyp.common.BuildFile(qualified_target)
+    build_file_targets.setdefault(build_file, []).append(qualified_target)
 
   for build_file in data:
     # Validate build_file extension
@@ -1990,8 +2093,9 @@ def GenerateOutput(target_list, target_dicts, data, params):
     if options.generator_output:
       sln_path = os.path.join(options.generator_output, sln_path)
     # Get projects in the solution, and their dependents.
-    sln_projects = gyp.common.BuildFileTargets(target_list, build_file)
-    sln_projects += gyp.common.DeepDependencyTargets(target_dicts, sln_projects)
+    sln_projects = list(build_file_targets.get(build_file, []))
+    sln_projects += gyp.common.DeepDependencyTargets(target_dicts, sln_projects,
+                                                     deep_dependencies)
     # Create folder hierarchy.
     root_entries = _GatherSolutionFolders(
         sln_projects, project_objects, flat=msvs_version.FlatSolution())
@@ -2037,8 +2141,9 @@ def _GenerateMSBuildFiltersFile(filters_path, source_files,
                ['ItemGroup'] + source_group
               ]
     easy_xml.WriteXmlIfChanged(content, filters_path, pretty=True, win32=True)
-  elif os.path.exists(filters_path):
+  elif gyp.common.file_system_cache.Exists(filters_path):
     # We don't need this filter anymore.  Delete the old filter file.
+    gyp.common.file_system_cache.Invalidate(filters_path)
     os.unlink(filters_path)
 
 
@@ -2121,7 +2226,7 @@ def _GenerateRulesForMSBuild(output_dir, options, spec,
                              sources, excluded_sources,
                              props_files_of_rules, targets_files_of_rules,
                              actions_to_add, rule_dependencies,
-                             extension_to_rule_name):
+                             extension_to_rule_name, fixpath_prefix):
   # MSBuild rules are implemented using three files: an XML file, a .targets
   # file and a .props file.
   # See http://blogs.msdn.com/b/vcblog/archive/2010/04/21/quick-help-on-vs2010-custom-build-rule.aspx
@@ -2135,7 +2240,7 @@ def _GenerateRulesForMSBuild(output_dir, options, spec,
     # Skip a rule with no action and no inputs.
     if 'action' not in rule and not rule.get('rule_sources', []):
       continue
-    msbuild_rule = MSBuildRule(rule, spec)
+    msbuild_rule = MSBuildRule(rule, spec, fixpath_prefix)
     msbuild_rules.append(msbuild_rule)
     rule_dependencies.update(msbuild_rule.additional_dependencies.split(';'))
     extension_to_rule_name[msbuild_rule.extension] = msbuild_rule.rule_name
@@ -2158,8 +2263,8 @@ def _GenerateRulesForMSBuild(output_dir, options, spec,
 
   if rules_external:
     _GenerateExternalRules(rules_external, output_dir, spec,
-                           sources, options, actions_to_add)
-  _AdjustSourcesForRules(rules, sources, excluded_sources, True)
+                           sources, options, actions_to_add, fixpath_prefix)
+  _AdjustSourcesForRules(rules, sources, excluded_sources, True, fixpath_prefix)
 
 
 class MSBuildRule(object):
@@ -2182,7 +2287,7 @@ class MSBuildRule(object):
     command: The command used to run the rule.
   """
 
-  def __init__(self, rule, spec):
+  def __init__(self, rule, spec, fixpath_prefix):
     self.display_name = rule['rule_name']
     # Assure that the rule name is only characters and numbers
     self.rule_name = re.sub(r'\W', '_', self.display_name)
@@ -2203,15 +2308,17 @@ class MSBuildRule(object):
 
     self.description = MSVSSettings.ConvertVCMacrosToMSBuild(
         rule.get('message', self.rule_name))
-    old_additional_dependencies = _FixPaths(rule.get('inputs', []))
+    old_additional_dependencies = _FixPaths(rule.get('inputs', []),
+                                            fixpath_prefix)
     self.additional_dependencies = (
         ';'.join([MSVSSettings.ConvertVCMacrosToMSBuild(i)
                   for i in old_additional_dependencies]))
-    old_outputs = _FixPaths(rule.get('outputs', []))
+    old_outputs = _FixPaths(rule.get('outputs', []), fixpath_prefix)
     self.outputs = ';'.join([MSVSSettings.ConvertVCMacrosToMSBuild(i)
                              for i in old_outputs])
     old_command = _BuildCommandLineForRule(spec, rule, has_input_path=True,
-                                           do_setup_env=True)
+                                           do_setup_env=True,
+                                           fixpath_prefix=fixpath_prefix)
     self.command = MSVSSettings.ConvertVCMacrosToMSBuild(old_command)
 
 
@@ -2633,10 +2740,11 @@ def _GetMSBuildGlobalProperties(spec, guid, gyp_file_name):
 
   return properties
 
-def _GetMSBuildConfigurationDetails(spec, build_file):
+def _GetMSBuildConfigurationDetails(spec, build_file, fixpath_prefix):
   properties = {}
   for name, settings in spec['configurations'].items():
-    msbuild_attributes = _GetMSBuildAttributes(spec, settings, build_file)
+    msbuild_attributes = _GetMSBuildAttributes(spec, settings, build_file,
+                                               fixpath_prefix)
     condition = _GetConfigurationCondition(name, settings)
     character_set = msbuild_attributes.get('CharacterSet')
     _AddConditionalProperty(properties, condition, 'ConfigurationType',
@@ -2660,14 +2768,15 @@ def _GetMSBuildLocalProperties(msbuild_toolset):
   return properties
 
 
-def _GetMSBuildPropertySheets(configurations):
+def _GetMSBuildPropertySheets(configurations, fixpath_prefix):
   user_props = r'$(UserRootDir)\Microsoft.Cpp.$(Platform).user.props'
   additional_props = {}
   props_specified = False
   for name, settings in sorted(configurations.items()):
     configuration = _GetConfigurationCondition(name, settings)
     if settings.has_key('msbuild_props'):
-      additional_props[configuration] = _FixPaths(settings['msbuild_props'])
+      additional_props[configuration] = _FixPaths(settings['msbuild_props'],
+                                                  fixpath_prefix)
       props_specified = True
     else:
      additional_props[configuration] = ''
@@ -2704,9 +2813,10 @@ def _GetMSBuildPropertySheets(configurations):
       sheets.append(import_group)
     return sheets
 
-def _ConvertMSVSBuildAttributes(spec, config, build_file):
+def _ConvertMSVSBuildAttributes(spec, config, build_file, fixpath_prefix):
   config_type = _GetMSVSConfigurationType(spec, build_file)
-  msvs_attributes = _GetMSVSAttributes(spec, config, config_type)
+  msvs_attributes = _GetMSVSAttributes(spec, config, config_type,
+                                       fixpath_prefix)
   msbuild_attributes = {}
   for a in msvs_attributes:
     if a in ['IntermediateDirectory', 'OutputDirectory']:
@@ -2744,9 +2854,10 @@ def _ConvertMSVSConfigurationType(config_type):
   return config_type
 
 
-def _GetMSBuildAttributes(spec, config, build_file):
+def _GetMSBuildAttributes(spec, config, build_file, fixpath_prefix):
   if 'msbuild_configuration_attributes' not in config:
-    msbuild_attributes = _ConvertMSVSBuildAttributes(spec, config, build_file)
+    msbuild_attributes = _ConvertMSVSBuildAttributes(spec, config, build_file,
+                                                     fixpath_prefix)
 
   else:
     config_type = _GetMSVSConfigurationType(spec, build_file)
@@ -2755,9 +2866,10 @@ def _GetMSBuildAttributes(spec, config, build_file):
     msbuild_attributes.setdefault('ConfigurationType', config_type)
     output_dir = msbuild_attributes.get('OutputDirectory',
                                       '$(SolutionDir)$(Configuration)')
-    msbuild_attributes['OutputDirectory'] = _FixPath(output_dir) + '\\'
+    msbuild_attributes['OutputDirectory'] = (
+        _FixPath(output_dir, fixpath_prefix) + '\\')
     if 'IntermediateDirectory' not in msbuild_attributes:
-      intermediate = _FixPath('$(Configuration)') + '\\'
+      intermediate = _FixPath('$(Configuration)', fixpath_prefix) + '\\'
       msbuild_attributes['IntermediateDirectory'] = intermediate
     if 'CharacterSet' in msbuild_attributes:
       msbuild_attributes['CharacterSet'] = _ConvertMSVSCharacterSet(
@@ -2770,7 +2882,8 @@ def _GetMSBuildAttributes(spec, config, build_file):
 
   if spec.get('msvs_external_builder'):
     external_out_dir = spec.get('msvs_external_builder_out_dir', '.')
-    msbuild_attributes['OutputDirectory'] = _FixPath(external_out_dir) + '\\'
+    msbuild_attributes['OutputDirectory'] = (
+        _FixPath(external_out_dir, fixpath_prefix) + '\\')
 
   # Make sure that 'TargetPath' matches 'Lib.OutputFile' or 'Link.OutputFile'
   # (depending on the tool used) to avoid MSB8012 warning.
@@ -2785,7 +2898,7 @@ def _GetMSBuildAttributes(spec, config, build_file):
     msbuild_settings = config['finalized_msbuild_settings']
     out_file = msbuild_settings[msbuild_tool].get('OutputFile')
     if out_file:
-      msbuild_attributes['TargetPath'] = _FixPath(out_file)
+      msbuild_attributes['TargetPath'] = _FixPath(out_file, fixpath_prefix)
     target_ext = msbuild_settings[msbuild_tool].get('TargetExt')
     if target_ext:
       msbuild_attributes['TargetExt'] = target_ext
@@ -2793,14 +2906,16 @@ def _GetMSBuildAttributes(spec, config, build_file):
   return msbuild_attributes
 
 
-def _GetMSBuildConfigurationGlobalProperties(spec, configurations, build_file):
+def _GetMSBuildConfigurationGlobalProperties(spec, configurations, build_file,
+                                             fixpath_prefix):
   # TODO(jeanluc) We could optimize out the following and do it only if
   # there are actions.
   # TODO(jeanluc) Handle the equivalent of setting 'CYGWIN=nontsec'.
   new_paths = []
   cygwin_dirs = spec.get('msvs_cygwin_dirs', ['.'])[0]
   if cygwin_dirs:
-    cyg_path = '$(MSBuildProjectDirectory)\\%s\\bin\\' % _FixPath(cygwin_dirs)
+    cyg_path = '$(MSBuildProjectDirectory)\\%s\\bin\\' % _FixPath(
+        cygwin_dirs, fixpath_prefix)
     new_paths.append(cyg_path)
     # TODO(jeanluc) Change the convention to have both a cygwin_dir and a
     # python_dir.
@@ -2812,7 +2927,8 @@ def _GetMSBuildConfigurationGlobalProperties(spec, configurations, build_file):
   properties = {}
   for (name, configuration) in sorted(configurations.items()):
     condition = _GetConfigurationCondition(name, configuration)
-    attributes = _GetMSBuildAttributes(spec, configuration, build_file)
+    attributes = _GetMSBuildAttributes(spec, configuration, build_file,
+                                       fixpath_prefix)
     msbuild_settings = configuration['finalized_msbuild_settings']
     _AddConditionalProperty(properties, condition, 'IntDir',
                             attributes['IntermediateDirectory'])
@@ -2934,7 +3050,7 @@ def _GetMSBuildToolSettingsSections(spec, configurations):
   return groups
 
 
-def _FinalizeMSBuildSettings(spec, configuration):
+def _FinalizeMSBuildSettings(spec, configuration, fixpath_prefix):
   if 'msbuild_settings' in configuration:
     converted = False
     msbuild_settings = configuration['msbuild_settings']
@@ -2944,9 +3060,9 @@ def _FinalizeMSBuildSettings(spec, configuration):
     msvs_settings = configuration.get('msvs_settings', {})
     msbuild_settings = MSVSSettings.ConvertToMSBuildSettings(msvs_settings)
   include_dirs, midl_include_dirs, resource_include_dirs = \
-      _GetIncludeDirs(configuration)
+      _GetIncludeDirs(configuration, fixpath_prefix)
   libraries = _GetLibraries(spec)
-  library_dirs = _GetLibraryDirs(configuration)
+  library_dirs = _GetLibraryDirs(configuration, fixpath_prefix)
   out_file, _, msbuild_tool = _GetOutputFilePathAndTool(spec, msbuild=True)
   target_ext = _GetOutputTargetExt(spec)
   defines = _GetDefines(configuration)
@@ -2965,7 +3081,7 @@ def _FinalizeMSBuildSettings(spec, configuration):
   disabled_warnings = _GetDisabledWarnings(configuration)
   prebuild = configuration.get('msvs_prebuild')
   postbuild = configuration.get('msvs_postbuild')
-  def_file = _GetModuleDefinition(spec)
+  def_file = _GetModuleDefinition(spec, fixpath_prefix)
   precompiled_header = configuration.get('msvs_precompiled_header')
 
   # Add the information to the appropriate tool
@@ -3075,14 +3191,15 @@ def _VerifySourcesExist(sources, root_dir):
     else:
       if '$' not in source:
         full_path = os.path.join(root_dir, source)
-        if not os.path.exists(full_path):
+        if not gyp.common.file_system_cache.Exists(full_path):
           missing_sources.append(full_path)
   return missing_sources
 
 
 def _GetMSBuildSources(spec, sources, exclusions, rule_dependencies,
                        extension_to_rule_name, actions_spec,
-                       sources_handled_by_action, list_excluded):
+                       sources_handled_by_action, list_excluded,
+                       fixpath_prefix):
   groups = ['none', 'midl', 'include', 'compile', 'resource', 'rule',
             'rule_dependency']
   grouped_sources = {}
@@ -3091,7 +3208,7 @@ def _GetMSBuildSources(spec, sources, exclusions, rule_dependencies,
 
   _AddSources2(spec, sources, exclusions, grouped_sources,
                rule_dependencies, extension_to_rule_name,
-               sources_handled_by_action, list_excluded)
+               sources_handled_by_action, list_excluded, fixpath_prefix)
   sources = []
   for g in groups:
     if grouped_sources[g]:
@@ -3104,14 +3221,14 @@ def _GetMSBuildSources(spec, sources, exclusions, rule_dependencies,
 def _AddSources2(spec, sources, exclusions, grouped_sources,
                  rule_dependencies, extension_to_rule_name,
                  sources_handled_by_action,
-                 list_excluded):
+                 list_excluded, fixpath_prefix):
   extensions_excluded_from_precompile = []
   for source in sources:
     if isinstance(source, MSVSProject.Filter):
       _AddSources2(spec, source.contents, exclusions, grouped_sources,
                    rule_dependencies, extension_to_rule_name,
                    sources_handled_by_action,
-                   list_excluded)
+                   list_excluded, fixpath_prefix)
     else:
       if not source in sources_handled_by_action:
         detail = []
@@ -3128,7 +3245,7 @@ def _AddSources2(spec, sources, exclusions, grouped_sources,
         for config_name, configuration in spec['configurations'].items():
           precompiled_source = configuration.get('msvs_precompiled_source', '')
           if precompiled_source != '':
-            precompiled_source = _FixPath(precompiled_source)
+            precompiled_source = _FixPath(precompiled_source, fixpath_prefix)
             if not extensions_excluded_from_precompile:
               # If the precompiled header is generated by a C source, we must
               # not try to use it for C++ sources, and vice versa.
@@ -3183,6 +3300,7 @@ def _GetMSBuildProjectReferences(project):
 
 def _GenerateMSBuildProject(project, options, version, generator_flags):
   spec = project.spec
+  fixpath_prefix = project.fixpath_prefix
   configurations = spec['configurations']
   project_dir, project_file_name = os.path.split(project.path)
   gyp.common.EnsureDirExists(project.path)
@@ -3207,30 +3325,33 @@ def _GenerateMSBuildProject(project, options, version, generator_flags):
                              sources, excluded_sources,
                              props_files_of_rules, targets_files_of_rules,
                              actions_to_add, rule_dependencies,
-                             extension_to_rule_name)
+                             extension_to_rule_name, fixpath_prefix)
   else:
     rules = spec.get('rules', [])
-    _AdjustSourcesForRules(rules, sources, excluded_sources, True)
+    _AdjustSourcesForRules(rules, sources, excluded_sources, True,
+                           fixpath_prefix)
 
   sources, excluded_sources, excluded_idl = (
       _AdjustSourcesAndConvertToFilterHierarchy(spec, options,
                                                 project_dir, sources,
                                                 excluded_sources,
-                                                list_excluded, version))
+                                                list_excluded, version,
+                                                fixpath_prefix))
 
   # Don't add actions if we are using an external builder like ninja.
   if not spec.get('msvs_external_builder'):
-    _AddActions(actions_to_add, spec, project.build_file)
-    _AddCopies(actions_to_add, spec)
+    _AddActions(actions_to_add, spec, project.build_file, fixpath_prefix)
+    _AddCopies(actions_to_add, spec, fixpath_prefix)
 
     # NOTE: this stanza must appear after all actions have been decided.
     # Don't excluded sources with actions attached, or they won't run.
     excluded_sources = _FilterActionsFromExcluded(
-        excluded_sources, actions_to_add)
+        excluded_sources, actions_to_add, fixpath_prefix)
 
-  exclusions = _GetExcludedFilesFromBuild(spec, excluded_sources, excluded_idl)
+  exclusions = _GetExcludedFilesFromBuild(spec, excluded_sources, excluded_idl,
+                                          fixpath_prefix)
   actions_spec, sources_handled_by_action = _GenerateActionsForMSBuild(
-      spec, actions_to_add)
+      spec, actions_to_add, fixpath_prefix)
 
   _GenerateMSBuildFiltersFile(project.path + '.filters', sources,
                               rule_dependencies,
@@ -3238,7 +3359,7 @@ def _GenerateMSBuildProject(project, options, version, generator_flags):
   missing_sources = _VerifySourcesExist(sources, project_dir)
 
   for configuration in configurations.values():
-    _FinalizeMSBuildSettings(spec, configuration)
+    _FinalizeMSBuildSettings(spec, configuration, fixpath_prefix)
 
   # Add attributes to root element
 
@@ -3260,27 +3381,29 @@ def _GenerateMSBuildProject(project, options, version, generator_flags):
   content += _GetMSBuildProjectConfigurations(configurations)
   content += _GetMSBuildGlobalProperties(spec, project.guid, project_file_name)
   content += import_default_section
-  content += _GetMSBuildConfigurationDetails(spec, project.build_file)
+  content += _GetMSBuildConfigurationDetails(spec, project.build_file,
+                                             fixpath_prefix)
   if spec.get('msvs_enable_winphone'):
    content += _GetMSBuildLocalProperties('v120_wp81')
   else:
    content += _GetMSBuildLocalProperties(project.msbuild_toolset)
   content += import_cpp_props_section
   content += _GetMSBuildExtensions(props_files_of_rules)
-  content += _GetMSBuildPropertySheets(configurations)
+  content += _GetMSBuildPropertySheets(configurations, fixpath_prefix)
   content += macro_section
   content += _GetMSBuildConfigurationGlobalProperties(spec, configurations,
-                                                      project.build_file)
+                                                      project.build_file,
+                                                      fixpath_prefix)
   content += _GetMSBuildToolSettingsSections(spec, configurations)
   content += _GetMSBuildSources(
       spec, sources, exclusions, rule_dependencies, extension_to_rule_name,
-      actions_spec, sources_handled_by_action, list_excluded)
+      actions_spec, sources_handled_by_action, list_excluded, fixpath_prefix)
   content += _GetMSBuildProjectReferences(project)
   content += import_cpp_targets_section
   content += _GetMSBuildExtensionTargets(targets_files_of_rules)
 
   if spec.get('msvs_external_builder'):
-    content += _GetMSBuildExternalBuilderTargets(spec)
+    content += _GetMSBuildExternalBuilderTargets(spec, fixpath_prefix)
 
   # TODO(jeanluc) File a bug to get rid of runas.  We had in MSVS:
   # has_run_as = _WriteMSVSUserFile(project.path, version, spec)
@@ -3290,7 +3413,7 @@ def _GenerateMSBuildProject(project, options, version, generator_flags):
   return missing_sources
 
 
-def _GetMSBuildExternalBuilderTargets(spec):
+def _GetMSBuildExternalBuilderTargets(spec, fixpath_prefix):
   """Return a list of MSBuild targets for external builders.
 
   The "Build" and "Clean" targets are always generated.  If the spec contains
@@ -3304,13 +3427,13 @@ def _GetMSBuildExternalBuilderTargets(spec):
   """
   build_cmd = _BuildCommandLineForRuleRaw(
       spec, spec['msvs_external_builder_build_cmd'],
-      False, False, False, False)
+      False, False, False, False, fixpath_prefix)
   build_target = ['Target', {'Name': 'Build'}]
   build_target.append(['Exec', {'Command': build_cmd}])
 
   clean_cmd = _BuildCommandLineForRuleRaw(
       spec, spec['msvs_external_builder_clean_cmd'],
-      False, False, False, False)
+      False, False, False, False, fixpath_prefix)
   clean_target = ['Target', {'Name': 'Clean'}]
   clean_target.append(['Exec', {'Command': clean_cmd}])
 
@@ -3319,7 +3442,7 @@ def _GetMSBuildExternalBuilderTargets(spec):
   if spec.get('msvs_external_builder_clcompile_cmd'):
     clcompile_cmd = _BuildCommandLineForRuleRaw(
         spec, spec['msvs_external_builder_clcompile_cmd'],
-        False, False, False, False)
+        False, False, False, False, fixpath_prefix)
     clcompile_target = ['Target', {'Name': 'ClCompile'}]
     clcompile_target.append(['Exec', {'Command': clcompile_cmd}])
     targets.append(clcompile_target)
@@ -3341,7 +3464,7 @@ def _GetMSBuildExtensionTargets(targets_files_of_rules):
   return [targets_node]
 
 
-def _GenerateActionsForMSBuild(spec, actions_to_add):
+def _GenerateActionsForMSBuild(spec, actions_to_add, fixpath_prefix):
   """Add actions accumulated into an actions_to_add, merging as needed.
 
   Arguments:
@@ -3387,16 +3510,16 @@ def _GenerateActionsForMSBuild(spec, actions_to_add):
                       command,
                       description,
                       sources_handled_by_action,
-                      actions_spec)
+                      actions_spec, fixpath_prefix)
   return actions_spec, sources_handled_by_action
 
 
 def _AddMSBuildAction(spec, primary_input, inputs, outputs, cmd, description,
-                      sources_handled_by_action, actions_spec):
+                      sources_handled_by_action, actions_spec, fixpath_prefix):
   command = MSVSSettings.ConvertVCMacrosToMSBuild(cmd)
-  primary_input = _FixPath(primary_input)
-  inputs_array = _FixPaths(inputs)
-  outputs_array = _FixPaths(outputs)
+  primary_input = _FixPath(primary_input, fixpath_prefix)
+  inputs_array = _FixPaths(inputs, fixpath_prefix)
+  outputs_array = _FixPaths(outputs, fixpath_prefix)
   additional_inputs = ';'.join([i for i in inputs_array
                                 if i != primary_input])
   outputs = ';'.join(outputs_array)
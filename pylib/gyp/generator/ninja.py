@@ -6,8 +6,8 @@ from __future__ import print_function
 import collections
 import copy
 import hashlib
+import importlib
 import json
-import multiprocessing
 import os.path
 import re
 import signal
@@ -16,9 +16,7 @@ import sys
 import gyp
 import gyp.common
 from gyp.common import OrderedSet
-import gyp.msvs_emulation
 import gyp.MSVSUtil as MSVSUtil
-import gyp.xcode_emulation
 import os
 
 
@@ -73,6 +71,12 @@ generator_additional_path_sections = []
 generator_extra_sources_for_rules = []
 generator_filelist_paths = None
 
+# The keys of the build file dicts in |data| that are read below; the rest of
+# |data| is dropped after loading.
+generator_build_file_data_keys = ['make_global_settings', 'xcode_settings']
+
+generator_supports_jumbo = True
+
 # TODO: figure out how to not build extra host objects in the non-cross-compile
 # case when this is enabled, and enable unconditionally.
 generator_supports_multiple_toolsets = (
@@ -119,6 +123,56 @@ def AddArch(output, arch):
   return '%s.%s%s' % (output, arch, extension)
 
 
+class GccPrecompiledHeader(object):
+  """Emulates the Windows precompiled header of a target with GCC or Clang.
+
+  On Windows, 'msvs_precompiled_source' is compiled to precompile the
+  'msvs_precompiled_header' it includes, and that header is force-included
+  into every source of the same language.  Here the source is compiled as a
+  header of its language into a gch file instead, and the sources of that
+  language get an |-include| of the gch file (less its .gch extension, which
+  is how GCC and Clang look for it) and depend on it.
+
+  Interface matches MacPrefixHeader in xcode_emulation.py.
+  """
+  # The languages a precompiled header can be made for, by source extension.
+  _LANGUAGES = {'.c': 'c', '.cc': 'cc', '.cpp': 'cc', '.cxx': 'cc'}
+
+  def __init__(self, config, gyp_path_to_build_path, gyp_path_to_build_output):
+    """Arguments are as for MacPrefixHeader, with the configuration dict of
+    the target in place of its Xcode settings."""
+    self.lang = None
+    pch_source = config.get('msvs_precompiled_source')
+    if pch_source and config.get('msvs_precompiled_header'):
+      self.lang = self._LANGUAGES.get(os.path.splitext(pch_source)[1])
+    if self.lang:
+      self.source = gyp_path_to_build_path(pch_source)
+      self.compiled_header = gyp_path_to_build_output(pch_source, self.lang)
+
+  def GetInclude(self, lang, arch=None):
+    """Gets the cflags to include the precompiled header for language |lang|."""
+    if lang == self.lang:
+      return '-include %s' % self.compiled_header
+    return ''
+
+  def GetObjDependencies(self, sources, objs, arch=None):
+    """Returns a list of (source, object, gch) tuples, for the objects of the
+    sources in the language of the precompiled header."""
+    if not self.lang:
+      return []
+    return [(source, obj, self.compiled_header + '.gch')
+            for source, obj in zip(sources, objs)
+            if self._LANGUAGES.get(os.path.splitext(source)[1]) == self.lang]
+
+  def GetPchBuildCommands(self, arch=None):
+    """Returns [(path_to_gch, language_flag, language, source)]."""
+    if not self.lang:
+      return []
+    language_flag = {'c': '-x c-header', 'cc': '-x c++-header'}[self.lang]
+    return [(self.compiled_header + '.gch', language_flag, self.lang,
+             self.source)]
+
+
 class Target(object):
   """Target represents the paths used within a single gyp target.
 
@@ -399,7 +453,8 @@ class NinjaWriter(object):
     # should be used for linking.
     self.uses_cpp = False
 
-    self.is_mac_bundle = gyp.xcode_emulation.IsMacBundle(self.flavor, spec)
+    self.is_mac_bundle = (self.flavor == 'mac' and
+                          gyp.xcode_emulation.IsMacBundle(self.flavor, spec))
     self.xcode_settings = self.msvs_settings = None
     if self.flavor == 'mac':
       self.xcode_settings = gyp.xcode_emulation.XcodeSettings(spec)
@@ -478,10 +533,14 @@ class NinjaWriter(object):
         pch = gyp.msvs_emulation.PrecompiledHeader(
             self.msvs_settings, config_name, self.GypPathToNinja,
             self.GypPathToUniqueOutput, self.obj_ext)
-      else:
+      elif self.flavor == 'mac':
         pch = gyp.xcode_emulation.MacPrefixHeader(
             self.xcode_settings, self.GypPathToNinja,
             lambda path, lang: self.GypPathToUniqueOutput(path + '-' + lang))
+      else:
+        pch = GccPrecompiledHeader(
+            config, self.GypPathToNinja,
+            lambda path, lang: self.GypPathToUniqueOutput(path + '-' + lang))
       link_deps = self.WriteSources(
           self.ninja, config_name, config, sources, compile_depends_stamp, pch,
           spec)
@@ -967,7 +1026,7 @@ class NinjaWriter(object):
            for i in midl_include_dirs])
 
     pch_commands = precompiled_header.GetPchBuildCommands(arch)
-    if self.flavor == 'mac':
+    if self.flavor != 'win':
       # Most targets use no precompiled headers, so only write these if needed.
       for ext, var in [('c', 'cflags_pch_c'), ('cc', 'cflags_pch_cc'),
                        ('m', 'cflags_pch_objc'), ('mm', 'cflags_pch_objcc')]:
@@ -1345,6 +1404,8 @@ class NinjaWriter(object):
   def GetSortedXcodeEnv(self, additional_settings=None):
     """Returns the variables Xcode would set for build steps."""
     assert self.abs_build_dir
+    if not self.xcode_settings:
+      return []
     abs_build_dir = self.abs_build_dir
     return gyp.xcode_emulation.GetSortedXcodeEnv(
         self.xcode_settings, abs_build_dir,
@@ -1588,11 +1649,23 @@ class NinjaWriter(object):
     return rule_name, args
 
 
+def ImportEmulationModules(flavor):
+  """Imports the module emulating the native build system of |flavor|, if any.
+
+  xcode_emulation and msvs_emulation are slow to import, so they are only
+  imported for the flavors that need them."""
+  if flavor == 'mac':
+    importlib.import_module('gyp.xcode_emulation')
+  elif flavor == 'win':
+    importlib.import_module('gyp.msvs_emulation')
+
+
 def CalculateVariables(default_variables, params):
   """Calculate additional variables for use in the build (called by gyp)."""
   global generator_additional_non_configuration_keys
   global generator_additional_path_sections
   flavor = gyp.common.GetFlavor(params)
+  ImportEmulationModules(flavor)
   if flavor == 'mac':
     default_variables.setdefault('OS', 'mac')
     default_variables.setdefault('SHARED_LIB_SUFFIX', '.dylib')
@@ -1605,7 +1678,8 @@ def CalculateVariables(default_variables, params):
     # by the Mac Ninja generator.
     import gyp.generator.xcode as xcode_generator
     generator_additional_non_configuration_keys = getattr(xcode_generator,
-        'generator_additional_non_configuration_keys', [])
+        'generator_additional_non_configuration_keys', []) + [
+        'msvs_shard', 'msvs_shard_size']
     generator_additional_path_sections = getattr(xcode_generator,
         'generator_additional_path_sections', [])
     global generator_extra_sources_for_rules
@@ -1630,6 +1704,9 @@ def CalculateVariables(default_variables, params):
 
     gyp.msvs_emulation.CalculateCommonVariables(default_variables, params)
   else:
+    # 'msvs_shard': 'auto' is supported everywhere.
+    generator_additional_non_configuration_keys = ['msvs_shard',
+                                                   'msvs_shard_size']
     operating_system = flavor
     if flavor == 'android':
       operating_system = 'linux'  # Keep this legacy behavior for now.
@@ -1680,59 +1757,6 @@ def CommandWithWrapper(cmd, wrappers, prog):
   return prog
 
 
-def GetDefaultConcurrentLinks():
-  """Returns a best-guess for a number of concurrent links."""
-  pool_size = int(os.getenv('GYP_LINK_CONCURRENCY', 0))
-  if pool_size:
-    return pool_size
-
-  if sys.platform in ('win32', 'cygwin'):
-    import ctypes
-
-    class MEMORYSTATUSEX(ctypes.Structure):
-      _fields_ = [
-        ("dwLength", ctypes.c_ulong),
-        ("dwMemoryLoad", ctypes.c_ulong),
-        ("ullTotalPhys", ctypes.c_ulonglong),
-        ("ullAvailPhys", ctypes.c_ulonglong),
-        ("ullTotalPageFile", ctypes.c_ulonglong),
-        ("ullAvailPageFile", ctypes.c_ulonglong),
-        ("ullTotalVirtual", ctypes.c_ulonglong),
-        ("ullAvailVirtual", ctypes.c_ulonglong),
-        ("sullAvailExtendedVirtual", ctypes.c_ulonglong),
-      ]
-
-    stat = MEMORYSTATUSEX()
-    stat.dwLength = ctypes.sizeof(stat)
-    ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(stat))
-
-    mem_limit = max(1, stat.ullTotalPhys / (4 * (2 ** 30)))  # total / 4GB
-    hard_cap = max(1, int(os.getenv('GYP_LINK_CONCURRENCY_MAX', 2**32)))
-    return min(mem_limit, hard_cap)
-  elif sys.platform.startswith('linux'):
-    if os.path.exists("/proc/meminfo"):
-      with open("/proc/meminfo") as meminfo:
-        memtotal_re = re.compile(r'^MemTotal:\s*(\d*)\s*kB')
-        for line in meminfo:
-          match = memtotal_re.match(line)
-          if not match:
-            continue
-          # Allow 8Gb per link on Linux because Gold is quite memory hungry
-          return max(1, int(match.group(1)) / (8 * (2 ** 20)))
-    return 1
-  elif sys.platform == 'darwin':
-    try:
-      avail_bytes = int(subprocess.check_output(['sysctl', '-n', 'hw.memsize']))
-      # A static library debug build of Chromium's unit_tests takes ~2.7GB, so
-      # 4GB per ld process allows for some more bloat.
-      return max(1, avail_bytes / (4 * (2 ** 30)))  # total / 4GB
-    except:
-      return 1
-  else:
-    # TODO(scottmg): Implement this for other platforms.
-    return 1
-
-
 def _GetWinLinkRuleNameSuffix(embed_manifest):
   """Returns the suffix used to select an appropriate linking rule depending on
   whether the manifest embedding is enabled."""
@@ -1792,6 +1816,8 @@ def GenerateOutputForConfig(target_list, target_dicts, data, params,
                             config_name):
   options = params['options']
   flavor = gyp.common.GetFlavor(params)
+  # Also needed in the processes the configurations are generated in.
+  ImportEmulationModules(flavor)
   generator_flags = params.get('generator_flags', {})
 
   # build_dir: relative path from source root to our output files.
@@ -1964,7 +1990,8 @@ def GenerateOutputForConfig(target_list, target_dicts, data, params,
 
   master_ninja.newline()
 
-  master_ninja.pool('link_pool', depth=GetDefaultConcurrentLinks())
+  master_ninja.pool('link_pool',
+                    depth=gyp.common.GetDefaultConcurrentLinks())
   master_ninja.newline()
 
   deps = 'msvc' if flavor == 'win' else 'gcc'
@@ -2372,15 +2399,40 @@ def CallGenerateOutputForConfig(arglist):
 
 
 def GenerateOutput(target_list, target_dicts, data, params):
-  # Update target_dicts for iOS device builds.
-  target_dicts = gyp.xcode_emulation.CloneConfigurationForDeviceAndEmulator(
-      target_dicts)
+  flavor = gyp.common.GetFlavor(params)
+  ImportEmulationModules(flavor)
+  if flavor == 'mac':
+    # Update target_dicts for iOS device builds.
+    target_dicts = gyp.xcode_emulation.CloneConfigurationForDeviceAndEmulator(
+        target_dicts)
 
-  user_config = params.get('generator_flags', {}).get('config', None)
-  if gyp.common.GetFlavor(params) == 'win':
-    target_list, target_dicts = MSVSUtil.ShardTargets(target_list, target_dicts)
+  generator_flags = params.get('generator_flags', {})
+  user_config = generator_flags.get('config', None)
+  # With shard_by_compile_times, shards are balanced by the compile times of
+  # the previous build, if any.  Those vary from one build to the next, and so
+  # would the shards, so by default they are balanced by source sizes.
+  compile_times = None
+  if generator_flags.get('shard_by_compile_times', False):
+    if user_config:
+      config_names = [user_config]
+    else:
+      config_names = target_dicts[target_list[0]]['configurations'].keys()
+    toplevel_dir = params['options'].toplevel_dir
+    compile_times = MSVSUtil.NinjaLogCompileTimes(
+        [os.path.join(toplevel_dir, ComputeOutputDir(params), config_name,
+                      '.ninja_log') for config_name in config_names],
+        toplevel_dir)
+  if flavor == 'win':
+    target_list, target_dicts = MSVSUtil.ShardTargets(
+        target_list, target_dicts,
+        balance=generator_flags.get('balance_shards', False),
+        compile_times=compile_times)
     target_list, target_dicts = MSVSUtil.InsertLargePdbShims(
         target_list, target_dicts, generator_default_variables)
+  else:
+    # Only 'msvs_shard': 'auto' targets are sharded outside of Windows.
+    target_list, target_dicts = MSVSUtil.ShardTargets(
+        target_list, target_dicts, auto_only=True, compile_times=compile_times)
 
   if user_config:
     GenerateOutputForConfig(target_list, target_dicts, data, params,
@@ -2388,6 +2440,7 @@ def GenerateOutput(target_list, target_dicts, data, params):
   else:
     config_names = target_dicts[target_list[0]]['configurations'].keys()
     if params['parallel']:
+      import multiprocessing
       try:
         pool = multiprocessing.Pool(len(config_names))
         arglists = []
@@ -0,0 +1,261 @@
+# Copyright (c) 2014 Google Inc. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Writes the processed build graph into an SQLite database.
+
+Tools that need to know which targets own a source, what flags a target is
+built with or what depends on a target can query the database rather than
+run gyp.  It has these tables:
+
+  targets:  id, name (the qualified target), build_file, target_name, toolset,
+            type and hash (of the target dict, to update it incrementally).
+  edges:    target_id, dependency_id; the direct dependencies.
+  sources:  target_id, path; relative to the toplevel directory, or as given
+            when they start with a variable such as $!PRODUCT_DIR.
+  flags:    target_id, configuration, key, position, value; one row for each
+            item of each setting of a configuration, with the keys of nested
+            dicts joined by dots, e.g. xcode_settings.OTHER_CFLAGS.
+  actions:  target_id, kind (action, rule or copy), name, and the inputs,
+            outputs and command as JSON lists.
+  metadata: key, value; the schema version and toplevel directory.
+
+For example, to find who compiles foo.cc with what flags:
+
+  SELECT t.name, f.configuration, f.key, f.value
+  FROM sources s JOIN targets t ON t.id = s.target_id
+  JOIN flags f ON f.target_id = t.id
+  WHERE s.path = 'foo.cc' ORDER BY t.name, f.configuration, f.key, f.position;
+
+When the database already exists, only the rows of the targets that were
+added, removed or changed are rewritten, all in one transaction.  The
+database is written to the generator flag sqlite_index_path, or to
+gyp_index.sqlite in the generator output directory.
+"""
+
+import gyp.common
+import hashlib
+import json
+import os
+import sqlite3
+
+generator_supports_multiple_toolsets = True
+
+generator_wants_static_library_dependencies_adjusted = False
+
+generator_build_file_data_keys = []
+
+generator_default_variables = {
+}
+for dirname in ['INTERMEDIATE_DIR', 'SHARED_INTERMEDIATE_DIR', 'PRODUCT_DIR',
+                'LIB_DIR', 'SHARED_LIB_DIR', 'CONFIGURATION_NAME',
+                'RULE_INPUT_PATH', 'RULE_INPUT_ROOT', 'RULE_INPUT_NAME',
+                'RULE_INPUT_DIRNAME', 'RULE_INPUT_EXT']:
+  # Left for the consumers to resolve; the leading $ keeps gyp from treating
+  # them as relative paths.
+  generator_default_variables[dirname] = '$!' + dirname
+for unused in ['EXECUTABLE_PREFIX', 'EXECUTABLE_SUFFIX',
+               'STATIC_LIB_PREFIX', 'STATIC_LIB_SUFFIX',
+               'SHARED_LIB_PREFIX', 'SHARED_LIB_SUFFIX']:
+  generator_default_variables[unused] = ''
+
+# Bump when the tables change, to have existing databases written anew.
+SCHEMA_VERSION = '1'
+
+_SCHEMA = [
+  'CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT)',
+  'CREATE TABLE targets (id INTEGER PRIMARY KEY, name TEXT UNIQUE, '
+      'build_file TEXT, target_name TEXT, toolset TEXT, type TEXT, hash TEXT)',
+  'CREATE TABLE edges (target_id INTEGER, dependency_id INTEGER)',
+  'CREATE TABLE sources (target_id INTEGER, path TEXT)',
+  'CREATE TABLE flags (target_id INTEGER, configuration TEXT, key TEXT, '
+      'position INTEGER, value TEXT)',
+  'CREATE TABLE actions (target_id INTEGER, kind TEXT, name TEXT, '
+      'inputs TEXT, outputs TEXT, command TEXT)',
+  'CREATE INDEX targets_target_name ON targets (target_name)',
+  'CREATE INDEX edges_target_id ON edges (target_id)',
+  'CREATE INDEX edges_dependency_id ON edges (dependency_id)',
+  'CREATE INDEX sources_target_id ON sources (target_id)',
+  'CREATE INDEX sources_path ON sources (path)',
+  'CREATE INDEX flags_target_id ON flags (target_id, configuration)',
+  'CREATE INDEX actions_target_id ON actions (target_id)',
+]
+
+# The tables with rows for each target, and cleared when it changes.
+_TARGET_TABLES = ['edges', 'sources', 'flags', 'actions']
+
+
+def CalculateVariables(default_variables, params):
+  generator_flags = params.get('generator_flags', {})
+  for key, val in generator_flags.items():
+    default_variables.setdefault(key, val)
+  default_variables.setdefault('OS', gyp.common.GetFlavor(params))
+
+
+def _TargetHash(target_dict):
+  """Returns a digest of everything the rows of a target are made from."""
+  return hashlib.sha1(
+      json.dumps(target_dict, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _ToplevelPath(build_file_dir, toplevel_dir, path):
+  """Makes |path|, relative to |build_file_dir|, relative to |toplevel_dir|.
+
+  Paths starting with a variable are left as they are.
+  """
+  if path.startswith('$'):
+    return path
+  return gyp.common.RelativePath(os.path.join(build_file_dir, path),
+                                 toplevel_dir).replace(os.sep, '/')
+
+
+def _FlagRows(target_id, configuration, settings, prefix=''):
+  """Yields the rows of the flags table for a configuration dict."""
+  for key, value in sorted(settings.items()):
+    key = prefix + key
+    if isinstance(value, dict):
+      for row in _FlagRows(target_id, configuration, value, key + '.'):
+        yield row
+    elif isinstance(value, list):
+      for position, item in enumerate(value):
+        if isinstance(item, (dict, list)):
+          item = json.dumps(item, sort_keys=True)
+        yield (target_id, configuration, key, position, item)
+    else:
+      yield (target_id, configuration, key, 0, value)
+
+
+def _ActionRows(target_id, target_dict, build_file_dir, toplevel_dir):
+  """Yields the rows of the actions table for a target."""
+  def Paths(paths):
+    return json.dumps([_ToplevelPath(build_file_dir, toplevel_dir, path)
+                       for path in paths])
+  for action in target_dict.get('actions', []):
+    yield (target_id, 'action', action['action_name'],
+           Paths(action.get('inputs', [])), Paths(action.get('outputs', [])),
+           json.dumps(action.get('action', [])))
+  for rule in target_dict.get('rules', []):
+    yield (target_id, 'rule', rule['rule_name'],
+           Paths(rule.get('inputs', [])), Paths(rule.get('outputs', [])),
+           json.dumps(rule.get('action', [])))
+  for copy in target_dict.get('copies', []):
+    destination = copy['destination']
+    yield (target_id, 'copy', destination, Paths(copy['files']),
+           Paths([os.path.join(destination, os.path.basename(path))
+                  for path in copy['files']]),
+           json.dumps([]))
+
+
+def _OpenDatabase(path, toplevel_dir):
+  """Opens the database at |path|, emptied unless it was written by the same
+  schema and for the same |toplevel_dir|."""
+  connection = sqlite3.connect(path)
+  try:
+    metadata = dict(connection.execute('SELECT key, value FROM metadata'))
+  except sqlite3.DatabaseError:
+    metadata = {}
+  if (metadata.get('schema_version') != SCHEMA_VERSION or
+      metadata.get('toplevel_dir') != toplevel_dir):
+    connection.close()
+    if os.path.exists(path):
+      os.remove(path)
+    connection = sqlite3.connect(path)
+    with connection:
+      for statement in _SCHEMA:
+        connection.execute(statement)
+      connection.executemany(
+          'INSERT INTO metadata (key, value) VALUES (?, ?)',
+          [('schema_version', SCHEMA_VERSION), ('toplevel_dir', toplevel_dir)])
+  return connection
+
+
+def WriteIndex(path, target_list, target_dicts, toplevel_dir):
+  """Updates the database at |path| to hold the targets of |target_list|.
+
+  Returns the number of targets written and the number removed.
+  """
+  toplevel_dir = os.path.abspath(toplevel_dir)
+  connection = _OpenDatabase(path, toplevel_dir)
+  try:
+    with connection:
+      existing = dict(
+          (name, (target_id, digest)) for target_id, name, digest in
+          connection.execute('SELECT id, name, hash FROM targets'))
+
+      # Make sure every target has an id first, as the edges refer to them.
+      ids = {}
+      changed = []
+      for target in target_list:
+        target_dict = target_dicts[target]
+        digest = _TargetHash(target_dict)
+        if target in existing:
+          target_id, old_digest = existing.pop(target)
+          ids[target] = target_id
+          if digest == old_digest:
+            continue
+          connection.execute(
+              'UPDATE targets SET type = ?, hash = ? WHERE id = ?',
+              (target_dict.get('type'), digest, target_id))
+        else:
+          build_file, target_name, toolset = \
+              gyp.common.ParseQualifiedTarget(target)
+          ids[target] = connection.execute(
+              'INSERT INTO targets (name, build_file, target_name, toolset, '
+              'type, hash) VALUES (?, ?, ?, ?, ?, ?)',
+              (target, build_file, target_name, toolset,
+               target_dict.get('type'), digest)).lastrowid
+        changed.append(target)
+
+      # What's left of |existing| is gone from the build.
+      removed_ids = [(removed[0],) for removed in existing.values()]
+      stale_ids = removed_ids + [(ids[target],) for target in changed]
+      for table in _TARGET_TABLES:
+        connection.executemany(
+            'DELETE FROM %s WHERE target_id = ?' % table, stale_ids)
+      connection.executemany(
+          'DELETE FROM edges WHERE dependency_id = ?', removed_ids)
+      connection.executemany('DELETE FROM targets WHERE id = ?', removed_ids)
+
+      edges = []
+      sources = []
+      flags = []
+      actions = []
+      for target in changed:
+        target_id = ids[target]
+        target_dict = target_dicts[target]
+        build_file_dir = os.path.dirname(gyp.common.BuildFile(target))
+        edges.extend((target_id, ids[dependency])
+                     for dependency in target_dict.get('dependencies', []))
+        sources.extend(
+            (target_id, _ToplevelPath(build_file_dir, toplevel_dir, source))
+            for source in target_dict.get('sources', []))
+        for configuration, settings in sorted(
+            target_dict.get('configurations', {}).items()):
+          flags.extend(_FlagRows(target_id, configuration, settings))
+        actions.extend(
+            _ActionRows(target_id, target_dict, build_file_dir, toplevel_dir))
+
+      connection.executemany(
+          'INSERT INTO edges (target_id, dependency_id) VALUES (?, ?)', edges)
+      connection.executemany(
+          'INSERT INTO sources (target_id, path) VALUES (?, ?)', sources)
+      connection.executemany(
+          'INSERT INTO flags (target_id, configuration, key, position, value) '
+          'VALUES (?, ?, ?, ?, ?)', flags)
+      connection.executemany(
+          'INSERT INTO actions (target_id, kind, name, inputs, outputs, '
+          'command) VALUES (?, ?, ?, ?, ?, ?)', actions)
+  finally:
+    connection.close()
+  return len(changed), len(removed_ids)
+
+
+def GenerateOutput(target_list, target_dicts, data, params):
+  options = params['options']
+  path = params.get('generator_flags', {}).get('sqlite_index_path')
+  if not path:
+    path = os.path.join(options.generator_output or '.', 'gyp_index.sqlite')
+  gyp.common.EnsureDirExists(path)
+  written, removed = WriteIndex(path, target_list, target_dicts,
+                                options.toplevel_dir)
+  print('Wrote %d and removed %d targets in %s.' % (written, removed, path))
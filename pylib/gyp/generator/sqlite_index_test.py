@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014 Google Inc. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+""" Unit tests for the sqlite_index.py file. """
+
+import gyp.generator.sqlite_index as sqlite_index
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+
+class TestWriteIndex(unittest.TestCase):
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.path = os.path.join(self.tmp_dir, 'index.sqlite')
+    self.target_dicts = {
+      'a/a.gyp:app#target': {
+        'type': 'executable',
+        'sources': ['main.cc', '../b/shared.cc'],
+        'dependencies': ['b/b.gyp:lib#target'],
+        'configurations': {
+          'Debug': {'defines': ['DEBUG', 'A'],
+                    'xcode_settings': {'OTHER_CFLAGS': ['-g']}},
+        },
+        'actions': [{'action_name': 'gen', 'inputs': ['gen.py'],
+                     'outputs': ['$!INTERMEDIATE_DIR/gen.h'],
+                     'action': ['python', 'gen.py']}],
+      },
+      'b/b.gyp:lib#target': {
+        'type': 'static_library',
+        'sources': ['lib.cc', 'shared.cc'],
+        'configurations': {'Debug': {'defines': ['DEBUG']}},
+      },
+    }
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def write(self):
+    return sqlite_index.WriteIndex(self.path, sorted(self.target_dicts),
+                                   self.target_dicts, '.')
+
+  def query(self, sql, *args):
+    connection = sqlite3.connect(self.path)
+    try:
+      with connection:
+        return connection.execute(sql, args).fetchall()
+    finally:
+      connection.close()
+
+  def test_Tables(self):
+    self.assertEqual(self.write(), (2, 0))
+    self.assertEqual(
+        self.query('SELECT t.name FROM sources s '
+                   'JOIN targets t ON t.id = s.target_id '
+                   'WHERE s.path = ? ORDER BY t.name', 'b/shared.cc'),
+        [('a/a.gyp:app#target',), ('b/b.gyp:lib#target',)])
+    self.assertEqual(
+        self.query('SELECT f.key, f.position, f.value FROM flags f '
+                   'JOIN targets t ON t.id = f.target_id '
+                   'WHERE t.target_name = ? AND f.configuration = ? '
+                   'ORDER BY f.key, f.position', 'app', 'Debug'),
+        [('defines', 0, 'DEBUG'), ('defines', 1, 'A'),
+         ('xcode_settings.OTHER_CFLAGS', 0, '-g')])
+    self.assertEqual(
+        self.query('SELECT t.name FROM edges e '
+                   'JOIN targets d ON d.id = e.dependency_id '
+                   'JOIN targets t ON t.id = e.target_id '
+                   'WHERE d.target_name = ?', 'lib'),
+        [('a/a.gyp:app#target',)])
+    self.assertEqual(
+        self.query('SELECT kind, name, inputs, outputs FROM actions'),
+        [('action', 'gen', '["a/gen.py"]', '["$!INTERMEDIATE_DIR/gen.h"]')])
+
+  def test_Incremental(self):
+    self.write()
+    self.assertEqual(self.write(), (0, 0))
+
+    # A change to the library rewrites only its rows, and keeps its id.
+    lib_id = self.query('SELECT id FROM targets WHERE target_name = ?', 'lib')
+    self.target_dicts['b/b.gyp:lib#target']['sources'].append('new.cc')
+    self.assertEqual(self.write(), (1, 0))
+    self.assertEqual(
+        self.query('SELECT id FROM targets WHERE target_name = ?', 'lib'),
+        lib_id)
+    self.assertEqual(
+        self.query('SELECT path FROM sources WHERE target_id = ? '
+                   'ORDER BY path', lib_id[0][0]),
+        [('b/lib.cc',), ('b/new.cc',), ('b/shared.cc',)])
+
+    # Removing the app removes its rows.
+    del self.target_dicts['a/a.gyp:app#target']
+    self.assertEqual(self.write(), (0, 1))
+    self.assertEqual(self.query('SELECT name FROM targets'),
+                     [('b/b.gyp:lib#target',)])
+    for table in ('edges', 'flags', 'actions'):
+      self.assertEqual(
+          self.query('SELECT COUNT(*) FROM %s WHERE target_id != ?' % table,
+                     lib_id[0][0]), [(0,)])
+
+  def test_SchemaChangeRewrites(self):
+    self.write()
+    self.query("UPDATE metadata SET value = '0' WHERE key = 'schema_version'")
+    self.assertEqual(self.write(), (2, 0))
+
+
+if __name__ == '__main__':
+  unittest.main()
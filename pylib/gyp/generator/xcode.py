@@ -2,7 +2,6 @@
 # Use of this source code is governed by a BSD-style license that can be
 # found in the LICENSE file.
 
-import filecmp
 import gyp.common
 import gyp.xcodeproj_file
 import gyp.xcode_ninja
@@ -13,7 +12,6 @@ import posixpath
 import re
 import shutil
 import subprocess
-import tempfile
 
 
 # Project files generated by this module will use _intermediate_var as a
@@ -87,6 +85,8 @@ generator_extra_sources_for_rules = [
   'mac_framework_private_headers',
 ]
 
+generator_supports_jumbo = True
+
 # Xcode's standard set of library directories, which don't need to be duplicated
 # in LIBRARY_SEARCH_PATHS. This list is not exhaustive, but that's okay.
 xcode_standard_library_dirs = frozenset([
@@ -428,58 +428,21 @@ sys.exit(subprocess.call(sys.argv[1:]))" """
     # changed but can't unload it because something else is referencing it.
     # To mitigate this problem, and to avoid even having Xcode present the UI
     # sheet when an open project is rewritten for inconsequential changes, the
-    # project file is written to a temporary file in the xcodeproj directory
-    # first.  The new temporary file is then compared to the existing project
-    # file, if any.  If they differ, the new file replaces the old; otherwise,
-    # the new project file is simply deleted.  Xcode properly detects a file
+    # project file is compared to the existing project file, if any, while it
+    # is printed.  Only if they differ is the new file written to a temporary
+    # file in the xcodeproj directory, which then replaces the old one;
+    # otherwise, nothing is written at all.  Xcode properly detects a file
     # being renamed over an open project file as a change and so it remains
     # able to present the "project file changed" sheet under this system.
     # Writing to a temporary file first also avoids the possible problem of
     # Xcode rereading an incomplete project file.
-    (output_fd, new_pbxproj_path) = \
-        tempfile.mkstemp(suffix='.tmp', prefix='project.pbxproj.gyp.',
-                         dir=self.path)
-
+    pbxproj_path = os.path.join(self.path, 'project.pbxproj')
     try:
-      output_file = os.fdopen(output_fd, 'wb')
-
-      self.project_file.Print(output_file)
-      output_file.close()
-
-      pbxproj_path = os.path.join(self.path, 'project.pbxproj')
-
-      same = False
-      try:
-        same = filecmp.cmp(pbxproj_path, new_pbxproj_path, False)
-      except OSError, e:
-        if e.errno != errno.ENOENT:
-          raise
-
-      if same:
-        # The new file is identical to the old one, just get rid of the new
-        # one.
-        os.unlink(new_pbxproj_path)
-      else:
-        # The new file is different from the old one, or there is no old one.
-        # Rename the new file to the permanent name.
-        #
-        # tempfile.mkstemp uses an overly restrictive mode, resulting in a
-        # file that can only be read by the owner, regardless of the umask.
-        # There's no reason to not respect the umask here, which means that
-        # an extra hoop is required to fetch it and reset the new file's mode.
-        #
-        # No way to get the umask without setting a new one?  Set a safe one
-        # and then set it back to the old value.
-        umask = os.umask(077)
-        os.umask(umask)
-
-        os.chmod(new_pbxproj_path, 0666 & ~umask)
-        os.rename(new_pbxproj_path, pbxproj_path)
-
+      with gyp.common.WriteOnDiff(pbxproj_path) as output_file:
+        self.project_file.Print(output_file)
     except Exception:
-      # Don't leave turds behind.  In fact, if this code was responsible for
-      # creating the xcodeproj directory, get rid of that too.
-      os.unlink(new_pbxproj_path)
+      # If this code was responsible for creating the xcodeproj directory, get
+      # rid of that too.
       if self.created_dir:
         shutil.rmtree(self.path, True)
       raise
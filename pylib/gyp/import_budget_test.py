@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014 Google Inc. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Checks that gyp doesn't import modules that a run doesn't need.
+
+Each test runs gyp in a new process and checks the modules it ended up
+importing, which is what most of the startup time of short gyp runs goes to.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+
+# Runs gyp with the given arguments, and prints the modules it imported.
+_RUN_GYP = '''
+import sys
+import gyp
+status = gyp.main(sys.argv[1:])
+sys.stdout.write(' '.join(sorted(sys.modules)))
+sys.exit(status)
+'''
+
+_GYP_FILE = '''{
+  'targets': [{
+    'target_name': 'hello',
+    'type': 'executable',
+    'sources': ['hello.cc'],
+  }],
+}'''
+
+# Imported only for the flavors or options that need them.
+_EMULATION_MODULES = ['gyp.xcode_emulation', 'gyp.msvs_emulation',
+                      'gyp.MSVSVersion']
+_PARALLEL_MODULES = ['multiprocessing']
+_CHECK_MODULES = ['compiler']
+
+
+class TestImportBudget(unittest.TestCase):
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.gyp_file = os.path.join(self.tmp_dir, 'hello.gyp')
+    with open(self.gyp_file, 'w') as f:
+      f.write(_GYP_FILE)
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def imported_modules(self, *args):
+    pylib = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    p = subprocess.Popen(
+        [sys.executable, '-c', _RUN_GYP, '--no-parallel',
+         '--depth', self.tmp_dir,
+         '--generator-output', os.path.join(self.tmp_dir, 'out'),
+         self.gyp_file] + list(args),
+        cwd=self.tmp_dir, env=dict(os.environ, PYTHONPATH=pylib),
+        stdout=subprocess.PIPE)
+    out = p.communicate()[0]
+    self.assertEqual(p.returncode, 0)
+    return set(out.split())
+
+  def assertNotImported(self, modules, imported):
+    self.assertEqual([m for m in modules if m in imported], [])
+
+  def test_Ninja(self):
+    imported = self.imported_modules('-f', 'ninja-linux')
+    self.assertNotImported(
+        _EMULATION_MODULES + _PARALLEL_MODULES + _CHECK_MODULES, imported)
+
+  def test_Make(self):
+    # The make generator uses xcode_emulation on every flavor.
+    imported = self.imported_modules('-f', 'make-linux')
+    self.assertNotImported(
+        ['gyp.msvs_emulation', 'gyp.MSVSVersion'] + _PARALLEL_MODULES +
+        _CHECK_MODULES, imported)
+
+  def test_Gypd(self):
+    imported = self.imported_modules('-f', 'gypd')
+    self.assertNotImported(
+        _EMULATION_MODULES + _PARALLEL_MODULES + _CHECK_MODULES +
+        ['gyp.generator.msvs', 'gyp.generator.ninja'], imported)
+
+  def test_DumpDependencyJson(self):
+    imported = self.imported_modules('-f', 'dump_dependency_json-linux')
+    self.assertNotImported(
+        _EMULATION_MODULES + _PARALLEL_MODULES + _CHECK_MODULES +
+        ['gyp.generator.msvs', 'gyp.generator.ninja'], imported)
+
+  def test_Analyzer(self):
+    config_path = os.path.join(self.tmp_dir, 'config.json')
+    with open(config_path, 'w') as f:
+      f.write('{"files": ["hello.cc"], "test_targets": [], '
+              '"additional_compile_targets": []}')
+    imported = self.imported_modules(
+        '-f', 'analyzer-linux', '-G', 'config_path=' + config_path,
+        '-G', 'analyzer_output_path=' + os.path.join(self.tmp_dir, 'out.json'))
+    self.assertNotImported(
+        _EMULATION_MODULES + _PARALLEL_MODULES + _CHECK_MODULES +
+        ['gyp.generator.msvs', 'gyp.generator.ninja'], imported)
+
+
+if __name__ == '__main__':
+  unittest.main()
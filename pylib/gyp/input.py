@@ -5,7 +5,7 @@
 from __future__ import print_function
 import gyp.common
 import gyp.simple_copy
-import multiprocessing
+import operator
 import optparse
 import os.path
 import re
@@ -23,11 +23,6 @@ from gyp.common import OrderedSet
 _PYTHON3 = sys.version_info >= (3, 0, 0)
 
 
-if not _PYTHON3:
-  from compiler.ast import Const, Dict, Discard, List, Module, Node, Stmt
-  import compiler
-
-
 # A list of types that are treated as linkable.
 linkable_types = ['executable', 'shared_library', 'loadable_module']
 
@@ -43,6 +38,7 @@ base_path_sections = [
   'files',
   'include_dirs',
   'inputs',
+  'jumbo_excluded_sources',
   'libraries',
   'outputs',
   'sources',
@@ -90,6 +86,10 @@ base_non_configuration_keys = [
   'default_configuration',
   'dependencies',
   'dependencies_original',
+  'jumbo',
+  'jumbo_excluded_sources',
+  'jumbo_file_merge_limit',
+  'jumbo_max_bytes',
   'libraries',
   'postbuilds',
   'product_dir',
@@ -180,6 +180,9 @@ def CheckedEval(file_contents):
 
   if _PYTHON3:
     return eval(build_file_contents, {'__builtins__': None}, None)
+  # Only needed with --check, and slow to import.
+  import compiler
+  from compiler.ast import Discard, Module, Stmt
   ast = compiler.parse(file_contents)
   assert isinstance(ast, Module)
   c1 = ast.getChildren()
@@ -193,6 +196,7 @@ def CheckedEval(file_contents):
 
 
 def CheckNode(node, keypath):
+  from compiler.ast import Const, Dict, List
   if isinstance(node, Dict):
     c = node.getChildren()
     dict = {}
@@ -222,12 +226,21 @@ def CheckNode(node, keypath):
          "': " + repr(node))
 
 
-def LoadOneBuildFile(build_file_path, data, aux_data, includes,
-                     is_target, check):
-  if build_file_path in data:
-    return data[build_file_path]
+# While several variants of the build are loaded, the contents of each build
+# file as parsed, by path.  See ReadBuildFile.
+parsed_build_files = None
 
-  if os.path.exists(build_file_path):
+
+def ReadBuildFile(build_file_path, check):
+  """Returns the contents of a build file, before its includes are merged.
+
+  While parsed_build_files is set, each file is only parsed once, and a copy
+  of its contents returned every time.
+  """
+  if parsed_build_files is not None and build_file_path in parsed_build_files:
+    return gyp.simple_copy.deepcopy(parsed_build_files[build_file_path])
+
+  if gyp.common.file_system_cache.Exists(build_file_path):
     build_file_contents = open(build_file_path).read()
   else:
     raise GypError("%s not found (cwd: %s)" % (build_file_path, os.getcwd()))
@@ -251,16 +264,37 @@ def LoadOneBuildFile(build_file_path, data, aux_data, includes,
   if type(build_file_data) is not dict:
     raise GypError("%s does not evaluate to a dictionary." % build_file_path)
 
+  if parsed_build_files is not None:
+    parsed_build_files[build_file_path] = \
+        gyp.simple_copy.deepcopy(build_file_data)
+  return build_file_data
+
+
+def LoadOneBuildFile(build_file_path, data, aux_data, includes,
+                     is_target, check, variables=None):
+  """Loads a build file and merges its includes into it.
+
+  If the |variables| that the target build file will be processed with are
+  given, the conditions of its includes that only read those variables are
+  decided once for each include and set of values, see IncludeSpecializer.
+  """
+  if build_file_path in data:
+    return data[build_file_path]
+
+  build_file_data = ReadBuildFile(build_file_path, check)
   data[build_file_path] = build_file_data
   aux_data[build_file_path] = {}
 
   # Scan for includes and merge them in.
+  specializer = None
   if ('skip_includes' not in build_file_data or
       not build_file_data['skip_includes']):
+    if is_target and variables is not None:
+      specializer = IncludeSpecializer(variables)
     try:
       if is_target:
         LoadBuildFileIncludesIntoDict(build_file_data, build_file_path, data,
-                                      aux_data, includes, check)
+                                      aux_data, includes, check, specializer)
       else:
         LoadBuildFileIncludesIntoDict(build_file_data, build_file_path, data,
                                       aux_data, None, check)
@@ -270,11 +304,20 @@ def LoadOneBuildFile(build_file_path, data, aux_data, includes,
                                  'while reading includes of ' + build_file_path)
       raise
 
+  if specializer and not specializer.IsValidFor(build_file_data):
+    # The build file rebinds some of the variables that decided conditions of
+    # its includes.  Load it again, evaluating them all in place.
+    gyp.DebugOutput(gyp.DEBUG_INCLUDES,
+                    "Not specializing the includes of '%s'", build_file_path)
+    del data[build_file_path]
+    return LoadOneBuildFile(build_file_path, data, aux_data, includes,
+                            is_target, check)
+
   return build_file_data
 
 
 def LoadBuildFileIncludesIntoDict(subdict, subdict_path, data, aux_data,
-                                  includes, check):
+                                  includes, check, specializer=None):
   includes_list = []
   if includes != None:
     includes_list.extend(includes)
@@ -297,9 +340,11 @@ def LoadBuildFileIncludesIntoDict(subdict, subdict_path, data, aux_data,
 
     gyp.DebugOutput(gyp.DEBUG_INCLUDES, "Loading Included File: '%s'", include)
 
-    MergeDicts(subdict,
-               LoadOneBuildFile(include, data, aux_data, None, False, check),
-               subdict_path, include)
+    include_data = LoadOneBuildFile(include, data, aux_data, None, False,
+                                    check)
+    if specializer:
+      include_data = specializer.Specialize(include, include_data)
+    MergeDicts(subdict, include_data, subdict_path, include)
 
   # Recurse into subdictionaries.
   for k, v in subdict.items():
@@ -320,9 +365,270 @@ def LoadBuildFileIncludesIntoList(sublist, sublist_path, data, aux_data, check):
     elif type(item) is list:
       LoadBuildFileIncludesIntoList(item, sublist_path, data, aux_data, check)
 
+# The conditions of each include that can be decided from the variables that
+# target build files are processed with, by include; and the include with
+# those conditions decided, by include, the conditions decided and the names
+# and values of the variables they read.  Both are cleared by each Load,
+# except between the variants of LoadVariants.
+specializable_include_conditions = {}
+specialized_includes = {}
+
+
+def ClearIncludeCaches():
+  specializable_include_conditions.clear()
+  specialized_includes.clear()
+
+
+def _DeclaredVariables(variables_dict, bound, declared):
+  """Adds the variables that |variables_dict|, a 'variables' dict, sets in
+  any case to |bound|, and all those it sets to |declared|."""
+  for key, value in variables_dict.items():
+    if key == 'conditions' and type(value) is list:
+      for condition in value:
+        if type(condition) is list:
+          for branch in condition[1:]:
+            if type(branch) is dict:
+              _DeclaredVariables(branch, bound, declared)
+    elif key != 'variables':
+      if not key.endswith('%'):
+        bound.add(key)
+      declared.add(key.rstrip('%'))
+
+
+def _SpecializableConditions(node, in_targets, conditions, bound, declared):
+  """Appends the early conditions in |node| that could be decided before
+  merging it, with their code and whether they are in targets, to
+  |conditions| unless it is None, and adds the variables it declares to
+  |bound| and |declared| as _DeclaredVariables does.
+
+  Those are the well formed conditions that don't need expanding, and don't
+  read automatic variables, which depend on where they are evaluated.
+  """
+  if type(node) is list:
+    for item in node:
+      _SpecializableConditions(item, in_targets, conditions, bound, declared)
+    return
+  if type(node) is not dict:
+    return
+  if type(node.get('variables')) is dict:
+    _DeclaredVariables(node['variables'], bound, declared)
+  for key, value in node.items():
+    if key == 'target_conditions':
+      # Evaluated in the late phase.
+      continue
+    if key == 'conditions' and type(value) is list:
+      for condition in value:
+        if conditions is None:
+          break
+        if (type(condition) is list and len(condition) in (2, 3) and
+            type(condition[0]) is str and '<' not in condition[0] and
+            not [d for d in condition[1:] if type(d) is not dict]):
+          try:
+            code = compile(condition[0], '<string>', 'eval')
+          except SyntaxError:
+            code = None
+          if code and not [n for n in CodeNames(code) if n.startswith('_')]:
+            conditions.append((condition, code, in_targets))
+    _SpecializableConditions(value, in_targets or key == 'targets',
+                             conditions, bound, declared)
+
+
+def _SpecializeNode(node, decided):
+  """Returns a copy of |node| with the conditions in |decided| replaced.
+
+  |decided| maps the id of a condition to what it is replaced with, a
+  condition that is always true or None to drop it.  Unchanged parts of
+  |node| are shared with the copy.
+  """
+  if type(node) is list:
+    new_node = []
+    for item in node:
+      if id(item) in decided:
+        item = decided[id(item)]
+        if item is None:
+          continue
+      new_node.append(_SpecializeNode(item, decided))
+    return new_node
+  if type(node) is dict:
+    return dict((key, _SpecializeNode(value, decided))
+                for key, value in node.items())
+  return node
+
+
+def _HasToolsetVariable(name, declared):
+  """Returns whether a variable of |declared| could stand for |name| in a
+  target, the way host_arch stands for arch and host_os for OS when the
+  toolset is host."""
+  suffix = '_' + (name == 'OS' and 'os' or name)
+  return bool([d for d in declared if d.endswith(suffix) and d != name])
+
+
+class IncludeSpecializer(object):
+  """Decides the conditions of the includes of one target build file.
+
+  Shared includes such as common.gypi have many conditions on global
+  variables such as OS, whose results are the same for every build file that
+  includes them.  Rather than merge every branch into every build file and
+  evaluate the conditions there, conditions that only read variables of
+  |variables| are decided once for each include and values of the variables
+  they read, and replaced with the branch they take.
+
+  That is what the early phase would do, unless the build file binds one of
+  those variables to something else.  IsValidFor checks for that once the
+  includes have been merged, in which case the build file needs to be loaded
+  again without specializing.
+  """
+
+  def __init__(self, variables):
+    self.variables = variables
+    # The variables read by decided conditions outside and inside targets.
+    self.names = set()
+    self.target_names = set()
+
+  def Specialize(self, include, include_data):
+    """Returns |include_data| with its conditions on |variables| decided."""
+    cached = specializable_include_conditions.get(include)
+    if not cached or cached[0] is not include_data:
+      # The conditions are found by identity, so keep |include_data| with them.
+      conditions = []
+      declared = set()
+      _SpecializableConditions(include_data, False, conditions, set(),
+                               declared)
+      cached = (include_data, conditions, declared)
+      specializable_include_conditions[include] = cached
+    conditions, declared = cached[1:]
+    declared = declared | set(self.variables)
+    decidable = [
+        index for index, (_, code, in_targets) in enumerate(conditions)
+        if not [n for n in CodeNames(code) if n not in self.variables or
+                (in_targets and _HasToolsetVariable(n, declared))]]
+    if not decidable:
+      return include_data
+    conditions = [conditions[index] for index in decidable]
+
+    names = set()
+    for _, code, _ in conditions:
+      names.update(CodeNames(code))
+    names = tuple(sorted(names))
+    values = tuple([self.variables[n] for n in names])
+    key = (include, tuple(decidable), names, values)
+    try:
+      specialized = specialized_includes.get(key)
+    except TypeError:
+      # A list variable.
+      return include_data
+    if specialized is None:
+      decided = {}
+      for condition, code, _ in conditions:
+        try:
+          result = eval(code, {'__builtins__': None}, self.variables)
+        except Exception:
+          # Left for the early phase to report.
+          continue
+        if result:
+          decided[id(condition)] = ['1==1', condition[1]]
+        elif len(condition) == 3:
+          decided[id(condition)] = ['1==1', condition[2]]
+        else:
+          decided[id(condition)] = None
+      specialized = _SpecializeNode(include_data, decided)
+      specialized_includes[key] = specialized
+      gyp.DebugOutput(gyp.DEBUG_INCLUDES, "Specialized '%s' for %s",
+                      include, dict(zip(names, values)))
+
+    for _, code, in_targets in conditions:
+      if in_targets:
+        self.target_names.update(CodeNames(code))
+      else:
+        self.names.update(CodeNames(code))
+    return specialized
+
+  def IsValidFor(self, build_file_data):
+    """Returns whether the decided conditions would have been decided the same
+    way in the early phase of |build_file_data|."""
+    if not self.names and not self.target_names:
+      return True
+    bound = set()
+    declared = set(self.variables)
+    _SpecializableConditions(build_file_data, False, None, bound, declared)
+    if bound & (self.names | self.target_names):
+      return False
+    for name in self.target_names:
+      if _HasToolsetVariable(name, declared):
+        return False
+    return True
+
+
+def _ConditionMergeKeys(conditions):
+  """Returns the keys of a dict that its |conditions| could merge into."""
+  keys = set()
+  for condition in conditions:
+    if type(condition) is not list:
+      continue
+    for branch in condition[1:]:
+      if type(branch) is not dict:
+        continue
+      for key in branch:
+        keys.add(key)
+        # The list merge policies, see MergeDicts.
+        keys.add(key.rstrip('=+?'))
+      if type(branch.get('conditions')) is list:
+        keys.update(_ConditionMergeKeys(branch['conditions']))
+  return keys
+
+
+def CloneForToolset(node):
+  """Copies the parts of |node| that the early phase could change.
+
+  Those are the strings with early variable references, the dicts with
+  'conditions', and whatever their conditions could merge into; everything
+  else is left as it is by the early phase whatever the toolset, so the copy
+  shares it with |node|.  That can only last until the late phases, which
+  change the targets in place.
+
+  Returns the copy, and whether it is a copy rather than |node| itself.
+  """
+  if type(node) is dict:
+    items = []
+    copied = 'conditions' in node
+    merge_keys = ()
+    if copied and type(node['conditions']) is list:
+      merge_keys = _ConditionMergeKeys(node['conditions'])
+    for key, value in node.items():
+      if key in merge_keys:
+        items.append((key, gyp.simple_copy.deepcopy(value)))
+        continue
+      value, value_copied = CloneForToolset(value)
+      copied = copied or value_copied
+      items.append((key, value))
+    if copied:
+      return dict(items), True
+  elif type(node) is list:
+    try:
+      # Most lists are lists of strings, which this checks much faster.
+      if '<' not in ''.join(node):
+        return node, False
+    except TypeError:
+      pass
+    items = []
+    copied = False
+    for item in node:
+      item, item_copied = CloneForToolset(item)
+      copied = copied or item_copied
+      items.append(item)
+    if copied:
+      return items, True
+  elif type(node) is str and '<' in node:
+    return node, True
+  return node, False
+
+
 # Processes toolsets in all the targets. This recurses into condition entries
-# since they can contain toolsets as well.
+# since they can contain toolsets as well.  Returns the targets it added for
+# the other toolsets, which share parts with the original target, see
+# CloneForToolset.
 def ProcessToolsetsInDict(data):
+  clones = []
   if 'targets' in data:
     target_list = data['targets']
     new_target_list = []
@@ -342,9 +648,12 @@ def ProcessToolsetsInDict(data):
       if len(toolsets) > 0:
         # Optimization: only do copies if more than one toolset is specified.
         for build in toolsets[1:]:
-          new_target = gyp.simple_copy.deepcopy(target)
+          new_target = CloneForToolset(target)[0]
+          if new_target is target:
+            new_target = target.copy()
           new_target['toolset'] = build
           new_target_list.append(new_target)
+          clones.append(new_target)
         target['toolset'] = toolsets[0]
         new_target_list.append(target)
     data['targets'] = new_target_list
@@ -353,7 +662,8 @@ def ProcessToolsetsInDict(data):
       if type(condition) is list:
         for condition_dict in condition[1:]:
           if type(condition_dict) is dict:
-            ProcessToolsetsInDict(condition_dict)
+            clones.extend(ProcessToolsetsInDict(condition_dict))
+  return clones
 
 
 # TODO(mark): I don't love this name.  It just means that it's going to load
@@ -389,7 +699,7 @@ def LoadTargetBuildFile(build_file_path, data, aux_data, variables, includes,
                   "Loading Target Build File '%s'", build_file_path)
 
   build_file_data = LoadOneBuildFile(build_file_path, data, aux_data,
-                                     includes, True, check)
+                                     includes, True, check, variables)
 
   # Store DEPTH for later use in generators.
   build_file_data['_DEPTH'] = depth
@@ -411,7 +721,7 @@ def LoadTargetBuildFile(build_file_path, data, aux_data, variables, includes,
 
   # Do a first round of toolsets expansion so that conditions can be defined
   # per toolset.
-  ProcessToolsetsInDict(build_file_data)
+  clones = ProcessToolsetsInDict(build_file_data)
 
   # Apply "pre"/"early" variable expansions and condition evaluations.
   ProcessVariablesAndConditionsInDict(
@@ -419,7 +729,7 @@ def LoadTargetBuildFile(build_file_path, data, aux_data, variables, includes,
 
   # Since some toolsets might have been defined conditionally, perform
   # a second round of toolsets expansion now.
-  ProcessToolsetsInDict(build_file_data)
+  clones.extend(ProcessToolsetsInDict(build_file_data))
 
   # Look at each project's target_defaults dict, and merge settings into
   # targets.
@@ -447,6 +757,14 @@ def LoadTargetBuildFile(build_file_path, data, aux_data, variables, includes,
 
     # No longer needed.
     del build_file_data['target_defaults']
+  elif clones:
+    # The targets were not copied into the defaults, so the clones still share
+    # parts with the targets they were cloned from.  Copy them before the late
+    # phases change them.
+    clone_ids = set(id(clone) for clone in clones)
+    build_file_data['targets'] = [
+        id(target) in clone_ids and gyp.simple_copy.deepcopy(target) or target
+        for target in build_file_data['targets']]
 
   # Look for dependencies.  This means that dependency resolution occurs
   # after "pre" conditionals and variable expansion, but before "post" -
@@ -552,6 +870,9 @@ class ParallelState(object):
     self.dependencies = []
     # Flag to indicate if there was an error in a child process.
     self.error = False
+    # The RootTargetClosure that decides which dependencies to load, if not
+    # all of them.
+    self.closure = None
 
   def LoadTargetBuildFileCallback(self, result):
     """Handle the results of running LoadTargetBuildFile in another process.
@@ -565,22 +886,32 @@ class ParallelState(object):
     (build_file_path0, build_file_data0, dependencies0) = result
     self.data[build_file_path0] = build_file_data0
     self.data['target_build_files'].add(build_file_path0)
-    for new_dependency in dependencies0:
-      if new_dependency not in self.scheduled:
-        self.scheduled.add(new_dependency)
-        self.dependencies.append(new_dependency)
+    if self.closure:
+      self.dependencies.extend(
+          self.closure.AddBuildFile(build_file_path0, build_file_data0))
+    else:
+      for new_dependency in dependencies0:
+        if new_dependency not in self.scheduled:
+          self.scheduled.add(new_dependency)
+          self.dependencies.append(new_dependency)
     self.pending -= 1
+    if self.closure and not self.pending and not self.dependencies:
+      self.dependencies = self.closure.SearchBuildFiles()
     self.condition.notify()
     self.condition.release()
 
 
 def LoadTargetBuildFilesParallel(build_files, data, variables, includes, depth,
-                                 check, generator_input_info):
+                                 check, generator_input_info,
+                                 root_targets=None):
   parallel_state = ParallelState()
   parallel_state.condition = threading.Condition()
   # Make copies of the build_files argument that we can modify while working.
   parallel_state.dependencies = list(build_files)
   parallel_state.scheduled = set(build_files)
+  if root_targets:
+    parallel_state.closure = RootTargetClosure(root_targets)
+    parallel_state.closure.Schedule(build_files)
   parallel_state.pending = 0
   parallel_state.data = data
 
@@ -602,6 +933,7 @@ def LoadTargetBuildFilesParallel(build_files, data, variables, includes, depth,
         'multiple_toolsets': globals()['multiple_toolsets']}
 
       if not parallel_state.pool:
+        import multiprocessing
         parallel_state.pool = multiprocessing.Pool(multiprocessing.cpu_count())
       parallel_state.pool.apply_async(
           CallLoadTargetBuildFile,
@@ -622,6 +954,147 @@ def LoadTargetBuildFilesParallel(build_files, data, variables, includes, depth,
   if parallel_state.error:
     sys.exit(1)
 
+  if parallel_state.closure:
+    parallel_state.closure.PruneUnneededTargets()
+
+
+class RootTargetClosure(object):
+  """Decides which build files to load when only some targets are wanted.
+
+  The normal loaders follow the dependencies of every target in a build file.
+  This follows only those of the targets named by |root_targets| and of their
+  deep dependencies, so that the build files loaded are the ones that
+  closure spans, however big the rest of the tree is.
+
+  Targets are tracked by build file and name, regardless of their toolset,
+  which may keep a few targets too many; PruneUnwantedTargets removes those
+  once the dependencies are qualified.  The root targets are looked for in
+  every build file loaded.  If some aren't found by the time the closure is
+  loaded, the dependencies of the other targets are loaded as well, as the
+  normal loaders would have, until they are.
+  """
+
+  def __init__(self, root_targets):
+    self.root_targets = set(target.strip() for target in root_targets)
+    self.found_root_targets = set()
+    # The build file data of the loaded build files.
+    self.loaded = {}
+    # The build files that have been scheduled to load.
+    self.scheduled = set()
+    # Maps each build file to the names of its needed targets; '*' for all.
+    self.needed = {}
+
+  def Schedule(self, build_files):
+    """Returns those of |build_files| not scheduled yet, now scheduled."""
+    new_build_files = []
+    for build_file in build_files:
+      if build_file not in self.scheduled:
+        self.scheduled.add(build_file)
+        new_build_files.append(build_file)
+    return new_build_files
+
+  def _Need(self, build_file, target_name, new_build_files):
+    """Marks a target as needed, and its dependencies, recursively.
+
+    Build files that need loading before that can be done are appended to
+    |new_build_files|.
+    """
+    stack = [(build_file, target_name)]
+    while stack:
+      build_file, target_name = stack.pop()
+      needed = self.needed.setdefault(build_file, set())
+      if target_name in needed or '*' in needed:
+        continue
+      needed.add(target_name)
+      if build_file not in self.loaded:
+        new_build_files.extend(self.Schedule([build_file]))
+        continue
+      for target_dict in self.loaded[build_file].get('targets', []):
+        if target_name != '*' and target_dict['target_name'] != target_name:
+          continue
+        for dependency in target_dict.get('dependencies', []):
+          dependency_file, dependency_name = \
+              gyp.common.ResolveTarget(build_file, dependency, None)[:2]
+          stack.append((dependency_file, dependency_name))
+
+  def AddBuildFile(self, build_file, build_file_data):
+    """Records a loaded build file.
+
+    Returns the build files that its needed targets depend on and that
+    haven't been scheduled yet.
+    """
+    self.loaded[build_file] = build_file_data
+    self.scheduled.add(build_file)
+    new_build_files = []
+    targets = build_file_data.get('targets', [])
+    for target_name in self.needed.pop(build_file, ()):
+      self._Need(build_file, target_name, new_build_files)
+    for target_dict in targets:
+      if target_dict['target_name'] in self.root_targets:
+        self.found_root_targets.add(target_dict['target_name'])
+        self._Need(build_file, target_dict['target_name'], new_build_files)
+    return new_build_files
+
+  def SearchBuildFiles(self):
+    """Returns the build files to load while looking for root targets.
+
+    These are the build files that the targets that aren't needed depend on,
+    or nothing once every root target has been found.
+    """
+    if self.found_root_targets == self.root_targets:
+      return []
+    build_files = []
+    for build_file, build_file_data in self.loaded.items():
+      for target_dict in build_file_data.get('targets', []):
+        for dependency in target_dict.get('dependencies', []):
+          build_files.append(
+              gyp.common.ResolveTarget(build_file, dependency, None)[0])
+    return self.Schedule(build_files)
+
+  def PruneUnneededTargets(self):
+    """Removes the targets that aren't needed from the loaded build files."""
+    for build_file, build_file_data in self.loaded.items():
+      if 'targets' not in build_file_data:
+        continue
+      needed = self.needed.get(build_file, ())
+      if '*' in needed:
+        continue
+      build_file_data['targets'] = [
+          target_dict for target_dict in build_file_data['targets']
+          if target_dict['target_name'] in needed]
+
+
+def LoadTargetBuildFilesLazily(build_files, data, variables, includes, depth,
+                               check, root_targets):
+  """Loads the build files spanned by the closure of |root_targets|.
+
+  See RootTargetClosure.  Only the targets in that closure are kept in |data|.
+  """
+  closure = RootTargetClosure(root_targets)
+  aux_data = {}
+  pending = closure.Schedule(sorted(build_files))
+  # Maps each build file to the one whose targets first depended on it.
+  required_by = {}
+  while pending:
+    build_file = pending.pop(0)
+    try:
+      LoadTargetBuildFile(build_file, data, aux_data, variables, includes,
+                          depth, check, False)
+    except Exception:
+      e = sys.exc_info()[1]
+      if build_file in required_by:
+        gyp.common.ExceptionAppend(
+            e, 'while loading dependencies of %s' % required_by[build_file])
+      else:
+        gyp.common.ExceptionAppend(e, 'while trying to load %s' % build_file)
+      raise
+    for dependency in closure.AddBuildFile(build_file, data[build_file]):
+      required_by[dependency] = build_file
+      pending.append(dependency)
+    if not pending:
+      pending = closure.SearchBuildFiles()
+  closure.PruneUnneededTargets()
+
 # Look for the bracket that matches the first bracket seen in a
 # string, and return the start and end as a tuple.  For example, if
 # the input is something like "<(foo <(bar)) blah", then it would
@@ -1029,8 +1502,21 @@ def ExpandVariables(input, phase, variables, build_file):
 
 # The same condition is often evaluated over and over again so it
 # makes sense to cache as much as possible between evaluations.
+# cached_conditions_asts maps each condition to its code, a function that
+# returns the values of the variables the code reads, and the results of the
+# condition by those values.
 cached_conditions_asts = {}
 
+
+def CodeNames(code):
+  """Returns the names that |code| and the code nested in it read."""
+  names = set(code.co_names)
+  for const in code.co_consts:
+    if hasattr(const, 'co_names'):
+      names.update(CodeNames(const))
+  return tuple(sorted(names))
+
+
 def EvalCondition(condition, conditions_key, phase, variables, build_file):
   """Returns the dict that should be used or None if the result was
   that nothing should be used."""
@@ -1083,11 +1569,35 @@ def EvalSingleCondition(
 
   try:
     if cond_expr_expanded in cached_conditions_asts:
-      ast_code = cached_conditions_asts[cond_expr_expanded]
+      ast_code, get_values, results = \
+          cached_conditions_asts[cond_expr_expanded]
     else:
       ast_code = compile(cond_expr_expanded, '<string>', 'eval')
-      cached_conditions_asts[cond_expr_expanded] = ast_code
-    if eval(ast_code, {'__builtins__': None}, variables):
+      names = CodeNames(ast_code)
+      if names:
+        get_values = operator.itemgetter(*names)
+      else:
+        get_values = lambda variables: ()
+      results = {}
+      cached_conditions_asts[cond_expr_expanded] = \
+          ast_code, get_values, results
+    # The result only depends on the values of the variables the condition
+    # reads, so it is memoized by them.  It isn't if some of the names aren't
+    # variables, which fails or reads an attribute, or if a value is a list.
+    try:
+      values = get_values(variables)
+    except KeyError:
+      values = None
+    try:
+      result = results[values]
+    except (KeyError, TypeError):
+      result = bool(eval(ast_code, {'__builtins__': None}, variables))
+      if values is not None:
+        try:
+          results[values] = result
+        except TypeError:
+          pass
+    if result:
       return true_dict
     return false_dict
   except SyntaxError:
@@ -2616,6 +3126,40 @@ def ValidateActionsInTarget(target, target_dict, build_file):
       raise GypError("Empty action as command in target %s." % target_name)
 
 
+def TrimBuildFileData(data, keys):
+  """Returns the part of |data| that generators read.
+
+  That is, for each target build file, only the |keys| of its dict, such as
+  included_files or make_global_settings.  Its targets are already in the
+  targets dict, and the included build files are left out altogether, so
+  this is much smaller to keep around and to pickle for worker processes.
+  """
+  trimmed_data = {'target_build_files': data['target_build_files']}
+  for build_file in data['target_build_files']:
+    build_file_data = data[build_file]
+    trimmed_data[build_file] = dict(
+        (key, build_file_data[key]) for key in keys if key in build_file_data)
+  return trimmed_data
+
+
+def MemoryReport(data, trimmed_data, targets):
+  """Returns a report of how much TrimBuildFileData saves, in pickled
+  bytes."""
+  import pickle
+  def PickledSize(value):
+    return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+  # The target dicts are in |data| as well, so leave them out of its size.
+  without_targets = dict(
+      (build_file, build_file_data) for build_file, build_file_data in
+      data.items() if build_file != 'target_build_files')
+  for build_file in data['target_build_files']:
+    without_targets[build_file] = dict(data[build_file], targets=[])
+  return ('data: %d build files, %d bytes; trimmed to %d bytes; '
+          'targets: %d, %d bytes' %
+          (len(without_targets), PickledSize(without_targets),
+           PickledSize(trimmed_data), len(targets), PickledSize(targets)))
+
+
 def TurnIntIntoStrInDict(the_dict):
   """Given dict the_dict, recursively converts all integers into strings.
   """
@@ -2729,9 +3273,38 @@ def SetGeneratorGlobals(generator_input_info):
   generator_filelist_paths = generator_input_info['generator_filelist_paths']
 
 
+def LoadVariants(build_files, variables_list, includes, depth,
+                 generator_input_info, check, circular_check, root_targets,
+                 lazy_load=False):
+  """Loads the build files once for each dict of variables in
+  |variables_list|, and returns a list of what Load returns for each.
+
+  The variants share the work that doesn't depend on the variables: each
+  build file is parsed once, and the cached results of commands, of
+  conditions and of the conditions of includes apply to all of them.  The
+  caches are in this process, so the variants are loaded without
+  multiprocessing.
+  """
+  global parsed_build_files
+  ClearIncludeCaches()
+  parsed_build_files = {}
+  try:
+    results = []
+    for variables in variables_list:
+      results.append(Load(build_files, variables, includes[:], depth,
+                          generator_input_info, check, circular_check, False,
+                          root_targets, lazy_load))
+    return results
+  finally:
+    parsed_build_files = None
+
+
 def Load(build_files, variables, includes, depth, generator_input_info, check,
-         circular_check, parallel, root_targets):
+         circular_check, parallel, root_targets, lazy_load=False):
   SetGeneratorGlobals(generator_input_info)
+  if parsed_build_files is None:
+    # The includes may have changed since the last Load.
+    ClearIncludeCaches()
   # A generator can have other lists (in addition to sources) be processed
   # for rules.
   extra_sources_for_rules = generator_input_info['extra_sources_for_rules']
@@ -2747,9 +3320,15 @@ def Load(build_files, variables, includes, depth, generator_input_info, check,
   # Normalize paths everywhere.  This is important because paths will be
   # used as keys to the data dict and for references between input files.
   build_files = set(map(os.path.normpath, build_files))
+  # With |lazy_load|, only the build files that |root_targets| need are loaded.
+  lazy_root_targets = lazy_load and root_targets or None
   if parallel:
     LoadTargetBuildFilesParallel(build_files, data, variables, includes, depth,
-                                 check, generator_input_info)
+                                 check, generator_input_info,
+                                 lazy_root_targets)
+  elif lazy_root_targets:
+    LoadTargetBuildFilesLazily(build_files, data, variables, includes, depth,
+                               check, lazy_root_targets)
   else:
     aux_data = {}
     for build_file in build_files:
@@ -2867,8 +3446,19 @@ def Load(build_files, variables, includes, depth, generator_input_info, check,
     ValidateRunAsInTarget(target, target_dict, build_file)
     ValidateActionsInTarget(target, target_dict, build_file)
 
+  build_file_data_keys = generator_input_info['generator_build_file_data_keys']
+  if build_file_data_keys is not None:
+    # Only keep what the generator reads of |data|.
+    trimmed_data = TrimBuildFileData(data, build_file_data_keys)
+    if gyp.DEBUG_MEMORY in gyp.debug or 'all' in gyp.debug:
+      gyp.DebugOutput(gyp.DEBUG_MEMORY,
+                      MemoryReport(data, trimmed_data, targets))
+    data = trimmed_data
+
   # Generators might not expect ints.  Turn them into strs.
   TurnIntIntoStrInDict(data)
+  if build_file_data_keys is not None:
+    TurnIntIntoStrInDict(targets)
 
   # TODO(mark): Return |data| for now because the generator needs a list of
   # build files that came in.  In the future, maybe it should just accept
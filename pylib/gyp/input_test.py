@@ -7,8 +7,11 @@
 """Unit tests for the input.py file."""
 
 import gyp.input
-import unittest
+import os
+import shutil
 import sys
+import tempfile
+import unittest
 
 
 class TestFindCycles(unittest.TestCase):
@@ -86,5 +89,321 @@ class TestFindCycles(unittest.TestCase):
                       self.nodes['a'].FindCycles())
 
 
+class TestRootTargetClosure(unittest.TestCase):
+  # What each build file would load as, by build file.
+  build_files = {
+    'a.gyp': {'targets': [
+      {'target_name': 'a1', 'dependencies': ['b.gyp:b1', 'a2']},
+      {'target_name': 'a2'},
+      {'target_name': 'a3', 'dependencies': ['c.gyp:c1']},
+    ]},
+    'b.gyp': {'targets': [
+      {'target_name': 'b1', 'dependencies': ['d.gyp:*']},
+      {'target_name': 'b2', 'dependencies': ['e.gyp:e1']},
+    ]},
+    'c.gyp': {'targets': [{'target_name': 'c1'}]},
+    'd.gyp': {'targets': [{'target_name': 'd1'}, {'target_name': 'd2'}]},
+    'e.gyp': {'targets': [{'target_name': 'e1'}]},
+  }
+
+  def load(self, closure, build_file):
+    """Loads build_file and the ones it leads to, returns the ones loaded."""
+    loaded = []
+    pending = closure.Schedule([build_file])
+    while pending:
+      build_file = pending.pop(0)
+      loaded.append(build_file)
+      pending.extend(closure.AddBuildFile(
+          build_file, {'targets': [dict(t) for t in
+                                   self.build_files[build_file]['targets']]}))
+      if not pending:
+        pending = closure.SearchBuildFiles()
+    closure.PruneUnneededTargets()
+    return loaded
+
+  def target_names(self, closure):
+    return dict((build_file, [t['target_name'] for t in data['targets']])
+                for build_file, data in closure.loaded.items())
+
+  def test_LoadsOnlyTheClosure(self):
+    closure = gyp.input.RootTargetClosure(['a1'])
+    self.assertEqual(self.load(closure, 'a.gyp'), ['a.gyp', 'b.gyp', 'd.gyp'])
+    self.assertEqual(self.target_names(closure),
+                     {'a.gyp': ['a1', 'a2'], 'b.gyp': ['b1'],
+                      'd.gyp': ['d1', 'd2']})
+
+  def test_SearchesForRootTargets(self):
+    closure = gyp.input.RootTargetClosure(['e1 ', 'c1'])
+    self.assertEqual(sorted(self.load(closure, 'a.gyp')),
+                     ['a.gyp', 'b.gyp', 'c.gyp', 'd.gyp', 'e.gyp'])
+    self.assertEqual(self.target_names(closure),
+                     {'a.gyp': [], 'b.gyp': [], 'c.gyp': ['c1'], 'd.gyp': [],
+                      'e.gyp': ['e1']})
+
+
+class TestEvalSingleCondition(unittest.TestCase):
+  def eval(self, cond_expr, variables):
+    return gyp.input.EvalSingleCondition(cond_expr, 'true', 'false',
+                                         gyp.input.PHASE_EARLY, variables,
+                                         'build.gyp')
+
+  def results(self, cond_expr):
+    return gyp.input.cached_conditions_asts[cond_expr][2]
+
+  def test_MemoizedOnTheVariablesRead(self):
+    cond_expr = 'OS=="linux" and target_arch=="x64"'
+    variables = {'OS': 'linux', 'target_arch': 'x64', 'other': 'a'}
+    self.assertEqual(self.eval(cond_expr, variables), 'true')
+    self.assertEqual(self.results(cond_expr), {('linux', 'x64'): True})
+    # Other variables don't matter.
+    variables['other'] = 'b'
+    self.assertEqual(self.eval(cond_expr, variables), 'true')
+    self.assertEqual(len(self.results(cond_expr)), 1)
+    variables['target_arch'] = 'ia32'
+    self.assertEqual(self.eval(cond_expr, variables), 'false')
+    self.assertEqual(self.results(cond_expr),
+                     {('linux', 'x64'): True, ('linux', 'ia32'): False})
+
+  def test_NotMemoized(self):
+    self.assertEqual(self.eval('"a" in l', {'l': ['a']}), 'true')
+    self.assertEqual(self.eval('"a" in l', {'l': ['b']}), 'false')
+    self.assertEqual(self.results('"a" in l'), {})
+    self.assertRaises(gyp.common.GypError, self.eval, 'undefined==1', {})
+    self.assertEqual(self.eval('undefined==1', {'undefined': 1}), 'true')
+
+
+class TestIncludeSpecializer(unittest.TestCase):
+  include = {
+    'variables': {'flavor%': 'plain'},
+    'conditions': [
+      ['OS=="linux"', {'defines': ['LINUX']}, {'defines': ['NOT_LINUX']}],
+      ['OS=="win"', {'defines': ['WIN']}],
+      ['OS=="linux" and flavor=="plain"', {'defines': ['PLAIN']}],
+      ['OS=="<(OS)"', {'defines': ['EXPANDED']}],
+    ],
+    'target_defaults': {
+      'target_conditions': [['OS=="linux"', {'defines': ['LATE']}]],
+    },
+    'targets': [{
+      'target_name': 'included',
+      'conditions': [['OS=="linux"', {'defines': ['TARGET_LINUX']}]],
+    }],
+  }
+
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.write('common.gypi', self.include)
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def write(self, name, data):
+    with open(os.path.join(self.tmp_dir, name), 'w') as f:
+      f.write(repr(data))
+
+  def load(self, build_file_data, variables):
+    self.write('a.gyp', dict(build_file_data, includes=['common.gypi']))
+    return gyp.input.LoadOneBuildFile(os.path.join(self.tmp_dir, 'a.gyp'),
+                                      {}, {}, [], True, False, variables)
+
+  def test_DecidesConditions(self):
+    data = self.load({}, {'OS': 'linux'})
+    self.assertEqual(data['conditions'], [
+      ['1==1', {'defines': ['LINUX']}],
+      ['OS=="linux" and flavor=="plain"', {'defines': ['PLAIN']}],
+      ['OS=="<(OS)"', {'defines': ['EXPANDED']}],
+    ])
+    self.assertEqual(data['targets'][0]['conditions'],
+                     [['1==1', {'defines': ['TARGET_LINUX']}]])
+    self.assertEqual(data['target_defaults'],
+                     self.include['target_defaults'])
+    # Other build files share the result.
+    self.write('b.gyp', {'includes': ['common.gypi']})
+    other = gyp.input.LoadOneBuildFile(os.path.join(self.tmp_dir, 'b.gyp'),
+                                       {}, {}, [], True, False, {'OS': 'win'})
+    self.assertEqual(other['conditions'][:2],
+                     [['1==1', {'defines': ['NOT_LINUX']}],
+                      ['1==1', {'defines': ['WIN']}]])
+
+  def test_NotDecidedWhenRebound(self):
+    data = self.load({'variables': {'OS': 'win'}}, {'OS': 'linux'})
+    self.assertEqual(data['conditions'], self.include['conditions'])
+
+  def test_NotDecidedForToolsetVariables(self):
+    # In host targets, host_os would stand for OS.
+    data = self.load({}, {'OS': 'linux', 'host_os': 'mac'})
+    self.assertEqual(data['conditions'][0],
+                     ['1==1', {'defines': ['LINUX']}])
+    self.assertEqual(data['targets'][0]['conditions'],
+                     self.include['targets'][0]['conditions'])
+
+  def test_KeyedOnTheVariablesRead(self):
+    self.write('flags.gypi', {'conditions': [
+      ['is_debug==1', {'defines': ['DEBUG']}],
+      ['use_asan==1', {'defines': ['ASAN']}],
+    ]})
+    self.write('a.gyp', {'includes': ['flags.gypi']})
+    build_file = os.path.join(self.tmp_dir, 'a.gyp')
+    debug = gyp.input.LoadOneBuildFile(build_file, {}, {}, [], True, False,
+                                       {'is_debug': 1})
+    asan = gyp.input.LoadOneBuildFile(build_file, {}, {}, [], True, False,
+                                      {'use_asan': 1})
+    self.assertEqual(debug['conditions'][0], ['1==1', {'defines': ['DEBUG']}])
+    self.assertEqual(asan['conditions'][1], ['1==1', {'defines': ['ASAN']}])
+
+
+class TestToolsetClones(unittest.TestCase):
+  target = {
+    'target_name': 'gen',
+    'toolsets': ['target', 'host'],
+    'sources': ['a.cc', 'b.cc'],
+    'include_dirs': ['<(DEPTH)/include'],
+    'actions': [{'action_name': 'a', 'inputs': ['a.in']}],
+    'target_conditions': [['_toolset=="host"', {'defines': ['HOST']}]],
+    'conditions': [['OS=="linux"', {'defines': ['LINUX']}]],
+  }
+
+  def setUp(self):
+    self.multiple_toolsets = gyp.input.multiple_toolsets
+    gyp.input.multiple_toolsets = True
+    self.tmp_dir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    gyp.input.multiple_toolsets = self.multiple_toolsets
+    shutil.rmtree(self.tmp_dir)
+
+  def test_CloneSharesWhatTheEarlyPhaseLeaves(self):
+    clone, copied = gyp.input.CloneForToolset(self.target)
+    self.assertTrue(copied)
+    self.assertEqual(clone, self.target)
+    self.assertFalse(clone is self.target)
+    self.assertFalse(clone['include_dirs'] is self.target['include_dirs'])
+    for key in ('sources', 'actions', 'target_conditions', 'conditions'):
+      self.assertTrue(clone[key] is self.target[key])
+    self.assertEqual(gyp.input.CloneForToolset(self.target['actions']),
+                     (self.target['actions'], False))
+
+  def test_ClonesAreCopiedWithoutTargetDefaults(self):
+    build_file = os.path.join(self.tmp_dir, 'a.gyp')
+    with open(build_file, 'w') as f:
+      f.write(repr({'targets': [self.target]}))
+    data = {'target_build_files': set()}
+    gyp.input.LoadTargetBuildFile(build_file, data, {}, {'OS': 'linux'}, [],
+                                  self.tmp_dir, False, False)
+    # The clones for the other toolsets come first.
+    host, target = data[build_file]['targets']
+    self.assertEqual((host['toolset'], target['toolset']), ('host', 'target'))
+    self.assertEqual(target['defines'], ['LINUX'])
+    self.assertEqual(host['defines'], ['LINUX'])
+    for key in ('sources', 'actions', 'target_conditions'):
+      self.assertEqual(target[key], host[key])
+      self.assertFalse(target[key] is host[key])
+
+  def test_ConditionsDontMergeIntoSharedLists(self):
+    build_file = os.path.join(self.tmp_dir, 'a.gyp')
+    with open(build_file, 'w') as f:
+      f.write(repr({'targets': [{
+        'target_name': 'foo',
+        'toolsets': ['target', 'host'],
+        'defines': ['A'],
+        'configurations': {'Default': {'cflags': ['-O2']}},
+        'conditions': [
+          ['_toolset=="host"', {
+            'defines': ['HOST_ONLY'],
+            'conditions': [
+              ['1==1', {'configurations': {'Default': {'cflags': ['-g']}}}],
+            ],
+          }],
+        ],
+      }]}))
+    data = {'target_build_files': set()}
+    gyp.input.LoadTargetBuildFile(build_file, data, {}, {}, [],
+                                  self.tmp_dir, False, False)
+    host, target = data[build_file]['targets']
+    self.assertEqual(host['defines'], ['A', 'HOST_ONLY'])
+    self.assertEqual(target['defines'], ['A'])
+    self.assertEqual(host['configurations']['Default']['cflags'],
+                     ['-O2', '-g'])
+    self.assertEqual(target['configurations']['Default']['cflags'], ['-O2'])
+
+
+class TestLoadVariants(unittest.TestCase):
+  generator_input_info = {
+    'non_configuration_keys': [],
+    'path_sections': [],
+    'extra_sources_for_rules': [],
+    'generator_supports_multiple_toolsets': False,
+    'generator_wants_static_library_dependencies_adjusted': True,
+    'generator_wants_sorted_dependencies': False,
+    'generator_filelist_paths': None,
+    'generator_build_file_data_keys': None,
+  }
+
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.build_file = os.path.join(self.tmp_dir, 'a.gyp')
+    self.write({'targets': [{
+      'target_name': 'a',
+      'type': 'none',
+      'conditions': [['flavor=="fast"', {'defines': ['FAST']}]],
+    }]})
+
+  def tearDown(self):
+    gyp.input.parsed_build_files = None
+    shutil.rmtree(self.tmp_dir)
+
+  def write(self, data):
+    with open(self.build_file, 'w') as f:
+      f.write(repr(data))
+
+  def test_ReadsEachFileOnce(self):
+    gyp.input.parsed_build_files = {}
+    data = gyp.input.ReadBuildFile(self.build_file, False)
+    self.write({})
+    again = gyp.input.ReadBuildFile(self.build_file, False)
+    self.assertEqual(again, data)
+    self.assertFalse(again is data)
+    gyp.input.parsed_build_files = None
+    self.assertEqual(gyp.input.ReadBuildFile(self.build_file, False), {})
+
+  def test_LoadsEachVariant(self):
+    results = gyp.input.LoadVariants(
+        [self.build_file], [{'flavor': 'fast'}, {'flavor': 'plain'}], [],
+        self.tmp_dir, self.generator_input_info, False, True, None)
+    self.assertEqual(len(results), 2)
+    defines = []
+    for flat_list, targets, data in results:
+      self.assertEqual(len(flat_list), 1)
+      configuration = targets[flat_list[0]]['configurations']['Default']
+      defines.append(configuration.get('defines'))
+    self.assertEqual(defines, [['FAST'], None])
+    self.assertEqual(gyp.input.parsed_build_files, None)
+
+  def test_LoadClearsTheIncludeCaches(self):
+    gyp.input.specialized_includes['stale'] = {}
+    gyp.input.Load([self.build_file], {'flavor': 'fast'}, [], self.tmp_dir,
+                   self.generator_input_info, False, True, False, None)
+    self.assertFalse('stale' in gyp.input.specialized_includes)
+
+
+class TestTrimBuildFileData(unittest.TestCase):
+  def test_KeepsTheKeysOfTargetBuildFiles(self):
+    target = {'target_name': 'a', 'type': 'none'}
+    data = {
+      'target_build_files': set(['a.gyp']),
+      'a.gyp': {'targets': [target], 'included_files': ['a.gyp', 'b.gypi'],
+                'make_global_settings': [['CC', 'clang']],
+                'variables': {'flavor': 'fast'}},
+      'b.gypi': {'variables': {'flavor': 'fast'}},
+    }
+    self.assertEqual(
+        gyp.input.TrimBuildFileData(data, ['included_files', 'xcode_settings']),
+        {'target_build_files': set(['a.gyp']),
+         'a.gyp': {'included_files': ['a.gyp', 'b.gypi']}})
+    trimmed_data = gyp.input.TrimBuildFileData(data, [])
+    self.assertTrue('bytes' in gyp.input.MemoryReport(
+        data, trimmed_data, {'a.gyp:a#target': target}))
+
+
 if __name__ == '__main__':
   unittest.main()
@@ -0,0 +1,178 @@
+# Copyright (c) 2014 Google Inc. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Support for jumbo (also known as unity) builds.
+
+A target with 'jumbo': 1 has its compilable sources merged into a few
+generated translation units that #include them, so that the headers they share
+are only parsed once per unity file instead of once per source.  This happens
+once after the input is loaded, for the generators that set
+generator_supports_jumbo, so they all build the merged sources.  The others,
+e.g. the analyzer, see the original sources and write no unity files.
+
+Target keys:
+  jumbo: 1 to merge the sources of the target.
+  jumbo_file_merge_limit: the most sources merged into one unity file.
+  jumbo_max_bytes: if set, a unity file is also closed once the sources merged
+      into it add up to this many bytes.
+  jumbo_excluded_sources: sources that are compiled on their own, e.g. because
+      they define conflicting static symbols or macros.
+"""
+
+import os
+
+import gyp.common
+
+
+# The default most sources merged into one unity file.
+DEFAULT_MERGE_LIMIT = 50
+
+# Sources that can be merged, and the extension of the unity file they are
+# merged into.  Each language gets its own unity files.
+UNITY_EXTENSIONS = {
+  '.c': '.c',
+  '.cc': '.cc',
+  '.cpp': '.cc',
+  '.cxx': '.cc',
+  '.m': '.m',
+  '.mm': '.mm',
+}
+
+
+def _JumboDir(params):
+  """Returns the directory the unity files are written to."""
+  options = params['options']
+  generator_flags = params.get('generator_flags', {})
+  return os.path.join(options.toplevel_dir, options.generator_output or '',
+                      generator_flags.get('output_dir', 'out'), 'jumbo')
+
+
+def _UnityFileStem(jumbo_dir, toplevel_dir, qualified_target, spec):
+  """Returns the path, less the number and extension, of the unity files of
+  qualified_target.  Build files outside of toplevel_dir keep their place in
+  jumbo_dir by turning '..' components into '__'."""
+  build_file = gyp.common.BuildFile(qualified_target)
+  rel_build_file = gyp.common.RelativePath(build_file, toplevel_dir)
+  rel_build_file = '/'.join(
+      '__' if component == os.path.pardir else component
+      for component in rel_build_file.replace(os.sep, '/').split('/'))
+  return os.path.join(jumbo_dir, os.path.splitext(rel_build_file)[0],
+                      spec.get('toolset', 'target'),
+                      spec['target_name'] + '_jumbo_')
+
+
+def _GroupSources(sources, build_dir, merge_limit, max_bytes):
+  """Splits sources into the groups that each make up one unity file.
+
+  Arguments:
+    sources: the mergeable sources of one language, relative to build_dir.
+    build_dir: the directory of the build file listing sources.
+    merge_limit: the most sources in a group.
+    max_bytes: if not 0, the most bytes of sources in a group (a bigger
+        source still gets a group of its own).
+  Returns:
+    A list of lists of sources, in the order of sources.
+  """
+  groups = []
+  group = []
+  group_bytes = 0
+  for source in sources:
+    size = 0
+    if max_bytes:
+      try:
+        size = gyp.common.file_system_cache.GetSize(
+            os.path.join(build_dir, source))
+      except OSError:
+        # Generated sources don't exist yet, and count as empty.
+        pass
+    if group and (len(group) == merge_limit or
+                  (max_bytes and group_bytes + size > max_bytes)):
+      groups.append(group)
+      group = []
+      group_bytes = 0
+    group.append(source)
+    group_bytes += size
+  if group:
+    groups.append(group)
+  return groups
+
+
+def _WriteUnityFile(path, sources, build_dir):
+  """Writes a unity file that #includes sources, relative to build_dir."""
+  unity_dir = os.path.dirname(path)
+  gyp.common.EnsureDirExists(path)
+  with gyp.common.WriteOnDiff(path) as f:
+    f.write('// Generated by gyp for a jumbo build; do not edit.\n')
+    for source in sources:
+      include = gyp.common.RelativePath(os.path.join(build_dir, source),
+                                        unity_dir)
+      f.write('#include "%s"\n' % include.replace(os.sep, '/'))
+
+
+def _MergeTargetSources(qualified_target, spec, jumbo_dir, toplevel_dir):
+  """Replaces the mergeable sources of spec with its unity files."""
+  build_dir = os.path.dirname(gyp.common.BuildFile(qualified_target))
+  merge_limit = int(spec.get('jumbo_file_merge_limit', DEFAULT_MERGE_LIMIT))
+  max_bytes = int(spec.get('jumbo_max_bytes', 0))
+  if merge_limit < 1:
+    raise gyp.common.GypError('%s: jumbo_file_merge_limit must be positive' %
+                              qualified_target)
+
+  # Sources processed by rules, precompiled header sources and generated
+  # sources (which refer to generator variables) are left alone.
+  excluded = set(os.path.normpath(source)
+                 for source in spec.get('jumbo_excluded_sources', []))
+  rule_extensions = set('.' + rule['extension']
+                        for rule in spec.get('rules', []))
+  for config in spec.get('configurations', {}).values():
+    precompiled_source = config.get('msvs_precompiled_source')
+    if precompiled_source:
+      excluded.add(os.path.normpath(precompiled_source))
+
+  by_language = {}
+  sources = []
+  for source in spec.get('sources', []):
+    extension = os.path.splitext(source)[1]
+    if (extension in UNITY_EXTENSIONS and extension not in rule_extensions and
+        '$' not in source and os.path.normpath(source) not in excluded):
+      by_language.setdefault(UNITY_EXTENSIONS[extension], []).append(source)
+    else:
+      sources.append(source)
+  if not by_language:
+    return
+
+  stem = _UnityFileStem(jumbo_dir, toplevel_dir, qualified_target, spec)
+  merged = []
+  for unity_extension in sorted(by_language):
+    groups = _GroupSources(by_language[unity_extension], build_dir,
+                           merge_limit, max_bytes)
+    for i, group in enumerate(groups):
+      path = '%s%d%s' % (stem, i, unity_extension)
+      _WriteUnityFile(path, group, build_dir)
+      sources.append(gyp.common.RelativePath(path, build_dir or '.'))
+      merged.extend(group)
+
+  spec['sources'] = sources
+  # The merged sources are still listed (but not built) by the IDE generators.
+  spec['sources_excluded'] = spec.get('sources_excluded', []) + merged
+
+
+def MergeJumboSources(target_list, target_dicts, params):
+  """Merges the sources of the targets with 'jumbo' set into unity files.
+
+  Arguments:
+    target_list: List of target pairs: 'base/base.gyp:base'.
+    target_dicts: Dict of target properties keyed on target pair; the specs of
+        jumbo targets are updated in place.
+    params: the params the generator will receive.
+  """
+  jumbo_targets = [t for t in target_list
+                   if int(target_dicts[t].get('jumbo', 0))]
+  if not jumbo_targets:
+    return
+  jumbo_dir = _JumboDir(params)
+  toplevel_dir = params['options'].toplevel_dir
+  for qualified_target in jumbo_targets:
+    _MergeTargetSources(qualified_target, target_dicts[qualified_target],
+                        jumbo_dir, toplevel_dir)
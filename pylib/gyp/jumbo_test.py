@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014 Google Inc. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Unit tests for the jumbo.py file."""
+
+import gyp.jumbo
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class TestGroupSources(unittest.TestCase):
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    for name, size in (('a.cc', 10), ('b.cc', 20), ('c.cc', 30),
+                       ('d.cc', 5)):
+      with open(os.path.join(self.tmp_dir, name), 'w') as f:
+        f.write('x' * size)
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def group(self, merge_limit, max_bytes):
+    return gyp.jumbo._GroupSources(['a.cc', 'b.cc', 'c.cc', 'd.cc', 'gen.cc'],
+                                   self.tmp_dir, merge_limit, max_bytes)
+
+  def test_MergeLimit(self):
+    self.assertEqual(self.group(2, 0),
+                     [['a.cc', 'b.cc'], ['c.cc', 'd.cc'], ['gen.cc']])
+    self.assertEqual(self.group(50, 0),
+                     [['a.cc', 'b.cc', 'c.cc', 'd.cc', 'gen.cc']])
+
+  def test_MaxBytes(self):
+    # Missing (generated) sources count as empty.
+    self.assertEqual(self.group(50, 30),
+                     [['a.cc', 'b.cc'], ['c.cc'], ['d.cc', 'gen.cc']])
+    # Sources bigger than the limit get a unity file of their own.
+    self.assertEqual(self.group(50, 1),
+                     [['a.cc'], ['b.cc'], ['c.cc'], ['d.cc'], ['gen.cc']])
+    self.assertEqual(self.group(2, 30),
+                     [['a.cc', 'b.cc'], ['c.cc'], ['d.cc', 'gen.cc']])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -12,6 +12,7 @@ import re
 import subprocess
 import sys
 
+import gyp.common
 from gyp.common import OrderedSet
 import gyp.MSVSUtil
 import gyp.MSVSVersion
@@ -1035,7 +1036,8 @@ def VerifyMissingSources(sources, build_dir, generator_flags, gyp_to_ninja):
   if int(generator_flags.get('msvs_error_on_missing_sources', 0)):
     no_specials = filter(lambda x: '$' not in x, sources)
     relative = [os.path.join(build_dir, gyp_to_ninja(s)) for s in no_specials]
-    missing = filter(lambda x: not os.path.exists(x), relative)
+    missing = filter(lambda x: not gyp.common.file_system_cache.Exists(x),
+                     relative)
     if missing:
       # They'll look like out\Release\..\..\stuff\things.cc, so normalize the
       # path for a slightly less crazy looking output.
@@ -172,6 +172,103 @@ _quoted = re.compile('___')
 _escaped = re.compile('[\\\\"]|[\x00-\x1f]')
 
 
+# While XCObject.ComputeIDs runs, this maps each XCObject whose hashables have
+# been requested to its Hashables().  Nothing changes in the project during
+# the computation, and the hashables of groups are needed repeatedly: once for
+# the group itself and once for each PBXBuildFile referring to a file below
+# it.  None when no computation is in progress.
+_hashables_cache = None
+
+# Packs the length that precedes each hashable in the hashed data.
+_hashable_length = struct.Struct('>i')
+
+_LOW_64_BITS = (1 << 64) - 1
+
+
+def _CachedHashables(xcobject):
+  """Returns xcobject.Hashables(), cached while IDs are being computed."""
+  if _hashables_cache is None:
+    return xcobject.Hashables()
+  try:
+    return _hashables_cache[xcobject]
+  except KeyError:
+    hashables = _hashables_cache[xcobject] = xcobject.Hashables()
+    return hashables
+
+
+class _HashableData(dict):
+  """Maps hashables to the data they contribute to an ID hash.
+
+  Each hashable is preceded by its length.  If the hash were updated only with
+  the hashables' values, it would be possible for clowns to induce collisions
+  by manipulating the names of their objects.  By adding the length, it's
+  exceedingly less likely that ID collisions will be encountered,
+  intentionally or not.
+
+  The same names and path components occur over and over in a project, so
+  each one is only packed once.
+  """
+
+  def __missing__(self, hashable):
+    if isinstance(hashable, unicode):
+      # hashlib would have encoded these as ASCII by itself.
+      data = hashable.encode('ascii')
+    else:
+      data = hashable
+    data = self[hashable] = _hashable_length.pack(len(data)) + data
+    return data
+
+  def Join(self, hashables):
+    """Returns the data hashed for a list of hashables."""
+    return ''.join(map(self.__getitem__, hashables))
+
+
+# While XCProjectFile.Print runs, this maps each XCObject that has been
+# referenced in the output to its printable form, its ID followed by its
+# comment.  Most objects are referenced several times, and building comments
+# can mean walking up to other objects for their names.  None when no project
+# file is being printed.
+_printable_references = None
+
+
+class _Indents(dict):
+  """Maps indentation levels to strings of that many tabs."""
+
+  def __missing__(self, tabs):
+    indent = self[tabs] = '\t' * tabs
+    return indent
+
+_indents = _Indents()
+
+
+# Number of pieces of output accumulated by _ChunkedWriter before they are
+# joined and written to the underlying file in one call.
+_CHUNK_PARTS = 4096
+
+
+class _ChunkedWriter(object):
+  """Collects what is written to it and passes it on to file in large chunks.
+
+  A project file is printed as hundreds of thousands of short lines; handing
+  them to the file one by one costs more than producing them.
+  """
+
+  def __init__(self, file):
+    self.file = file
+    self.parts = []
+
+  def write(self, data):
+    parts = self.parts
+    parts.append(data)
+    if len(parts) >= _CHUNK_PARTS:
+      self.flush()
+
+  def flush(self):
+    if self.parts:
+      self.file.write(''.join(self.parts))
+      del self.parts[:]
+
+
 # Used by SourceTreeAndPathFromPath
 _path_leading_variable = re.compile(r'^\$\((.*?)\)(/(.*))?$')
 
@@ -248,6 +345,10 @@ class XCObject(object):
                                   single-line format.  Subclasses that desire
                                   this behavior should set _encode_transforms
                                   to _alternate_encode_transforms.
+    _encoded_strings: Caches the results of _EncodeString, which depend on
+                      _encode_transforms.  Subclasses that set
+                      _encode_transforms to _alternate_encode_transforms
+                      should set this to _alternate_encoded_strings.
     _hashables: A list of XCObject subclasses that can be hashed by ComputeIDs
                 to construct this object's ID.  Most classes that need custom
                 hashing behavior should do it by overriding Hashables,
@@ -288,6 +389,11 @@ class XCObject(object):
   _alternate_encode_transforms[10] = chr(10)
   _alternate_encode_transforms[11] = chr(11)
 
+  # See _EncodeString.  Most strings, like names and paths, are printed many
+  # times over.
+  _encoded_strings = {}
+  _alternate_encoded_strings = {}
+
   def __init__(self, properties=None, id=None, parent=None):
     self.id = id
     self.parent = parent
@@ -407,54 +513,61 @@ class XCObject(object):
 
     If overwrite is True, any existing value set in the "id" property will be
     replaced.
-    """
 
-    def _HashUpdate(hash, data):
-      """Update hash with data's length and contents.
-
-      If the hash were updated only with the value of data, it would be
-      possible for clowns to induce collisions by manipulating the names of
-      their objects.  By adding the length, it's exceedingly less likely that
-      ID collisions will be encountered, intentionally or not.
-      """
+    Each object's hash state is computed once and copied as the starting
+    point for its children's hashes.  The hashables of every object are only
+    computed once per call, even when they are needed again, as those of the
+    groups above a file are for each PBXBuildFile referring to it.
+    """
 
-      hash.update(struct.pack('>i', len(data)))
-      hash.update(data)
+    global _hashables_cache
 
     if seed_hash is None:
       seed_hash = _new_sha1()
 
-    hash = seed_hash.copy()
-
-    hashables = self.Hashables()
-    assert len(hashables) > 0
-    for hashable in hashables:
-      _HashUpdate(hash, hashable)
-
-    if recursive:
-      hashables_for_child = self.HashablesForChild()
-      if hashables_for_child is None:
-        child_hash = hash
-      else:
-        assert len(hashables_for_child) > 0
-        child_hash = seed_hash.copy()
-        for hashable in hashables_for_child:
-          _HashUpdate(child_hash, hashable)
-
-      for child in self.Children():
-        child.ComputeIDs(recursive, overwrite, child_hash)
-
-    if overwrite or self.id is None:
-      # Xcode IDs are only 96 bits (24 hex characters), but a SHA-1 digest is
-      # is 160 bits.  Instead of throwing out 64 bits of the digest, xor them
-      # into the portion that gets used.
-      assert hash.digest_size % 4 == 0
-      digest_int_count = hash.digest_size / 4
-      digest_ints = struct.unpack('>' + 'I' * digest_int_count, hash.digest())
-      id_ints = [0, 0, 0]
-      for index in range(0, digest_int_count):
-        id_ints[index % 3] ^= digest_ints[index]
-      self.id = '%08X%08X%08X' % tuple(id_ints)
+    hashable_data = _HashableData()
+    outermost = _hashables_cache is None
+    if outermost:
+      _hashables_cache = {}
+    try:
+      # Walk the tree without recursion, collecting the objects and their
+      # digests.  The IDs are assigned in one batch once everything has been
+      # hashed.
+      pending = [(self, seed_hash)]
+      digests = []
+      while pending:
+        (xcobject, seed_hash) = pending.pop()
+
+        hash = seed_hash.copy()
+        hashables = _CachedHashables(xcobject)
+        assert len(hashables) > 0
+        hash.update(hashable_data.Join(hashables))
+
+        if recursive:
+          hashables_for_child = xcobject.HashablesForChild()
+          if hashables_for_child is None:
+            child_hash = hash
+          else:
+            assert len(hashables_for_child) > 0
+            child_hash = seed_hash.copy()
+            child_hash.update(hashable_data.Join(hashables_for_child))
+
+          for child in xcobject.Children():
+            pending.append((child, child_hash))
+
+        if overwrite or xcobject.id is None:
+          digests.append((xcobject, hash.hexdigest()))
+    finally:
+      if outermost:
+        _hashables_cache = None
+
+    # Xcode IDs are only 96 bits (24 hex characters), but a SHA-1 digest is
+    # is 160 bits.  Instead of throwing out 64 bits of the digest, xor them
+    # into the portion that gets used: the digest's five 32-bit words d0..d4
+    # fold into the three words (d0 ^ d3, d1 ^ d4, d2).
+    for (xcobject, hexdigest) in digests:
+      digest = int(hexdigest, 16)
+      xcobject.id = '%024X' % ((digest >> 64) ^ ((digest & _LOW_64_BITS) << 32))
 
   def EnsureNoIDCollisions(self):
     """Verifies that no two objects have the same ID.  Checks all descendants.
@@ -563,13 +676,20 @@ class XCObject(object):
     # as UTF-8 without any escaping.  These mappings are contained in the
     # class' _encode_transforms list.
 
-    if _unquoted.search(value) and not _quoted.search(value):
-      return value
+    try:
+      return self._encoded_strings[value]
+    except KeyError:
+      pass
 
-    return '"' + _escaped.sub(self._EncodeTransform, value) + '"'
+    if _unquoted.search(value) and not _quoted.search(value):
+      encoded = value
+    else:
+      encoded = '"' + _escaped.sub(self._EncodeTransform, value) + '"'
+    self._encoded_strings[value] = encoded
+    return encoded
 
   def _XCPrint(self, file, tabs, line):
-    file.write('\t' * tabs + line)
+    file.write(_indents[tabs] + line)
 
   def _XCPrintableValue(self, tabs, value, flatten_list=False):
     """Returns a representation of value that may be printed in a project file,
@@ -586,8 +706,14 @@ class XCObject(object):
     strings.
     """
 
-    printable = ''
-    comment = None
+    if isinstance(value, XCObject):
+      return self._XCPrintableReference(value)
+    elif isinstance(value, str):
+      return self._EncodeString(value)
+    elif isinstance(value, unicode):
+      return self._EncodeString(value.encode('utf-8'))
+    elif isinstance(value, int):
+      return str(value)
 
     if self._should_print_single_line:
       sep = ' '
@@ -595,45 +721,53 @@ class XCObject(object):
       end_tabs = ''
     else:
       sep = '\n'
-      element_tabs = '\t' * (tabs + 1)
-      end_tabs = '\t' * tabs
+      element_tabs = _indents[tabs + 1]
+      end_tabs = _indents[tabs]
 
-    if isinstance(value, XCObject):
-      printable += value.id
-      comment = value.Comment()
-    elif isinstance(value, str):
-      printable += self._EncodeString(value)
-    elif isinstance(value, unicode):
-      printable += self._EncodeString(value.encode('utf-8'))
-    elif isinstance(value, int):
-      printable += str(value)
-    elif isinstance(value, list):
+    if isinstance(value, list):
       if flatten_list and len(value) <= 1:
         if len(value) == 0:
-          printable += self._EncodeString('')
-        else:
-          printable += self._EncodeString(value[0])
-      else:
-        printable = '(' + sep
-        for item in value:
-          printable += element_tabs + \
-                       self._XCPrintableValue(tabs + 1, item, flatten_list) + \
-                       ',' + sep
-        printable += end_tabs + ')'
+          return self._EncodeString('')
+        return self._EncodeString(value[0])
+      parts = ['(', sep]
+      for item in value:
+        parts.extend((element_tabs,
+                      self._XCPrintableValue(tabs + 1, item, flatten_list),
+                      ',', sep))
+      parts.append(end_tabs + ')')
     elif isinstance(value, dict):
-      printable = '{' + sep
+      parts = ['{', sep]
       for item_key, item_value in sorted(value.items()):
-        printable += element_tabs + \
-            self._XCPrintableValue(tabs + 1, item_key, flatten_list) + ' = ' + \
-            self._XCPrintableValue(tabs + 1, item_value, flatten_list) + ';' + \
-            sep
-      printable += end_tabs + '}'
+        parts.extend((element_tabs,
+                      self._XCPrintableValue(tabs + 1, item_key, flatten_list),
+                      ' = ',
+                      self._XCPrintableValue(tabs + 1, item_value,
+                                             flatten_list),
+                      ';', sep))
+      parts.append(end_tabs + '}')
     else:
       raise TypeError("Can't make " + value.__class__.__name__ + ' printable')
 
+    return ''.join(parts)
+
+  def _XCPrintableReference(self, xcobject):
+    """Returns the printable representation of a reference to xcobject: its
+    id, followed by its comment if it has one.
+    """
+
+    if _printable_references is not None:
+      try:
+        return _printable_references[xcobject]
+      except KeyError:
+        pass
+
+    printable = xcobject.id
+    comment = xcobject.Comment()
     if comment != None:
       printable += ' ' + self._EncodeComment(comment)
 
+    if _printable_references is not None:
+      _printable_references[xcobject] = printable
     return printable
 
   def _XCKVPrint(self, file, tabs, key, value):
@@ -645,11 +779,16 @@ class XCObject(object):
     key-value pair will be followed by a space insead of a newline.
     """
 
+    self._XCPrint(file, 0, self._XCKVPrintable(tabs, key, value))
+
+  def _XCKVPrintable(self, tabs, key, value):
+    """Returns what _XCKVPrint prints for a key and value."""
+
     if self._should_print_single_line:
       printable = ''
       after_kv = ' '
     else:
-      printable = '\t' * tabs
+      printable = _indents[tabs]
       after_kv = '\n'
 
     # Xcode usually prints remoteGlobalIDString values in PBXContainerItemProxy
@@ -696,7 +835,7 @@ class XCObject(object):
                                  'while printing key "%s"' % key)
       raise
 
-    self._XCPrint(file, 0, printable)
+    return printable
 
   def Print(self, file=sys.stdout):
     """Prints a reprentation of this object to file, adhering to Xcode output
@@ -721,20 +860,25 @@ class XCObject(object):
       sep = '\n'
       end_tabs = 2
 
+    # The object is written out in one piece.
+    printables = []
+
     # Start the object.  For example, '\t\tPBXProject = {\n'.
-    self._XCPrint(file, 2, self._XCPrintableValue(2, self) + ' = {' + sep)
+    printables.append(
+        _indents[2] + self._XCPrintableValue(2, self) + ' = {' + sep)
 
     # "isa" isn't in the _properties dictionary, it's an intrinsic property
     # of the class which the object belongs to.  Xcode always outputs "isa"
     # as the first element of an object dictionary.
-    self._XCKVPrint(file, 3, 'isa', self.__class__.__name__)
+    printables.append(self._XCKVPrintable(3, 'isa', self.__class__.__name__))
 
     # The remaining elements of an object dictionary are sorted alphabetically.
     for property, value in sorted(self._properties.items()):
-      self._XCKVPrint(file, 3, property, value)
+      printables.append(self._XCKVPrintable(3, property, value))
 
     # End the object.
-    self._XCPrint(file, end_tabs, '};\n')
+    printables.append(_indents[end_tabs] + '};\n')
+    self._XCPrint(file, 0, ''.join(printables))
 
   def UpdateProperties(self, properties, do_copy=False):
     """Merge the supplied properties into the _properties dictionary.
@@ -1023,6 +1167,17 @@ class XCHierarchicalElement(XCObject):
       return -1
     return 1
 
+  def SortKey(self):
+    """Returns a key that sorts objects in the same order as Compare."""
+    # Groups sort before everything else; PBXVariantGroup is treated as equal
+    # to PBXFileReference.
+    sort_ranks = {
+      PBXFileReference: 1,
+      PBXGroup:         0,
+      PBXVariantGroup:  1,
+    }
+    return (sort_ranks[self.__class__], self.Name())
+
   def CompareRootGroup(self, other):
     # This function should be used only to compare direct children of the
     # containing PBXProject's mainGroup.  These groups should appear in the
@@ -1100,6 +1255,12 @@ class PBXGroup(XCHierarchicalElement):
       actual child XCHierarchicalElement objects.
     _variant_children_by_name_and_path: Maps (name, path) tuples of
       PBXVariantGroup children to the actual child PBXVariantGroup objects.
+    _file_refs_by_path: Maps (path, hierarchical) arguments that
+      AddOrGetFileByPath has been called with to the objects it returned.
+      Together with _children_by_path, which indexes each level of the group
+      hierarchy by path component, this makes adding or getting a file cost
+      one dict lookup per path component the first time, and a single lookup
+      after that.
   """
 
   _schema = XCHierarchicalElement._schema.copy()
@@ -1114,6 +1275,7 @@ class PBXGroup(XCHierarchicalElement):
     XCHierarchicalElement.__init__(self, properties, id, parent)
     self._children_by_path = {}
     self._variant_children_by_name_and_path = {}
+    self._file_refs_by_path = {}
     for child in self._properties.get('children', []):
       self._AddChildToDicts(child)
 
@@ -1228,6 +1390,16 @@ class PBXGroup(XCHierarchicalElement):
     all other paths, a "normal" PBXFileReference will be returned.
     """
 
+    # The same files are typically added over and over, once for each target
+    # and build phase that uses them.
+    key = (path, hierarchical)
+    file_ref = self._file_refs_by_path.get(key)
+    if file_ref is None:
+      file_ref = self._AddOrGetFileByPath(path, hierarchical)
+      self._file_refs_by_path[key] = file_ref
+    return file_ref
+
+  def _AddOrGetFileByPath(self, path, hierarchical):
     # Adding or getting a directory?  Directories end with a trailing slash.
     is_dir = False
     if path.endswith('/'):
@@ -1256,52 +1428,58 @@ class PBXGroup(XCHierarchicalElement):
     assert not is_dir or variant_name is None
 
     path_split = path.split(posixpath.sep)
-    if len(path_split) == 1 or \
-       ((is_dir or variant_name != None) and len(path_split) == 2) or \
-       not hierarchical:
-      # The PBXFileReference or PBXVariantGroup will be added to or gotten from
-      # this PBXGroup, no recursion necessary.
-      if variant_name is None:
-        # Add or get a PBXFileReference.
-        file_ref = self.GetChildByPath(path)
-        if file_ref != None:
-          assert file_ref.__class__ == PBXFileReference
-        else:
-          file_ref = PBXFileReference({'path': path})
-          self.AppendChild(file_ref)
+    group_ref = self
+    if hierarchical:
+      # Add or get a PBXGroup corresponding to each leading path component in
+      # turn, walking down from this group.  Directories and variants keep
+      # their last two path components together.
+      if is_dir or variant_name != None:
+        group_depth = len(path_split) - 2
       else:
-        # Add or get a PBXVariantGroup.  The variant group name is the same
-        # as the basename (MainMenu.nib in the example above).  grandparent
-        # specifies the path to the variant group itself, and path_split[-2:]
-        # is the path of the specific variant relative to its group.
-        variant_group_name = posixpath.basename(path)
-        variant_group_ref = self.AddOrGetVariantGroupByNameAndPath(
-            variant_group_name, grandparent)
-        variant_path = posixpath.sep.join(path_split[-2:])
-        variant_ref = variant_group_ref.GetChildByPath(variant_path)
-        if variant_ref != None:
-          assert variant_ref.__class__ == PBXFileReference
-        else:
-          variant_ref = PBXFileReference({'name': variant_name,
-                                          'path': variant_path})
-          variant_group_ref.AppendChild(variant_ref)
-        # The caller is interested in the variant group, not the specific
-        # variant file.
-        file_ref = variant_group_ref
-      return file_ref
+        group_depth = len(path_split) - 1
+      if group_depth > 0:
+        for next_dir in path_split[:group_depth]:
+          child_ref = group_ref.GetChildByPath(next_dir)
+          if child_ref != None:
+            assert child_ref.__class__ == PBXGroup
+          else:
+            child_ref = PBXGroup({'path': next_dir})
+            group_ref.AppendChild(child_ref)
+          group_ref = child_ref
+        path_split = path_split[group_depth:]
+        path = posixpath.sep.join(path_split)
+        grandparent = None
+
+    # The PBXFileReference or PBXVariantGroup will be added to or gotten from
+    # group_ref.
+    if variant_name is None:
+      # Add or get a PBXFileReference.
+      file_ref = group_ref.GetChildByPath(path)
+      if file_ref != None:
+        assert file_ref.__class__ == PBXFileReference
+      else:
+        file_ref = PBXFileReference({'path': path})
+        group_ref.AppendChild(file_ref)
     else:
-      # Hierarchical recursion.  Add or get a PBXGroup corresponding to the
-      # outermost path component, and then recurse into it, chopping off that
-      # path component.
-      next_dir = path_split[0]
-      group_ref = self.GetChildByPath(next_dir)
-      if group_ref != None:
-        assert group_ref.__class__ == PBXGroup
+      # Add or get a PBXVariantGroup.  The variant group name is the same
+      # as the basename (MainMenu.nib in the example above).  grandparent
+      # specifies the path to the variant group itself, and path_split[-2:]
+      # is the path of the specific variant relative to its group.
+      variant_group_name = path_split[-1]
+      variant_group_ref = group_ref.AddOrGetVariantGroupByNameAndPath(
+          variant_group_name, grandparent)
+      variant_path = posixpath.sep.join(path_split[-2:])
+      variant_ref = variant_group_ref.GetChildByPath(variant_path)
+      if variant_ref != None:
+        assert variant_ref.__class__ == PBXFileReference
       else:
-        group_ref = PBXGroup({'path': next_dir})
-        self.AppendChild(group_ref)
-      return group_ref.AddOrGetFileByPath(posixpath.sep.join(path_split[1:]),
-                                          hierarchical)
+        variant_ref = PBXFileReference({'name': variant_name,
+                                        'path': variant_path})
+        variant_group_ref.AppendChild(variant_ref)
+      # The caller is interested in the variant group, not the specific
+      # variant file.
+      file_ref = variant_group_ref
+    return file_ref
 
   def AddOrGetVariantGroupByNameAndPath(self, name, path):
     """Returns an existing or new PBXVariantGroup for name and path.
@@ -1401,8 +1579,9 @@ class PBXGroup(XCHierarchicalElement):
           child.TakeOverOnlyChild(recurse)
 
   def SortGroup(self):
+    # Each group is sorted once, after the whole hierarchy has been built.
     self._properties['children'] = \
-        sorted(self._properties['children'], cmp=lambda x,y: x.Compare(y))
+        sorted(self._properties['children'], key=lambda x: x.SortKey())
 
     # Recurse.
     for child in self._properties['children']:
@@ -1422,13 +1601,14 @@ class XCFileLikeElement(XCHierarchicalElement):
     # hashables that identify this object by path by getting its hashables as
     # well as the hashables of ancestor XCHierarchicalElement objects.
 
-    hashables = []
+    ancestors = []
     xche = self
     while xche != None and isinstance(xche, XCHierarchicalElement):
-      xche_hashables = xche.Hashables()
-      for index in range(0, len(xche_hashables)):
-        hashables.insert(index, xche_hashables[index])
+      ancestors.append(xche)
       xche = xche.parent
+    hashables = []
+    for xche in reversed(ancestors):
+      hashables.extend(_CachedHashables(xche))
     return hashables
 
 
@@ -1457,6 +1637,7 @@ class PBXFileReference(XCFileLikeElement, XCContainerPortal, XCRemoteObject):
   _should_print_single_line = True
   # super
   _encode_transforms = XCFileLikeElement._alternate_encode_transforms
+  _encoded_strings = XCFileLikeElement._alternate_encoded_strings
 
   def __init__(self, properties=None, id=None, parent=None):
     # super
@@ -1710,6 +1891,7 @@ class PBXBuildFile(XCObject):
   # Weird output rules for PBXBuildFile.
   _should_print_single_line = True
   _encode_transforms = XCObject._alternate_encode_transforms
+  _encoded_strings = XCObject._alternate_encoded_strings
 
   def Name(self):
     # Example: "main.cc in Sources"
@@ -2891,25 +3073,34 @@ class XCProjectFile(XCObject):
       self._properties['rootObject'].ComputeIDs(recursive, overwrite, hash)
 
   def Print(self, file=sys.stdout):
+    global _printable_references
+
     self.VerifyHasRequiredProperties()
 
+    # The output is collected and written to file in large chunks.
+    output = _ChunkedWriter(file)
+    _printable_references = {}
+
     # Add the special "objects" property, which will be caught and handled
     # separately during printing.  This structure allows a fairly standard
     # loop do the normal printing.
     self._properties['objects'] = {}
-    self._XCPrint(file, 0, '// !$*UTF8*$!\n')
-    if self._should_print_single_line:
-      self._XCPrint(file, 0, '{ ')
-    else:
-      self._XCPrint(file, 0, '{\n')
-    for property, value in sorted(self._properties.items(),
-                                  cmp=lambda x, y: cmp(x, y)):
-      if property == 'objects':
-        self._PrintObjects(file)
+    try:
+      self._XCPrint(output, 0, '// !$*UTF8*$!\n')
+      if self._should_print_single_line:
+        self._XCPrint(output, 0, '{ ')
       else:
-        self._XCKVPrint(file, 1, property, value)
-    self._XCPrint(file, 0, '}\n')
-    del self._properties['objects']
+        self._XCPrint(output, 0, '{\n')
+      for property, value in sorted(self._properties.items()):
+        if property == 'objects':
+          self._PrintObjects(output)
+        else:
+          self._XCKVPrint(output, 1, property, value)
+      self._XCPrint(output, 0, '}\n')
+      output.flush()
+    finally:
+      del self._properties['objects']
+      _printable_references = None
 
   def _PrintObjects(self, file):
     if self._should_print_single_line:
@@ -2930,7 +3121,7 @@ class XCProjectFile(XCObject):
       self._XCPrint(file, 0, '\n')
       self._XCPrint(file, 0, '/* Begin ' + class_name + ' section */\n')
       for object in sorted(objects_by_class[class_name],
-                           cmp=lambda x, y: cmp(x.id, y.id)):
+                           key=lambda object: object.id):
         object.Print(file)
       self._XCPrint(file, 0, '/* End ' + class_name + ' section */\n')
 
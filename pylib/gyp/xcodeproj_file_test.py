@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2012 Google Inc. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+""" Unit tests for the xcodeproj_file.py file. """
+
+import gyp.xcodeproj_file as xcodeproj_file
+import unittest
+import StringIO
+
+
+class TestComputeIDs(unittest.TestCase):
+  def setUp(self):
+    self.project_file = xcodeproj_file.XCProjectFile({
+        'rootObject': xcodeproj_file.PBXProject(path='a/b.xcodeproj')})
+    self.project = self.project_file.GetProperty('rootObject')
+    self.target = xcodeproj_file.PBXNativeTarget({
+        'name': 'foo',
+        'productType': 'com.apple.product-type.library.static',
+        'buildConfigurationList': xcodeproj_file.XCConfigurationList({
+            'buildConfigurations': [
+                xcodeproj_file.XCBuildConfiguration({'name': 'Default'})]})},
+        parent=self.project)
+    self.project.AppendProperty('targets', self.target)
+    for path in ('src/main.cc', 'src/util/a.cc', 'src/util/b.cc'):
+      self.target.SourcesPhase().AddFile(path)
+
+  def test_StableIDs(self):
+    # IDs end up in checked-in and cached project files; changing how they
+    # are computed makes every project churn.
+    self.project_file.ComputeIDs()
+    self.assertEqual(self.project.id, '4270DAA84FD421A587361563')
+    self.assertEqual(self.target.id, '43BC1C06F9B19EE83FC1F4D0')
+    ids = [(build_file.Name(), build_file.id,
+            build_file.GetProperty('fileRef').id)
+           for build_file in self.target.SourcesPhase().GetProperty('files')]
+    self.assertEqual(ids, [
+        ('main.cc in Sources',
+         '0EE3FDB1702F8378F98BB84E', '4245F440425833CAEA9EF730'),
+        ('a.cc in Sources',
+         '531AF1684E0848549E7C5E18', '2869D97A6823A95B819BD4CD'),
+        ('b.cc in Sources',
+         'B24431F6D2015360F1FCF19B', '54A3AC5385A541AB952A4D25'),
+    ])
+
+  def test_Overwrite(self):
+    self.target.id = 'ABCDEF'
+    self.project_file.ComputeIDs(overwrite=False)
+    self.assertEqual(self.target.id, 'ABCDEF')
+    self.assertEqual(self.project.id, '4270DAA84FD421A587361563')
+    self.project_file.ComputeIDs()
+    self.assertEqual(self.target.id, '43BC1C06F9B19EE83FC1F4D0')
+    self.project_file.EnsureNoIDCollisions()
+
+
+class TestAddOrGetFileByPath(unittest.TestCase):
+  def setUp(self):
+    self.group = xcodeproj_file.PBXGroup({'name': 'Source'})
+
+  def ChildPaths(self, group):
+    return sorted(child.PathFromSourceTreeAndPath()
+                  for child in group.GetProperty('children'))
+
+  def test_Hierarchical(self):
+    file_ref = self.group.AddOrGetFileByPath('a/b/c.cc', True)
+    self.assertEqual(file_ref.GetProperty('path'), 'c.cc')
+    self.assertEqual(file_ref.FullPath(), 'a/b/c.cc')
+    self.assertTrue(self.group.AddOrGetFileByPath('a/b/c.cc', True) is
+                    file_ref)
+    self.assertTrue(self.group.AddOrGetFileByPath('a/./b//c.cc', True) is
+                    file_ref)
+    self.group.AddOrGetFileByPath('a/d.cc', True)
+    a = self.group.GetChildByPath('a')
+    self.assertEqual(self.ChildPaths(self.group), ['a'])
+    self.assertEqual(self.ChildPaths(a), ['b', 'd.cc'])
+    self.assertTrue(a.GetChildByPath('b').GetChildByPath('c.cc') is file_ref)
+
+  def test_Flat(self):
+    file_ref = self.group.AddOrGetFileByPath('a/b/c.cc', False)
+    self.assertEqual(file_ref.GetProperty('path'), 'a/b/c.cc')
+    self.assertTrue(self.group.AddOrGetFileByPath('a/b/c.cc', True) is
+                    not file_ref)
+    self.assertEqual(self.ChildPaths(self.group), ['a', 'a/b/c.cc'])
+
+  def test_DirectoriesAndVariants(self):
+    dir_ref = self.group.AddOrGetFileByPath('a/b/res/', True)
+    self.assertEqual(dir_ref.FullPath(), 'a/b/res')
+    variant_group = self.group.AddOrGetFileByPath(
+        'a/en.lproj/Main.nib', True)
+    self.assertEqual(variant_group.__class__, xcodeproj_file.PBXVariantGroup)
+    self.assertEqual(variant_group.Name(), 'Main.nib')
+    self.assertTrue(self.group.AddOrGetFileByPath(
+        'a/fr.lproj/Main.nib', True) is variant_group)
+    self.assertEqual(self.ChildPaths(variant_group),
+                     ['en.lproj/Main.nib', 'fr.lproj/Main.nib'])
+    self.assertEqual(self.ChildPaths(self.group.GetChildByPath('a')),
+                     [None, 'b'])
+    flat_variant_group = xcodeproj_file.PBXGroup().AddOrGetFileByPath(
+        'a/en.lproj/Main.nib', False)
+    self.assertEqual(flat_variant_group.GetProperty('path'), 'a')
+
+
+class TestPrint(unittest.TestCase):
+  def test_EncodeString(self):
+    # PBXFileReference and PBXBuildFile pass tabs and newlines through, other
+    # objects escape them; the encoded strings are cached separately.
+    group = xcodeproj_file.PBXGroup()
+    file_ref = xcodeproj_file.PBXFileReference({'path': 'a.cc'})
+    for _ in range(2):
+      self.assertEqual(group._EncodeString('a\tb'), '"a\\tb"')
+      self.assertEqual(file_ref._EncodeString('a\tb'), '"a\tb"')
+      self.assertEqual(group._EncodeString('a_b'), 'a_b')
+      self.assertEqual(group._EncodeString('a___b'), '"a___b"')
+      self.assertEqual(group._EncodeString(''), '""')
+
+  def test_Print(self):
+    project_file = xcodeproj_file.XCProjectFile({
+        'rootObject': xcodeproj_file.PBXProject(path='a/b.xcodeproj')})
+    project_file.ComputeIDs()
+    output = StringIO.StringIO()
+    project_file.Print(output)
+    lines = output.getvalue().splitlines()
+    self.assertEqual(lines[0], '// !$*UTF8*$!')
+    self.assertIn('\t\t4270DAA84FD421A587361563 /* Project object */ = {',
+                  lines)
+    self.assertIn('\trootObject = 4270DAA84FD421A587361563 '
+                  '/* Project object */;', lines)
+    self.assertEqual(lines[-1], '}')
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014 Google Inc. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""
+Verifies that the analyzer sees the sources of a 'jumbo' target as they are
+listed, not merged into unity files, and writes no unity files.
+"""
+
+import json
+import TestGyp
+
+test = TestGyp.TestGypCustom(format='analyzer')
+
+test.write('src/config.json', json.dumps({
+  'files': ['one.cc'],
+  'test_targets': ['program'],
+  'additional_compile_targets': [],
+}))
+test.run_gyp('jumbo.gyp', '-Gconfig_path=config.json',
+             '-Ganalyzer_output_path=analyzer_output', chdir='src')
+
+result = json.loads(test.read('src/analyzer_output'))
+if result.get('status') != 'Found dependency':
+  print 'unexpected status', result
+  test.fail_test()
+if result.get('build_targets') != ['program']:
+  print 'unexpected build_targets', result
+  test.fail_test()
+test.must_not_exist('src/out/jumbo')
+
+test.pass_test()
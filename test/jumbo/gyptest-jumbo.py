@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014 Google Inc. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""
+Verifies that the sources of a 'jumbo' target are merged into unity files,
+honoring the merge limit and the excluded sources, and that regenerating
+doesn't touch unity files that didn't change.
+"""
+
+import TestGyp
+
+import os
+
+test = TestGyp.TestGyp()
+
+test.run_gyp('jumbo.gyp', chdir='src')
+
+unity_dir = 'src/out/jumbo/jumbo/target/'
+test.must_contain(unity_dir + 'program_jumbo_0.cc', '#include "')
+test.must_contain(unity_dir + 'program_jumbo_0.cc', 'main.cc"')
+test.must_contain(unity_dir + 'program_jumbo_0.cc', 'one.cc"')
+test.must_contain(unity_dir + 'program_jumbo_1.cc', 'two.cc"')
+test.must_not_exist(unity_dir + 'program_jumbo_2.cc')
+test.must_not_contain(unity_dir + 'program_jumbo_0.cc', 'unmerged.cc')
+test.must_not_contain(unity_dir + 'program_jumbo_1.cc', 'unmerged.cc')
+
+test.build('jumbo.gyp', test.ALL, chdir='src')
+test.run_built_executable('program', chdir='src',
+                          stdout='one\ntwo\nunmerged\n')
+
+mtime = os.path.getmtime(test.workpath(unity_dir + 'program_jumbo_0.cc'))
+test.sleep()
+test.run_gyp('jumbo.gyp', chdir='src')
+test.up_to_date('jumbo.gyp', test.ALL, chdir='src')
+if os.path.getmtime(test.workpath(unity_dir + 'program_jumbo_0.cc')) != mtime:
+  test.fail_test()
+
+test.pass_test()
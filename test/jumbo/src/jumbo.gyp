@@ -0,0 +1,24 @@
+# Copyright (c) 2014 Google Inc. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+{
+  'targets': [
+    {
+      'target_name': 'program',
+      'type': 'executable',
+      'jumbo': 1,
+      'jumbo_file_merge_limit': 2,
+      'sources': [
+        'main.cc',
+        'one.cc',
+        'two.cc',
+        'unmerged.cc',
+      ],
+      # unmerged.cc has its own Helper(), which clashes with one.cc's.
+      'jumbo_excluded_sources': [
+        'unmerged.cc',
+      ],
+    },
+  ],
+}
@@ -0,0 +1,16 @@
+/* Copyright (c) 2014 Google Inc. All rights reserved.
+ * Use of this source code is governed by a BSD-style license that can be
+ * found in the LICENSE file. */
+
+#include <stdio.h>
+
+void One();
+void Two();
+void Unmerged();
+
+int main() {
+  One();
+  Two();
+  Unmerged();
+  return 0;
+}
@@ -0,0 +1,13 @@
+/* Copyright (c) 2014 Google Inc. All rights reserved.
+ * Use of this source code is governed by a BSD-style license that can be
+ * found in the LICENSE file. */
+
+#include <stdio.h>
+
+static const char* Helper() {
+  return "one";
+}
+
+void One() {
+  printf("%s\n", Helper());
+}
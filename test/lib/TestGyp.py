@@ -125,9 +125,13 @@ class TestGypBase(TestCommon.TestCommon):
     # Put test output in out/testworkarea by default.
     # Use temporary names so there are no collisions.
     workdir = os.path.join('out', kw.get('workdir', 'testworkarea'))
-    # Create work area if it doesn't already exist.
-    if not os.path.isdir(workdir):
+    # Create work area if it doesn't already exist.  Tests run in parallel
+    # by gyptest.py -j may race to create it.
+    try:
       os.makedirs(workdir)
+    except OSError:
+      if not os.path.isdir(workdir):
+        raise
 
     kw['workdir'] = tempfile.mktemp(prefix='testgyp.', dir=workdir)
 
@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014 Google Inc. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""
+Verifies that the Windows precompiled header of a target is precompiled into a
+gch file and force-included into the sources of its language on Linux.
+"""
+
+import TestGyp
+
+import sys
+
+if sys.platform.startswith('linux'):
+  test = TestGyp.TestGyp(formats=['ninja'])
+
+  CHDIR = 'precompiled-header'
+  test.run_gyp('pch.gyp', chdir=CHDIR)
+  test.build('pch.gyp', test.ALL, chdir=CHDIR)
+
+  test.built_file_must_exist('obj/hello.precomp.cc-cc.gch', chdir=CHDIR)
+  test.built_file_must_not_exist('obj/hello.precomp.cc-c.gch', chdir=CHDIR)
+  test.run_built_executable('hello', chdir=CHDIR,
+                            stdout='Hello, precompiled world!\n'
+                                   'Hello from C\n')
+
+  test.up_to_date('pch.gyp', test.ALL, chdir=CHDIR)
+
+  test.pass_test()
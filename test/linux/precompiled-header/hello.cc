@@ -0,0 +1,13 @@
+// Copyright (c) 2014 Google Inc. All rights reserved.
+// Use of this source code is governed by a BSD-style license that can be
+// found in the LICENSE file.
+
+// precomp.h is not included: it comes from the precompiled header.
+
+extern "C" void Hello2();
+
+int main() {
+  printf("%s\n", GREETING);
+  Hello2();
+  return 0;
+}
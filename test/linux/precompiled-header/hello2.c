@@ -0,0 +1,10 @@
+/* Copyright (c) 2014 Google Inc. All rights reserved.
+ * Use of this source code is governed by a BSD-style license that can be
+ * found in the LICENSE file. */
+
+/* C sources don't get the C++ precompiled header. */
+#include <stdio.h>
+
+void Hello2() {
+  printf("Hello from C\n");
+}
@@ -0,0 +1,19 @@
+# Copyright (c) 2014 Google Inc. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+{
+  'targets': [
+    {
+      'target_name': 'hello',
+      'type': 'executable',
+      'sources': [
+        'hello.cc',
+        'hello2.c',
+        'precomp.cc',
+      ],
+      'msvs_precompiled_header': 'precomp.h',
+      'msvs_precompiled_source': 'precomp.cc',
+    },
+  ],
+}
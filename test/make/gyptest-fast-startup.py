@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014 Google Inc. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""
+Verifies the output of the fast_startup generator flag: a single .mk file for
+the targets of each .gyp file, and .d files merged into per-directory
+databases that still catch header changes.
+"""
+
+import TestGyp
+
+# fast_startup is specific to the make generator.
+test = TestGyp.TestGyp(formats=['make'])
+
+test.run_gyp('dependencies.gyp', '-G', 'fast_startup')
+
+test.must_exist('dependencies.gyp.mk')
+test.must_not_exist('main.target.mk')
+
+test.build('dependencies.gyp', test.ALL)
+test.run_built_executable('main', stdout='hello world\n')
+
+# The database is brought up to date before the next build reads it.
+test.build('dependencies.gyp', test.ALL)
+deps_file = test.built_file_path(".deps/out/Default/obj.target/main/d.mk")
+test.must_contain(deps_file, "main.h")
+
+# A broken header has to break the build, which it only does if main.o is
+# rebuilt because of it.
+test.sleep()
+test.write('main.h', '#error main.h changed\n')
+test.build('dependencies.gyp', test.ALL, status=2, stderr=None)
+
+test.sleep()
+test.write('main.h', '')
+test.build('dependencies.gyp', test.ALL)
+test.run_built_executable('main', stdout='hello world\n')
+
+test.pass_test()
@@ -27,7 +27,7 @@ endif
 """
   if sys.platform == 'linux2':
     link_expected = """
-LINK ?= flock $(builddir)/linker.lock $(abspath clang)
+LINK ?= ./gyp-flock-tool semaphore $(GYP_LINK_CONCURRENCY) $(builddir)/linker.lock $(abspath clang)
 """
   elif sys.platform == 'darwin':
     link_expected = """
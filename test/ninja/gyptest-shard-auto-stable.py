@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014 Google Inc. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""
+Verifies that regenerating keeps the shards of 'msvs_shard': 'auto' targets
+as they were, whatever the compile times in .ninja_log, unless
+-G shard_by_compile_times=1 is given.
+"""
+
+import TestGyp
+
+import glob
+import os
+
+test = TestGyp.TestGyp(formats=['ninja'])
+
+CHDIR = 'shard-auto'
+
+
+def shard_layout():
+  layout = {}
+  obj_dir = test.workpath(CHDIR, 'out', 'Default', 'obj')
+  for path in glob.glob(os.path.join(obj_dir, 'shard_*.ninja')):
+    layout[os.path.basename(path)] = test.read(path)
+  return layout
+
+
+test.write(CHDIR + '/shard-auto.gyp',
+           test.read(CHDIR + '/shard-auto.gyp').replace(
+               "'msvs_shard_size': 1", "'msvs_shard_size': 40"))
+test.run_gyp('shard-auto.gyp', chdir=CHDIR)
+before = shard_layout()
+
+# A previous build in which hello3.cc took much longer than the others.
+test.write(CHDIR + '/out/Default/.ninja_log',
+           '# ninja log v5\n'
+           '0\t10\t0\tobj/shard_0.hello1.o\t0\n'
+           '0\t10\t0\tobj/shard_0.hello2.o\t0\n'
+           '0\t9000\t0\tobj/shard_1.hello3.o\t0\n')
+test.run_gyp('shard-auto.gyp', chdir=CHDIR)
+if shard_layout() != before:
+  test.fail_test()
+
+test.run_gyp('shard-auto.gyp', '-G', 'shard_by_compile_times=1', chdir=CHDIR)
+if shard_layout() == before:
+  test.fail_test()
+
+test.pass_test()
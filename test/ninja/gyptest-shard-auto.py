@@ -0,0 +1,27 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014 Google Inc. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""
+Verifies that 'msvs_shard': 'auto' sizes shards by source cost, on every
+platform the ninja generator supports.
+"""
+
+import TestGyp
+
+test = TestGyp.TestGyp(formats=['ninja'])
+
+CHDIR = 'shard-auto'
+test.run_gyp('shard-auto.gyp', chdir=CHDIR)
+test.build('shard-auto.gyp', test.ALL, chdir=CHDIR)
+
+for i in range(3):
+  test.built_file_must_exist('shard_%d' % i, type=test.STATIC_LIB,
+                             chdir=CHDIR)
+test.built_file_must_not_exist('shard_3', type=test.STATIC_LIB, chdir=CHDIR)
+
+test.run_built_executable('refs_to_shard', chdir=CHDIR, stdout='6\n')
+
+test.pass_test()
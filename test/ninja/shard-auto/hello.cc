@@ -0,0 +1,14 @@
+// Copyright (c) 2014 Google Inc. All rights reserved.
+// Use of this source code is governed by a BSD-style license that can be
+// found in the LICENSE file.
+
+#include <stdio.h>
+
+int Hello1();
+int Hello2();
+int Hello3();
+
+int main() {
+  printf("%d\n", Hello1() + Hello2() + Hello3());
+  return 0;
+}
@@ -0,0 +1,31 @@
+# Copyright (c) 2014 Google Inc. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+{
+ 'targets': [
+    {
+      'target_name': 'shard',
+      'type': 'static_library',
+      'msvs_shard': 'auto',
+      # Small enough for every source to get a shard of its own.
+      'msvs_shard_size': 1,
+      'sources': [
+        'hello1.cc',
+        'hello2.cc',
+        'hello3.cc',
+      ],
+    },
+    {
+      'target_name': 'refs_to_shard',
+      'type': 'executable',
+      'dependencies': [
+        # Make sure references are correctly updated.
+        'shard',
+      ],
+      'sources': [
+        'hello.cc',
+      ],
+    },
+  ]
+}
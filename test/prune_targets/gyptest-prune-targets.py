@@ -34,34 +34,37 @@ test.build('test1.gyp', 'program1')
 test.build('test1.gyp', 'program2')
 test.build('test1.gyp', 'program3')
 
-# With deep dependencies of program1 only.
-test.run_gyp('test1.gyp', '--root-target=program1')
-test.build('test2.gyp', 'lib1')
-test.build('test2.gyp', 'lib2', status=build_error_code, stderr=None)
-test.build('test2.gyp', 'lib3', status=build_error_code, stderr=None)
-test.build('test2.gyp', 'lib_indirect')
-test.build('test1.gyp', 'program1')
-test.build('test1.gyp', 'program2', status=build_error_code, stderr=None)
-test.build('test1.gyp', 'program3', status=build_error_code, stderr=None)
+# With and without loading only the build files the root targets need.
+for lazy_load in ([], ['--lazy-load']):
+  # With deep dependencies of program1 only.
+  test.run_gyp('test1.gyp', '--root-target=program1', *lazy_load)
+  test.build('test2.gyp', 'lib1')
+  test.build('test2.gyp', 'lib2', status=build_error_code, stderr=None)
+  test.build('test2.gyp', 'lib3', status=build_error_code, stderr=None)
+  test.build('test2.gyp', 'lib_indirect')
+  test.build('test1.gyp', 'program1')
+  test.build('test1.gyp', 'program2', status=build_error_code, stderr=None)
+  test.build('test1.gyp', 'program3', status=build_error_code, stderr=None)
 
-# With deep dependencies of program2 only.
-test.run_gyp('test1.gyp', '--root-target=program2')
-test.build('test2.gyp', 'lib1', status=build_error_code, stderr=None)
-test.build('test2.gyp', 'lib2')
-test.build('test2.gyp', 'lib3', status=build_error_code, stderr=None)
-test.build('test2.gyp', 'lib_indirect')
-test.build('test1.gyp', 'program1', status=build_error_code, stderr=None)
-test.build('test1.gyp', 'program2')
-test.build('test1.gyp', 'program3', status=build_error_code, stderr=None)
+  # With deep dependencies of program2 only.
+  test.run_gyp('test1.gyp', '--root-target=program2', *lazy_load)
+  test.build('test2.gyp', 'lib1', status=build_error_code, stderr=None)
+  test.build('test2.gyp', 'lib2')
+  test.build('test2.gyp', 'lib3', status=build_error_code, stderr=None)
+  test.build('test2.gyp', 'lib_indirect')
+  test.build('test1.gyp', 'program1', status=build_error_code, stderr=None)
+  test.build('test1.gyp', 'program2')
+  test.build('test1.gyp', 'program3', status=build_error_code, stderr=None)
 
-# With deep dependencies of program1 and program2.
-test.run_gyp('test1.gyp', '--root-target=program1', '--root-target=program2')
-test.build('test2.gyp', 'lib1')
-test.build('test2.gyp', 'lib2')
-test.build('test2.gyp', 'lib3', status=build_error_code, stderr=None)
-test.build('test2.gyp', 'lib_indirect')
-test.build('test1.gyp', 'program1')
-test.build('test1.gyp', 'program2')
-test.build('test1.gyp', 'program3', status=build_error_code, stderr=None)
+  # With deep dependencies of program1 and program2.
+  test.run_gyp('test1.gyp', '--root-target=program1', '--root-target=program2',
+               *lazy_load)
+  test.build('test2.gyp', 'lib1')
+  test.build('test2.gyp', 'lib2')
+  test.build('test2.gyp', 'lib3', status=build_error_code, stderr=None)
+  test.build('test2.gyp', 'lib_indirect')
+  test.build('test1.gyp', 'program1')
+  test.build('test1.gyp', 'program2')
+  test.build('test1.gyp', 'program3', status=build_error_code, stderr=None)
 
 test.pass_test()
@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014 Google Inc. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""
+Verifies that each variant generated with --variant regenerates its own build
+files, with its own variables, when a gyp file changes.
+"""
+
+import TestGyp
+
+# Regenerating build files when a gyp file changes is currently only supported
+# by the make and Android generators, and --generator-output is not supported
+# by Android, so we can only test for make.
+test = TestGyp.TestGyp(formats=['make'])
+
+test.run_gyp('variants.gyp', '--variant=fast flavor=fast', '--variant=plain',
+             chdir='src')
+
+for variant in ('fast', 'plain'):
+  test.build('variants.gyp', test.ALL, chdir='src/' + variant)
+
+# Sleep so that the changed gyp file will have a newer timestamp than the
+# previously generated build files.
+test.sleep()
+test.touch('src/variants.gyp')
+
+for variant in ('fast', 'plain'):
+  chdir = 'src/' + variant
+  test.build('variants.gyp', test.ALL, chdir=chdir)
+  test.run_built_executable('program', chdir=chdir, stdout=variant + '\n')
+  for other in ('fast', 'plain'):
+    test.must_not_exist('src/%s/%s' % (variant, other))
+
+test.pass_test()
@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014 Google Inc. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""
+Verifies that --variant generates each variant of the build, with its own
+variables and unity files, in its own subdirectory of the generator output.
+"""
+
+import TestGyp
+
+test = TestGyp.TestGyp(formats=['make', 'ninja'])
+
+test.run_gyp('variants.gyp', '--variant=fast flavor=fast', '--variant=plain',
+             chdir='src')
+
+for variant in ('fast', 'plain'):
+  chdir = 'src/' + variant
+  test.build('variants.gyp', test.ALL, chdir=chdir)
+  test.run_built_executable('program', chdir=chdir, stdout=variant + '\n')
+  # The unity files of each variant are its own.
+  test.run_built_executable('jumbo_program', chdir=chdir,
+                            stdout=variant + '\n')
+
+test.run_gyp('variants.gyp', '--variant=fast', '--variant=fast', chdir='src',
+             status=1, stderr=None)
+test.must_contain_all_lines(test.stderr(), ['Variant fast given twice'])
+
+test.pass_test()
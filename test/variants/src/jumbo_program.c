@@ -0,0 +1,12 @@
+/* Copyright (c) 2014 Google Inc. All rights reserved.
+ * Use of this source code is governed by a BSD-style license that can be
+ * found in the LICENSE file. */
+
+#include <stdio.h>
+
+const char* Flavor(void);
+
+int main(void) {
+  printf("%s\n", Flavor());
+  return 0;
+}
@@ -0,0 +1,14 @@
+/* Copyright (c) 2014 Google Inc. All rights reserved.
+ * Use of this source code is governed by a BSD-style license that can be
+ * found in the LICENSE file. */
+
+#include <stdio.h>
+
+int main(void) {
+#ifdef FAST
+  printf("fast\n");
+#else
+  printf("plain\n");
+#endif
+  return 0;
+}
@@ -0,0 +1,32 @@
+# Copyright (c) 2014 Google Inc. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+{
+  'variables': {
+    'flavor%': 'plain',
+  },
+  'targets': [
+    {
+      'target_name': 'program',
+      'type': 'executable',
+      'sources': [
+        'program.c',
+      ],
+      'conditions': [
+        ['flavor=="fast"', {
+          'defines': ['FAST'],
+        }],
+      ],
+    },
+    {
+      'target_name': 'jumbo_program',
+      'type': 'executable',
+      'jumbo': 1,
+      'sources': [
+        'jumbo_program.c',
+        '<(flavor).c',
+      ],
+    },
+  ],
+}
@@ -6,12 +6,22 @@
 
 """Using the JSON dumped by the dump-dependency-json generator,
 generate input suitable for graphviz to render a dependency graph of
-targets."""
+targets.  The binary graph written with -G dump_format=binary can be
+used instead with --dump=dump.bin."""
 
 import collections
 import json
+import optparse
+import os
 import sys
 
+try:
+  import gyp.binary_graph
+except ImportError:
+  sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               os.pardir, 'pylib'))
+  import gyp.binary_graph
+
 
 def ParseTarget(target):
   target, _, suffix = target.partition('#')
@@ -23,7 +33,10 @@ def LoadEdges(filename, targets):
   """Load the edges map from the dump file, and filter it to only
   show targets in |targets| and their depedendents."""
 
-  file = open('dump.json')
+  if gyp.binary_graph.IsBinaryGraph(filename):
+    return LoadBinaryEdges(filename, targets)
+
+  file = open(filename)
   edges = json.load(file)
   file.close()
 
@@ -40,6 +53,26 @@ def LoadEdges(filename, targets):
   return target_edges
 
 
+def LoadBinaryEdges(filename, targets):
+  """Like LoadEdges, for a binary graph file.  Only the part of the file that
+  the wanted targets need is read."""
+  graph = gyp.binary_graph.Graph(filename)
+  try:
+    nodes = []
+    for target in targets:
+      node = graph.Find(target)
+      if node is None:
+        raise KeyError(target)
+      nodes.append(node)
+    target_edges = {}
+    for node in graph.Closure(nodes):
+      target_edges[graph.Name(node)] = [
+          graph.Name(dependency) for dependency in graph.Dependencies(node)]
+  finally:
+    graph.close()
+  return target_edges
+
+
 def WriteGraph(edges):
   """Print a graphviz graph to stdout.
   |edges| is a map of target to a list of other targets it depends on."""
@@ -84,13 +117,18 @@ def WriteGraph(edges):
 
 
 def main():
-  if len(sys.argv) < 2:
+  parser = optparse.OptionParser(usage='%prog [--dump=FILE] target1 target2...')
+  parser.add_option('--dump', default='dump.json',
+                    help='the dump_dependency_json output, JSON or binary '
+                         '(default: %default)')
+  options, targets = parser.parse_args()
+  if not targets:
     print >>sys.stderr, __doc__
     print >>sys.stderr
-    print >>sys.stderr, 'usage: %s target1 target2...' % (sys.argv[0])
+    parser.print_usage(sys.stderr)
     return 1
 
-  edges = LoadEdges('dump.json', sys.argv[1:])
+  edges = LoadEdges(options.dump, targets)
 
   WriteGraph(edges)
   return 0